@@ -0,0 +1,178 @@
+"""
+Benchmark harness of the Product Manager and Order Manager APIs.
+
+Starts the services against fresh databases, seeds them, drives each selected workload from many
+concurrent clients and reports throughput, latency percentiles, database queries per request and
+errors. Results are saved as JSON and can be compared against a previous run.
+
+Usage: python -m benchmarks --help
+"""
+import argparse
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+import requests
+from .report import compare_results, format_results, load_results, save_results
+from .runner import run_workload
+from .servers import REPO_DIR, Service, StubProductAPI, product_price
+from .workloads import ORDER, PRODUCT, WORKLOADS, Context, Workload
+
+SEED_PRODUCTS_PER_REQUEST: int = 5000
+SEED_ORDERS_PER_REQUEST: int = 500
+
+DEFAULT_OUTPUT: Path = REPO_DIR / 'benchmarks' / 'results' / 'latest.json'
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        '--workloads', default='all',
+        help=f'Comma-separated workloads to run, or "all". Available: {", ".join(WORKLOADS)}',
+    )
+    parser.add_argument('--products', type=int, default=1000, help='Products seeded in the catalog')
+    parser.add_argument('--orders', type=int, default=1000, help='Orders seeded before running the workloads')
+    parser.add_argument('--stock', type=int, default=10 ** 9, help='Initial stock of every product')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients per workload')
+    parser.add_argument('--duration', type=float, default=10, help='Measured seconds per workload')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of unmeasured requests before each workload')
+    parser.add_argument(
+        '--product-api', choices=['real', 'stub'], default='real',
+        help='Run order workloads against the real Product Manager or an in-process stand-in',
+    )
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the random choices of the clients')
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help='Where to save the results as JSON')
+    parser.add_argument('--baseline', type=Path, help='Results of a previous run to compare against')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='Relative change counted as a regression when comparing against the baseline (default 0.1 = 10%%)',
+    )
+    return parser.parse_args()
+
+
+def select_workloads(names: str) -> list[Workload]:
+    if names == 'all':
+        return list(WORKLOADS.values())
+
+    selected: list[Workload] = []
+    for name in names.split(','):
+        if name.strip() not in WORKLOADS:
+            sys.exit(f'Unknown workload {name.strip()!r}. Available: {", ".join(WORKLOADS)}')
+        selected.append(WORKLOADS[name.strip()])
+    return selected
+
+
+def seed_products(base_url: str, count: int, stock: int) -> None:
+    """
+    Creates the catalog through the bulk endpoint of the Product Manager.
+    """
+    session: requests.Session = requests.Session()
+    for start in range(1, count + 1, SEED_PRODUCTS_PER_REQUEST):
+        products: list[dict[str, Any]] = [
+            {'name': f'Product {product_id}', 'price': product_price(product_id), 'stock': stock}
+            for product_id in range(start, min(start + SEED_PRODUCTS_PER_REQUEST, count + 1))
+        ]
+        response: requests.Response = session.post(f'{base_url}/api/products/bulk/', json=products)
+        response.raise_for_status()
+
+
+def seed_orders(base_url: str, count: int, context: Context, seed: int) -> None:
+    """
+    Creates the order history through the batch endpoint of the Order Manager.
+    """
+    rng: random.Random = random.Random(seed)
+    session: requests.Session = requests.Session()
+    for start in range(0, count, SEED_ORDERS_PER_REQUEST):
+        orders: list[dict[str, Any]] = [
+            {'items': context.random_items(rng, rng.randint(1, 5))}
+            for _ in range(min(SEED_ORDERS_PER_REQUEST, count - start))
+        ]
+        response: requests.Response = session.post(f'{base_url}/api/orders/batch/', json={'transaction': 'batch', 'orders': orders})
+        response.raise_for_status()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    args: argparse.Namespace = parse_args()
+    workloads: list[Workload] = select_workloads(args.workloads)
+    services: set[str] = set().union(*(workload.services for workload in workloads))
+    context: Context = Context(product_count=args.products)
+
+    with tempfile.TemporaryDirectory(prefix='apolo-bench-') as work_dir:
+        product_service: Optional[Service] = None
+        order_service: Optional[Service] = None
+        stub: Optional[StubProductAPI] = None
+        base_urls: dict[str, str] = {}
+
+        try:
+            if PRODUCT in services or (ORDER in services and args.product_api == 'real'):
+                product_service = Service('product_manager', 'products', Path(work_dir), env={'PRODUCT_CHANGE_WEBHOOKS': ''})
+                product_service.start()
+                seed_products(product_service.base_url, args.products, args.stock)
+                base_urls[PRODUCT] = product_service.base_url
+
+            if ORDER in services:
+                if args.product_api == 'stub':
+                    stub = StubProductAPI(args.products, args.stock)
+                    stub.start()
+                    product_api_url: str = stub.base_url
+                else:
+                    product_api_url = product_service.base_url
+                order_service = Service(
+                    'order_manager', 'orders', Path(work_dir), env={'PRODUCT_API_BASE_URL': f'{product_api_url}/api/products/'}
+                )
+                order_service.start()
+                seed_orders(order_service.base_url, args.orders, context, args.seed)
+                base_urls[ORDER] = order_service.base_url
+
+            results: dict[str, Any] = {
+                'meta': {
+                    'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'config': {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+                },
+                'workloads': {},
+            }
+
+            for workload in workloads:
+                print(f'Running {workload.name}: {workload.description}', file=sys.stderr)
+                results['workloads'][workload.name] = run_workload(
+                    workload, context, base_urls, args.concurrency, args.duration, args.warmup, args.seed
+                )
+        finally:
+            for service in (order_service, product_service):
+                if service is not None:
+                    service.stop()
+            if stub is not None:
+                stub.stop()
+
+    save_results(results, args.output)
+    print(format_results(results))
+    print(f'\nResults saved to {args.output}')
+
+    if args.baseline:
+        table, regressions = compare_results(results, load_results(args.baseline), args.threshold)
+        print(f'\nChange against {args.baseline}:\n{table}')
+        if regressions:
+            print('\nRegressions:\n' + '\n'.join(f'  {regression}' for regression in regressions))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,34 @@
+from typing import Any, Callable
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+
+QUERY_COUNT_HEADER: str = 'X-DB-Queries'
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts the queries run through it.
+    """
+    def __init__(self) -> None:
+        self.count: int = 0
+
+    def __call__(self, execute: Callable[..., Any], sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryCountMiddleware:
+    """
+    Reports the number of database queries run by each request in the `X-DB-Queries` response header.
+
+    Only installed by the benchmark harness. Queries run while a streaming response is consumed are not counted.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response: Callable[[HttpRequest], HttpResponse] = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        counter: QueryCounter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response: HttpResponse = self.get_response(request)
+        response[QUERY_COUNT_HEADER] = str(counter.count)
+        return response
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+# Metrics compared against a baseline, and whether a higher value is better.
+COMPARED_METRICS: list[tuple[str, tuple[str, ...], bool]] = [
+    ('rps', ('rps',), True),
+    ('p50', ('latency_ms', 'p50'), False),
+    ('p95', ('latency_ms', 'p95'), False),
+    ('p99', ('latency_ms', 'p99'), False),
+    ('queries', ('queries', 'mean'), False),
+]
+
+
+def save_results(results: dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + '\n')
+
+
+def load_results(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def metric(result: dict[str, Any], keys: tuple[str, ...]) -> Optional[float]:
+    value: Any = result
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def format_table(rows: list[list[str]]) -> str:
+    """
+    Formats rows as a plain text table, the first row being the header.
+    """
+    widths: list[int] = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    lines: list[str] = ['  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows]
+    lines.insert(1, '  '.join('-' * width for width in widths))
+    return '\n'.join(lines)
+
+
+def format_results(results: dict[str, Any]) -> str:
+    """
+    Formats the summary of every workload of a run.
+    """
+    rows: list[list[str]] = [['workload', 'requests', 'errors', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'queries/req']]
+    for name, result in results['workloads'].items():
+        latency: dict[str, Any] = result['latency_ms']
+        rows.append([
+            name,
+            str(result['requests']),
+            str(result['errors']),
+            f'{result["rps"]:.1f}',
+            *(f'{latency[key]:.1f}' if latency[key] is not None else '-' for key in ('p50', 'p95', 'p99', 'max')),
+            f'{result["queries"]["mean"]:.1f}' if result['queries']['mean'] is not None else '-',
+        ])
+    return format_table(rows)
+
+
+def compare_results(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> tuple[str, list[str]]:
+    """
+    Compares a run against a baseline run, workload by workload.
+
+    Args:
+        results (dict[str, Any]): The current run.
+        baseline (dict[str, Any]): The baseline run.
+        threshold (float): Relative change beyond which a worse metric counts as a regression (0.1 = 10%).
+
+    Returns:
+        tuple[str, list[str]]: The comparison table and the description of every regression.
+    """
+    rows: list[list[str]] = [['workload', *(name for name, _, _ in COMPARED_METRICS)]]
+    regressions: list[str] = []
+
+    for name, result in results['workloads'].items():
+        base: Optional[dict[str, Any]] = baseline['workloads'].get(name)
+        if base is None:
+            continue
+
+        row: list[str] = [name]
+        for metric_name, keys, higher_is_better in COMPARED_METRICS:
+            current, previous = metric(result, keys), metric(base, keys)
+            if current is None or not previous:
+                row.append('-')
+                continue
+
+            change: float = (current - previous) / previous
+            row.append(f'{change:+.1%}')
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f'{name}: {metric_name} {previous:g} -> {current:g} ({change:+.1%})')
+        rows.append(row)
+
+    return format_table(rows), regressions
@@ -0,0 +1,157 @@
+import math
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Optional
+import requests
+from .middleware import QUERY_COUNT_HEADER
+from .workloads import Context, Request, Workload
+
+REQUEST_TIMEOUT: float = 30
+
+
+class Sample:
+    """
+    The outcome of one request sent during the measured part of a run.
+    """
+    __slots__ = ('latency', 'status_code', 'ok', 'queries')
+
+    def __init__(self, latency: float, status_code: Optional[int], ok: bool, queries: Optional[int]) -> None:
+        self.latency: float = latency
+        self.status_code: Optional[int] = status_code
+        self.ok: bool = ok
+        self.queries: Optional[int] = queries
+
+
+def percentile(sorted_values: list[float], fraction: float) -> Optional[float]:
+    """
+    Returns a percentile of sorted values, using the nearest-rank method.
+    """
+    if not sorted_values:
+        return None
+    rank: int = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def run_client(
+    workload: Workload,
+    context: Context,
+    base_urls: dict[str, str],
+    seed: int,
+    measure_from: float,
+    until: float,
+    samples: list[Sample],
+) -> None:
+    """
+    Sends requests of a workload one after another over a persistent connection until `until`.
+
+    Only requests started after `measure_from` are recorded; the previous ones warm up the services.
+    """
+    rng: random.Random = random.Random(seed)
+    state: dict[str, Any] = {}
+    session: requests.Session = requests.Session()
+
+    while True:
+        started: float = time.perf_counter()
+        if started >= until:
+            break
+
+        request: Request = workload.next_request(rng, state, context)
+        service, method, path, body = request
+        try:
+            response: requests.Response = session.request(method, base_urls[service] + path, json=body, timeout=REQUEST_TIMEOUT)
+            status_code: Optional[int] = response.status_code
+            queries: Optional[str] = response.headers.get(QUERY_COUNT_HEADER)
+            workload.on_response(request, response.status_code, response.content, state)
+        except requests.RequestException:
+            status_code, queries = None, None
+            session.close()
+            session = requests.Session()
+
+        if started >= measure_from:
+            samples.append(Sample(
+                time.perf_counter() - started, status_code, workload.accepts(status_code, state), int(queries) if queries else None
+            ))
+
+    session.close()
+
+
+def run_workload(
+    workload: Workload,
+    context: Context,
+    base_urls: dict[str, str],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict[str, Any]:
+    """
+    Drives a workload from `concurrency` concurrent clients and summarizes the measured requests.
+
+    Args:
+        workload (Workload): The workload.
+        context (Context): The parameters of the run.
+        base_urls (dict[str, str]): The base URL of each service.
+        concurrency (int): Number of clients, each with its own connection.
+        duration (float): Seconds during which requests are measured.
+        warmup (float): Seconds of requests sent before measuring.
+        seed (int): Seed of the random choices of the clients.
+
+    Returns:
+        dict[str, Any]: Throughput, latency percentiles, database queries per request and errors.
+    """
+    start: float = time.perf_counter()
+    measure_from: float = start + warmup
+    until: float = measure_from + duration
+    per_client: list[list[Sample]] = [[] for _ in range(concurrency)]
+
+    clients: list[threading.Thread] = [
+        threading.Thread(
+            target=run_client,
+            args=(workload, context, base_urls, seed * 1000 + index, measure_from, until, per_client[index]),
+            daemon=True,
+        )
+        for index in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    # Requests still in flight when the run ends are measured, so the run can last a little longer
+    elapsed: float = max(time.perf_counter(), until) - measure_from
+    return summarize([sample for samples in per_client for sample in samples], workload, elapsed)
+
+
+def summarize(samples: list[Sample], workload: Workload, elapsed: float) -> dict[str, Any]:
+    """
+    Summarizes the samples of a workload.
+    """
+    latencies: list[float] = sorted(sample.latency * 1000 for sample in samples)
+    queries: list[float] = sorted(sample.queries for sample in samples if sample.queries is not None)
+    statuses: Counter = Counter('error' if sample.status_code is None else str(sample.status_code) for sample in samples)
+    errors: int = sum(not sample.ok for sample in samples)
+
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 3) if value is not None else None
+
+    return {
+        'description': workload.description,
+        'requests': len(samples),
+        'errors': errors,
+        'statuses': dict(sorted(statuses.items())),
+        'rps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0,
+        'latency_ms': {
+            'mean': rounded(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': rounded(percentile(latencies, 0.50)),
+            'p95': rounded(percentile(latencies, 0.95)),
+            'p99': rounded(percentile(latencies, 0.99)),
+            'max': rounded(latencies[-1]) if latencies else None,
+        },
+        'queries': {
+            'mean': rounded(sum(queries) / len(queries)) if queries else None,
+            'p95': percentile(queries, 0.95),
+            'max': queries[-1] if queries else None,
+        },
+    }
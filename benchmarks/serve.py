@@ -0,0 +1,30 @@
+"""
+Serves a Django project with a threaded WSGI server sized for benchmarks.
+
+`runserver` only queues a handful of pending connections, so a burst of concurrent clients gets
+connection resets. This server accepts a large backlog and handles each connection in its own thread.
+
+Usage: python -m benchmarks.serve <project_dir> <port>
+"""
+import os
+import sys
+from django.core.servers.basehttp import WSGIServer, run
+
+
+class BenchmarkWSGIServer(WSGIServer):
+    request_queue_size: int = 1024
+
+
+def main() -> None:
+    project_dir, port = sys.argv[1], int(sys.argv[2])
+    sys.path.insert(0, os.path.abspath(project_dir))
+
+    import django
+    django.setup()
+
+    from django.core.wsgi import get_wsgi_application
+    run('127.0.0.1', port, get_wsgi_application(), threading=True, server_cls=BenchmarkWSGIServer)
+
+
+if __name__ == '__main__':
+    main()
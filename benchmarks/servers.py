@@ -0,0 +1,217 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+REPO_DIR: Path = Path(__file__).resolve().parent.parent
+
+# Settings module of each service, wrapping its real settings for the benchmark.
+SETTINGS_TEMPLATE: str = '''from {project}.settings import *
+
+# Tables are created with `migrate --run-syncdb`, so the benchmark never writes migrations into the repository.
+MIGRATION_MODULES = {{'{app}': None}}
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+MIDDLEWARE = ['benchmarks.middleware.QueryCountMiddleware', *MIDDLEWARE]
+'''
+
+STARTUP_TIMEOUT: float = 30
+
+
+def free_port() -> int:
+    """
+    Returns a TCP port that is free on the loopback interface.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = STARTUP_TIMEOUT, process: Optional[subprocess.Popen] = None) -> None:
+    """
+    Waits until a server accepts connections on a port.
+
+    Raises:
+        RuntimeError: If the server exits or does not start listening in time.
+    """
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f'The server on port {port} exited with code {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'The server on port {port} did not start within {timeout} seconds')
+
+
+class Service:
+    """
+    One of the Django projects of the repository, run in a subprocess against a fresh database.
+
+    With SQLite (the default) the database is a new file in `work_dir`. With `DB_ENGINE=postgresql`
+    the database named `bench_<project>` is used and flushed before the run.
+    """
+    def __init__(self, project: str, app: str, work_dir: Path, env: Optional[dict[str, str]] = None) -> None:
+        self.project: str = project
+        self.app: str = app
+        self.work_dir: Path = work_dir
+        self.port: int = free_port()
+        self.process: Optional[subprocess.Popen] = None
+        self.log_path: Path = work_dir / f'{project}.log'
+
+        settings_module: str = f'bench_{project}_settings'
+        (work_dir / f'{settings_module}.py').write_text(SETTINGS_TEMPLATE.format(project=project, app=app))
+
+        self.env: dict[str, str] = {
+            **os.environ,
+            **(env or {}),
+            'DJANGO_SETTINGS_MODULE': settings_module,
+            'PYTHONPATH': os.pathsep.join([str(work_dir), str(REPO_DIR), os.environ.get('PYTHONPATH', '')]),
+        }
+        if self.env.get('DB_ENGINE', 'sqlite') == 'sqlite':
+            self.env['DB_NAME'] = str(work_dir / f'{project}.sqlite3')
+        else:
+            self.env['DB_NAME'] = f'bench_{project}'
+
+    @property
+    def project_dir(self) -> Path:
+        return REPO_DIR / self.project
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def manage(self, *args: str) -> None:
+        """
+        Runs a management command of the project.
+        """
+        subprocess.run(
+            [sys.executable, 'manage.py', *args], cwd=self.project_dir, env=self.env, check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    def start(self) -> None:
+        """
+        Creates the tables and starts serving the project.
+        """
+        self.manage('migrate', '--run-syncdb', '--verbosity', '0')
+        if self.env.get('DB_ENGINE', 'sqlite') != 'sqlite':
+            self.manage('flush', '--no-input', '--verbosity', '0')
+
+        with open(self.log_path, 'w') as log:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'benchmarks.serve', str(self.project_dir), str(self.port)],
+                cwd=REPO_DIR, env=self.env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        wait_for_port(self.port, process=self.process)
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size: int = 1024
+    daemon_threads: bool = True
+
+
+class StubProductAPI:
+    """
+    In-process stand-in for the Product Manager API, to benchmark the order manager on its own.
+
+    Implements the endpoints used by the order manager (`batch/`, `stock/reserve/` and
+    `stock/release/`) over an in-memory catalog, with the same responses as the real API.
+    """
+    def __init__(self, product_count: int, stock: int) -> None:
+        self.products: dict[int, dict[str, Any]] = {
+            product_id: {'id': product_id, 'name': f'Product {product_id}', 'price': product_price(product_id), 'stock': stock}
+            for product_id in range(1, product_count + 1)
+        }
+        self.lock: threading.Lock = threading.Lock()
+        self.server: StubServer = StubServer(('127.0.0.1', free_port()), self.handler_class())
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stock_operation(self, items: list[dict[str, int]], sign: int) -> tuple[int, Any]:
+        """
+        Applies a reservation (`sign` -1) or a release (`sign` 1) to every product, or to none.
+        """
+        with self.lock:
+            for item in sorted(items, key=lambda item: item['product_id']):
+                product: Optional[dict[str, Any]] = self.products.get(item['product_id'])
+                if product is None:
+                    return 404, {'error': f'Product {item["product_id"]} not found'}
+                if sign < 0 and product['stock'] < item['quantity']:
+                    return 400, {'error': f'Insufficient stock for product {item["product_id"]}'}
+            for item in items:
+                self.products[item['product_id']]['stock'] += sign * item['quantity']
+            return 200, [dict(self.products[item['product_id']]) for item in items]
+
+    def handler_class(self) -> type[BaseHTTPRequestHandler]:
+        api: StubProductAPI = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version: str = 'HTTP/1.1'
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def send_json(self, status_code: int, data: Any) -> None:
+                body: bytes = json.dumps(data).encode()
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                if url.path.endswith('/batch/'):
+                    ids: list[str] = parse_qs(url.query).get('ids', [''])[0].split(',')
+                    with api.lock:
+                        found = [dict(api.products[int(i)]) for i in ids if i.isdigit() and int(i) in api.products]
+                    self.send_json(200, found)
+                else:
+                    self.send_json(404, {'error': 'Not found'})
+
+            def do_POST(self) -> None:
+                body: Any = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path.endswith('/stock/reserve/'):
+                    self.send_json(*api.stock_operation(body['items'], -1))
+                elif self.path.endswith('/stock/release/'):
+                    self.send_json(*api.stock_operation(body['items'], 1))
+                else:
+                    self.send_json(404, {'error': 'Not found'})
+
+        return Handler
+
+
+def product_price(product_id: int) -> str:
+    """
+    Returns the deterministic price of a seeded product, as the API formats it.
+    """
+    return str((Decimal(100 + product_id % 900) / 10 + Decimal('0.99')).quantize(Decimal('0.01')))
@@ -0,0 +1,218 @@
+import json
+import random
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+# A request of a workload: the service it goes to, its method, its path and its JSON body.
+Request = tuple[str, str, str, Optional[Any]]
+
+PRODUCT: str = 'product'
+ORDER: str = 'order'
+
+# Product that every client of the hot-SKU workloads competes for.
+HOT_PRODUCT_ID: int = 1
+
+LARGE_ORDER_ITEMS: int = 50
+BATCH_ORDERS: int = 20
+
+
+class Context:
+    """
+    Shared parameters of a benchmark run that workloads use to build their requests.
+    """
+    def __init__(self, product_count: int) -> None:
+        self.product_count: int = product_count
+
+    def random_product(self, rng: random.Random) -> int:
+        return rng.randint(1, self.product_count)
+
+    def random_items(self, rng: random.Random, count: int) -> list[dict[str, int]]:
+        product_ids: list[int] = rng.sample(range(1, self.product_count + 1), min(count, self.product_count))
+        return [{'product_id': product_id, 'quantity': rng.randint(1, 3)} for product_id in product_ids]
+
+
+class Workload:
+    """
+    A kind of request sent repeatedly by every client during a benchmark.
+
+    Subclasses build the next request of a client; `state` is private to each client, so stateful
+    workloads (such as paging through a list) do not interfere with each other.
+    """
+    name: str = ''
+    description: str = ''
+    services: frozenset[str] = frozenset()
+    # Status codes that count as successful responses.
+    expected: frozenset[int] = frozenset({200})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        raise NotImplementedError
+
+    def on_response(self, request: Request, status_code: int, body: bytes, state: dict[str, Any]) -> None:
+        pass
+
+    def accepts(self, status_code: Optional[int], state: dict[str, Any]) -> bool:
+        """
+        Returns whether the status code of the last request counts as a successful response.
+        """
+        return status_code in self.expected
+
+
+class ProductDetail(Workload):
+    name = 'product_detail'
+    description = 'GET a random product'
+    services = frozenset({PRODUCT})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return PRODUCT, 'GET', f'/api/products/{context.random_product(rng)}/', None
+
+
+class ProductBatch(Workload):
+    name = 'product_batch'
+    description = 'GET 20 random products with a single batch request'
+    services = frozenset({PRODUCT})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        ids: str = ','.join(str(context.random_product(rng)) for _ in range(20))
+        return PRODUCT, 'GET', f'/api/products/batch/?ids={ids}', None
+
+
+class ProductList(Workload):
+    name = 'product_list'
+    description = 'GET the product list (scan of the catalog)'
+    services = frozenset({PRODUCT})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return PRODUCT, 'GET', '/api/products/', None
+
+
+class StockUpdate(Workload):
+    name = 'stock_update'
+    description = 'PATCH the stock of a random product'
+    services = frozenset({PRODUCT})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return PRODUCT, 'PATCH', f'/api/products/{context.random_product(rng)}/stock/', {'stock': rng.randint(10 ** 6, 10 ** 9)}
+
+
+class StockReserveHot(Workload):
+    name = 'stock_reserve_hot'
+    description = 'Reserve one unit of the same product from every client'
+    services = frozenset({PRODUCT})
+    expected = frozenset({200, 400})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return PRODUCT, 'POST', '/api/products/stock/reserve/', {'items': [{'product_id': HOT_PRODUCT_ID, 'quantity': 1}]}
+
+
+class OrderCreate(Workload):
+    name = 'order_create'
+    description = 'POST an order of 1 to 5 random products'
+    services = frozenset({ORDER})
+    expected = frozenset({201})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return ORDER, 'POST', '/api/orders/', {'items': context.random_items(rng, rng.randint(1, 5))}
+
+
+class OrderHotSku(Workload):
+    name = 'order_hot_sku'
+    description = 'POST orders that all contain the same product'
+    services = frozenset({ORDER})
+    expected = frozenset({201, 400})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return ORDER, 'POST', '/api/orders/', {'items': [{'product_id': HOT_PRODUCT_ID, 'quantity': 1}]}
+
+
+class OrderLarge(Workload):
+    name = 'order_large'
+    description = f'POST orders of {LARGE_ORDER_ITEMS} distinct products'
+    services = frozenset({ORDER})
+    expected = frozenset({201})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return ORDER, 'POST', '/api/orders/', {'items': context.random_items(rng, LARGE_ORDER_ITEMS)}
+
+
+class OrderBatch(Workload):
+    name = 'order_batch'
+    description = f'POST {BATCH_ORDERS} orders with a single batch request'
+    services = frozenset({ORDER})
+    expected = frozenset({201})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        orders: list[dict[str, Any]] = [{'items': context.random_items(rng, rng.randint(1, 5))} for _ in range(BATCH_ORDERS)]
+        return ORDER, 'POST', '/api/orders/batch/', {'orders': orders}
+
+
+class OrderList(Workload):
+    name = 'order_list'
+    description = 'Page through the order list, 100 orders at a time'
+    services = frozenset({ORDER})
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        return ORDER, 'GET', state.get('next') or '/api/orders/?limit=100', None
+
+    def on_response(self, request: Request, status_code: int, body: bytes, state: dict[str, Any]) -> None:
+        next_url: Optional[str] = json.loads(body).get('next') if status_code == 200 else None
+        if next_url:
+            url = urlsplit(next_url)
+            state['next'] = f'{url.path}?{url.query}'
+        else:
+            state.pop('next', None)
+
+
+class Mixed(Workload):
+    """
+    Picks each request from other workloads, in proportion to their weights.
+    """
+    def __init__(self, name: str, description: str, weights: dict[Workload, int]) -> None:
+        self.name = name
+        self.description = description
+        self.weights: dict[Workload, int] = weights
+        self.services = frozenset().union(*(workload.services for workload in weights))
+
+    def next_request(self, rng: random.Random, state: dict[str, Any], context: Context) -> Request:
+        workload: Workload = rng.choices(list(self.weights), weights=list(self.weights.values()))[0]
+        request: Request = workload.next_request(rng, state.setdefault(workload.name, {}), context)
+        state['last'] = workload
+        return request
+
+    def on_response(self, request: Request, status_code: int, body: bytes, state: dict[str, Any]) -> None:
+        workload: Workload = state['last']
+        workload.on_response(request, status_code, body, state[workload.name])
+
+    def accepts(self, status_code: Optional[int], state: dict[str, Any]) -> bool:
+        workload: Workload = state['last']
+        return workload.accepts(status_code, state[workload.name])
+
+
+WORKLOADS: dict[str, Workload] = {
+    workload.name: workload
+    for workload in [
+        ProductDetail(),
+        ProductBatch(),
+        ProductList(),
+        StockUpdate(),
+        StockReserveHot(),
+        OrderCreate(),
+        OrderHotSku(),
+        OrderLarge(),
+        OrderBatch(),
+        OrderList(),
+    ]
+}
+
+WORKLOADS['mixed'] = Mixed(
+    'mixed',
+    'Mostly reads with a share of order creation, hot-SKU orders and stock updates',
+    {
+        WORKLOADS['product_detail']: 40,
+        WORKLOADS['product_batch']: 10,
+        WORKLOADS['order_list']: 15,
+        WORKLOADS['order_create']: 20,
+        WORKLOADS['order_hot_sku']: 5,
+        WORKLOADS['order_large']: 2,
+        WORKLOADS['stock_update']: 8,
+    },
+)
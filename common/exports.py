@@ -0,0 +1,81 @@
+import re
+import zlib
+from typing import Any, Iterable, Iterator, Optional
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.request import Request
+from common.renderers import encode_json
+
+# Number of rows fetched from the database and written to the response at a time.
+EXPORT_CHUNK_SIZE: int = 1000
+
+ACCEPTS_GZIP_RE: re.Pattern = re.compile(r'\bgzip\b')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline-delimited JSON, one object per line.
+    Lets export endpoints negotiate `application/x-ndjson`.
+    """
+    media_type: str = 'application/x-ndjson'
+    format: str = 'ndjson'
+    charset: str = 'utf-8'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[dict] = None) -> bytes:
+        rows: Iterable[Any] = data if isinstance(data, list) else [data]
+        return encode_rows(rows)
+
+
+def encode_rows(rows: Iterable[Any]) -> bytes:
+    """
+    Encodes rows as NDJSON, formatting values exactly as the JSON responses of the API.
+
+    Args:
+        rows (Iterable[Any]): The serialized rows.
+
+    Returns:
+        bytes: One compact JSON document per row, each followed by a newline.
+    """
+    return b''.join(encode_json(row) + b'\n' for row in rows)
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compresses a stream of chunks into a single gzip member, flushing after every chunk
+    so that the client receives data as soon as it is produced.
+
+    Args:
+        chunks (Iterable[bytes]): The uncompressed chunks.
+
+    Yields:
+        bytes: The compressed chunks.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def ndjson_response(chunks: Iterable[list[Any]], request: Request) -> StreamingHttpResponse:
+    """
+    Streams chunks of serialized rows as NDJSON, gzip-compressed if the client accepts it.
+
+    Args:
+        chunks (Iterable[list[Any]]): Lazily produced chunks of serialized rows.
+        request (Request): The request, used to check the `Accept-Encoding` header.
+
+    Returns:
+        StreamingHttpResponse: The streaming response.
+    """
+    content: Iterable[bytes] = (encode_rows(rows) for rows in chunks)
+    compress: bool = bool(ACCEPTS_GZIP_RE.search(request.headers.get('Accept-Encoding', '')))
+
+    if compress:
+        content = gzip_stream(content)
+
+    response: StreamingHttpResponse = StreamingHttpResponse(content, content_type=NDJSONRenderer.media_type)
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+# Upper bounds of the latency histograms, in seconds.
+DURATION_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Upper bounds of the histogram of SQL queries per request.
+QUERY_COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Type and help text of every metric, in the order they are exposed.
+METRICS: dict[str, tuple[str, str]] = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Time spent handling requests, by route and method.'),
+    'http_request_db_queries': ('histogram', 'SQL queries run per request, by route and method.'),
+    'db_queries_total': ('counter', 'SQL queries run while handling requests, by route and method.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent running SQL queries while handling requests, by route and method.'),
+    'http_client_request_duration_seconds': ('histogram', 'Duration of outbound HTTP requests, by target, method, path and status.'),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+FILE_PREFIX: str = 'metrics-'
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, as exposed by Prometheus.
+    """
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        # One count per bucket plus the +Inf bucket; made cumulative when exposed
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of the current process.
+
+    Updating a metric only takes a lock and a dictionary lookup, so it is cheap enough to run on every
+    request and every SQL query.
+    """
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float, buckets: tuple[float, ...] = DURATION_BUCKETS) -> None:
+        with self.lock:
+            histogram: Optional[Histogram] = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns the current values of every metric as JSON-serializable data.
+        """
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [
+                    [name, list(labels), list(histogram.buckets), list(histogram.counts), histogram.sum]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+
+registry: MetricsRegistry = MetricsRegistry()
+
+_last_flush: float = 0.0
+
+
+def record_request(method: str, route: str, status_code: int, duration: float, queries: int, query_duration: float) -> None:
+    """
+    Records a handled request.
+    """
+    labels: Labels = (('route', route), ('method', method))
+    registry.inc('http_requests_total', labels + (('status', str(status_code)),))
+    registry.observe('http_request_duration_seconds', labels, duration)
+    registry.observe('http_request_db_queries', labels, queries, QUERY_COUNT_BUCKETS)
+    registry.inc('db_queries_total', labels, queries)
+    registry.inc('db_query_duration_seconds_total', labels, query_duration)
+
+
+def record_outbound(target: str, method: str, path: str, status: str, duration: float) -> None:
+    """
+    Records an outbound HTTP request.
+
+    Args:
+        target (str): The service called, e.g. 'product_manager'.
+        method (str): The HTTP method.
+        path (str): The path called, without IDs or query string, to keep the number of series bounded.
+        status (str): The status code of the response, or 'error' if no response was received.
+        duration (float): Seconds until the response was received or the request failed.
+    """
+    registry.observe(
+        'http_client_request_duration_seconds',
+        (('target', target), ('method', method), ('path', path), ('status', status)),
+        duration,
+    )
+
+
+def flush(directory: str, interval: float = 0) -> None:
+    """
+    Writes the metrics of the current process to `directory`, so that every worker can expose them.
+
+    Args:
+        directory (str): The directory shared by the workers.
+        interval (float): Minimum seconds between two writes; calls made sooner do nothing.
+    """
+    global _last_flush
+
+    now: float = time.monotonic()
+    if now - _last_flush < interval:
+        return
+    _last_flush = now
+
+    path: Path = Path(directory) / f'{FILE_PREFIX}{os.getpid()}.json'
+    temporary: Path = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(registry.snapshot()))
+    # Readers never see a partially written file
+    os.replace(temporary, path)
+
+
+def collect(directory: Optional[str]) -> list[dict[str, Any]]:
+    """
+    Returns the snapshots of every worker: the live metrics of the current process, plus the last
+    metrics written by the other processes if a directory is shared.
+    """
+    snapshots: list[dict[str, Any]] = [registry.snapshot()]
+    if not directory:
+        return snapshots
+
+    own_file: str = f'{FILE_PREFIX}{os.getpid()}.json'
+    for path in Path(directory).glob(f'{FILE_PREFIX}*.json'):
+        if path.name == own_file:
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Removed or replaced while being read
+            continue
+    return snapshots
+
+
+def format_labels(labels: Iterable[Iterable[str]]) -> str:
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    pairs: list[str] = [f'{name}="{escape(value)}"' for name, value in labels]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(snapshots: list[dict[str, Any]]) -> str:
+    """
+    Merges the snapshots of several processes and renders them in the Prometheus text format.
+
+    Args:
+        snapshots (list[dict[str, Any]]): Snapshots returned by `MetricsRegistry.snapshot`.
+
+    Returns:
+        str: The exposition text.
+    """
+    counters: dict[str, dict[tuple, float]] = {}
+    histograms: dict[str, dict[tuple, list[Any]]] = {}
+
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            series: dict[tuple, float] = counters.setdefault(name, {})
+            key: tuple = tuple(map(tuple, labels))
+            series[key] = series.get(key, 0) + value
+        for name, labels, buckets, counts, total in snapshot['histograms']:
+            series_h: dict[tuple, list[Any]] = histograms.setdefault(name, {})
+            key = tuple(map(tuple, labels))
+            if key not in series_h:
+                series_h[key] = [buckets, [0] * len(counts), 0.0]
+            merged: list[Any] = series_h[key]
+            merged[1] = [a + b for a, b in zip(merged[1], counts)]
+            merged[2] += total
+
+    lines: list[str] = []
+    for name, (metric_type, help_text) in METRICS.items():
+        if name not in counters and name not in histograms:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+        for labels, value in sorted(counters.get(name, {}).items()):
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+
+        for labels, (buckets, counts, total) in sorted(histograms.get(name, {}).items()):
+            cumulative: int = 0
+            for bound, count in zip([*buckets, '+Inf'], counts):
+                cumulative += count
+                le: str = bound if isinstance(bound, str) else format_value(bound)
+                lines.append(f'{name}_bucket{format_labels([*labels, ("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,100 @@
+import time
+from typing import Any, Awaitable, Callable, Union
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from . import metrics
+
+# Route label of the requests that match no URL pattern, so unknown paths do not create new series.
+UNMATCHED_ROUTE: str = 'unmatched'
+
+
+class QueryTimer:
+    """
+    Database execute wrapper that counts the SQL queries of a request and the time spent running them.
+    """
+    __slots__ = ('count', 'duration')
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.duration: float = 0.0
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        started_at: float = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.count += 1
+
+
+def add_query_timer(timer: QueryTimer) -> None:
+    connection.execute_wrappers.append(timer)
+
+
+def remove_query_timer(timer: QueryTimer) -> None:
+    connection.execute_wrappers.remove(timer)
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status code, SQL queries and SQL time of every request, labelled by route
+    (the URL pattern, not the path, so that IDs do not create new series).
+
+    Should be the first middleware, so that the time spent in the others is measured too. Disabled
+    when `METRICS['ENABLED']` is false. With `METRICS['DIR']` set, the metrics of each worker process
+    are written there every `METRICS['FLUSH_INTERVAL']` seconds for the `/metrics` endpoint to merge.
+
+    Supports both WSGI and ASGI: when the rest of the chain is asynchronous, requests are measured without
+    switching to a thread for the whole request.
+    """
+    sync_capable: bool = True
+    async_capable: bool = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Union[HttpResponse, Awaitable[HttpResponse]]]) -> None:
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response: Callable[[HttpRequest], Union[HttpResponse, Awaitable[HttpResponse]]] = get_response
+        self.directory: str = settings.METRICS['DIR']
+        self.flush_interval: float = settings.METRICS['FLUSH_INTERVAL']
+        self.async_mode: bool = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Union[HttpResponse, Awaitable[HttpResponse]]:
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timer: QueryTimer = QueryTimer()
+        started_at: float = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response: HttpResponse = self.get_response(request)
+        duration: float = time.perf_counter() - started_at
+
+        self.record(request, response, duration, timer)
+        if self.directory:
+            metrics.flush(self.directory, self.flush_interval)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        timer: QueryTimer = QueryTimer()
+        started_at: float = time.perf_counter()
+        # The queries of an asynchronous request run in the thread that Django gives to the synchronous code of
+        # the request (views and ORM calls wrapped in sync_to_async), on the connection of that thread
+        await sync_to_async(add_query_timer)(timer)
+        try:
+            response: HttpResponse = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_query_timer)(timer)
+        duration: float = time.perf_counter() - started_at
+
+        self.record(request, response, duration, timer)
+        if self.directory:
+            await sync_to_async(metrics.flush)(self.directory, self.flush_interval)
+        return response
+
+    def record(self, request: HttpRequest, response: HttpResponse, duration: float, timer: QueryTimer) -> None:
+        route: str = request.resolver_match.route if request.resolver_match else UNMATCHED_ROUTE
+        metrics.record_request(request.method, route, response.status_code, duration, timer.count, timer.duration)
@@ -0,0 +1,187 @@
+import base64
+import binascii
+import json
+from decimal import InvalidOperation
+from typing import Any, Callable, Optional
+from django.db.models import Q, QuerySet
+from rest_framework.request import Request
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor, page size or ordering cannot be parsed.
+    """
+
+
+class KeysetPagination:
+    """
+    Keyset (cursor) pagination on (`<ordering field>`, `id`).
+
+    Each page is fetched with a range condition on the last row of the previous page instead of an
+    OFFSET, so its cost does not depend on how deep the client pages. The cursor is opaque to clients
+    and only valid for the ordering it was issued for.
+
+    Subclasses declare the orderings they support, each of which should be backed by an index, and the
+    default page size:
+
+        class ProductPagination(KeysetPagination):
+            orderings = {'id': ('id', int), '-price': ('price', Decimal)}
+            default_ordering = 'id'
+
+            def get_default_limit(self) -> int:
+                return settings.PRODUCT_PAGINATION['PAGE_SIZE']
+    """
+    cursor_query_param: str = 'cursor'
+    limit_query_param: str = 'limit'
+    # None when clients cannot choose the ordering, which is then always `default_ordering`.
+    ordering_query_param: Optional[str] = 'ordering'
+    max_limit: int = 1000
+
+    # Orderings accepted, mapped to the field they sort by and the function reading its value back from a cursor.
+    # A leading '-' sorts in descending order.
+    orderings: dict[str, tuple[str, Callable[[str], Any]]] = {}
+    default_ordering: str = 'id'
+
+    def __init__(self) -> None:
+        self.next_url: Optional[str] = None
+
+    def get_default_limit(self) -> int:
+        """
+        Returns the page size used when the client does not request one.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def encode_cursor(ordering: str, value: Any, pk: int) -> str:
+        """
+        Encodes the position of a row as an opaque cursor.
+
+        Args:
+            ordering (str): The ordering of the page.
+            value (Any): The value of the ordering field of the row.
+            pk (int): The primary key of the row.
+
+        Returns:
+            str: The cursor.
+        """
+        return base64.urlsafe_b64encode(json.dumps([ordering, str(value), pk]).encode()).decode()
+
+    def decode_cursor(self, cursor: str, ordering: str) -> tuple[Any, int]:
+        """
+        Decodes a cursor produced by `encode_cursor`.
+
+        Args:
+            cursor (str): The cursor.
+            ordering (str): The ordering of the requested page.
+
+        Returns:
+            tuple[Any, int]: The value of the ordering field and the primary key of the last row of the previous page.
+
+        Raises:
+            InvalidCursor: If the cursor is malformed or was issued for another ordering.
+        """
+        try:
+            cursor_ordering, value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if cursor_ordering != ordering or not isinstance(value, str) or not isinstance(pk, int):
+                raise ValueError
+
+            _, parse = self.orderings[ordering]
+            return parse(value), pk
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, InvalidOperation):
+            raise InvalidCursor('Invalid cursor')
+
+    def get_limit(self, request: Request) -> int:
+        """
+        Returns the page size requested by the client, bounded by `max_limit`.
+
+        Raises:
+            InvalidCursor: If the page size is not a positive integer.
+        """
+        raw_limit: Optional[str] = request.query_params.get(self.limit_query_param)
+        if raw_limit is None:
+            return self.get_default_limit()
+
+        try:
+            limit: int = int(raw_limit)
+        except ValueError:
+            raise InvalidCursor("'limit' must be a positive integer")
+
+        if limit <= 0:
+            raise InvalidCursor("'limit' must be a positive integer")
+        return min(limit, self.max_limit)
+
+    def get_ordering(self, request: Request) -> str:
+        """
+        Returns the ordering requested by the client, `default_ordering` if none.
+
+        Raises:
+            InvalidCursor: If the ordering is not supported.
+        """
+        if self.ordering_query_param is None:
+            return self.default_ordering
+
+        ordering: str = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        if ordering not in self.orderings:
+            raise InvalidCursor(f"'{self.ordering_query_param}' must be one of: {', '.join(self.orderings)}")
+        return ordering
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, columns: list[str]) -> list[tuple]:
+        """
+        Returns the page of `queryset` following the cursor of the request, and prepares the next link.
+
+        Args:
+            queryset (QuerySet): The rows to paginate, read with `values_list(*columns)`. Any ordering is
+                                 replaced by the requested one.
+            request (Request): The request containing the optional `cursor`, `limit` and `ordering` parameters.
+            columns (list[str]): The columns of the rows, which must include `id` and the ordering fields.
+
+        Returns:
+            list[tuple]: The rows of the page.
+
+        Raises:
+            InvalidCursor: If the cursor, page size or ordering are malformed.
+        """
+        limit: int = self.get_limit(request)
+        ordering: str = self.get_ordering(request)
+        field, _ = self.orderings[ordering]
+        descending: bool = ordering.startswith('-')
+        cursor: Optional[str] = request.query_params.get(self.cursor_query_param)
+
+        if cursor:
+            value, pk = self.decode_cursor(cursor, ordering)
+            after: str = 'lt' if descending else 'gt'
+            if field == 'id':
+                queryset = queryset.filter(**{f'pk__{after}': pk})
+            else:
+                queryset = queryset.filter(Q(**{f'{field}__{after}': value}) | Q(**{field: value, f'pk__{after}': pk}))
+
+        order: list[str] = ['-pk' if descending else 'pk']
+        if field != 'id':
+            order.insert(0, f'-{field}' if descending else field)
+
+        # Fetch one extra row to know whether there is a next page
+        rows: list[tuple] = list(queryset.order_by(*order)[:limit + 1])
+        page: list[tuple] = rows[:limit]
+
+        if len(rows) > limit:
+            last: tuple = page[-1]
+            self.next_url = replace_query_param(
+                request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_cursor(ordering, last[columns.index(field)], last[columns.index('id')]),
+            )
+
+        return page
+
+    def get_paginated_data(self, data: list[Any]) -> dict[str, Any]:
+        """
+        Wraps the serialized rows of a page together with the link to the next page.
+
+        Args:
+            data (list[Any]): The serialized rows.
+
+        Returns:
+            dict[str, Any]: The response body.
+        """
+        return {'next': self.next_url, 'results': data}
@@ -0,0 +1,41 @@
+from typing import Any, Optional
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from .renderers import MSGPACK_MEDIA_TYPE
+
+
+def decode_msgpack(content: bytes) -> Any:
+    return msgpack.unpackb(content, raw=False)
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parser for JSON based on orjson.
+    Accepts the same documents as `JSONParser` with strict JSON: NaN and Infinity are rejected.
+    """
+    def parse(self, stream: Any, media_type: Optional[str] = None, parser_context: Optional[dict] = None) -> Any:
+        encoding: str = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            content: Any = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except ValueError as error:
+            raise ParseError(f'JSON parse error - {error}')
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parser for MessagePack request bodies (`application/msgpack`).
+    """
+    media_type: str = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream: Any, media_type: Optional[str] = None, parser_context: Optional[dict] = None) -> Any:
+        try:
+            return decode_msgpack(stream.read())
+        except ValueError as error:
+            raise ParseError(f'MessagePack parse error - {error}')
@@ -0,0 +1,181 @@
+import cProfile
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Optional
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+
+# Request header that asks for the request to be profiled, and response header with the ID of the capture.
+PROFILE_HEADER: str = 'X-Profile'
+PROFILE_ID_HEADER: str = 'X-Profile-Id'
+
+# Files written for each capture, by format.
+CAPTURE_FORMATS: dict[str, str] = {
+    'prof': 'cProfile statistics, readable with pstats or snakeviz',
+    'collapsed': 'Sampled stacks in the collapsed format of flamegraph.pl and speedscope',
+}
+
+UNMATCHED_ROUTE: str = 'unmatched'
+
+# Held while a request of this process is being profiled. Only one profiler can be active per process
+# (Python 3.12+ rejects a second one), so concurrent requests are served without profiling meanwhile.
+capture_lock: threading.Lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread at a fixed interval, from a background thread.
+
+    cProfile only records which function called which, so the collapsed stacks used to draw
+    flame graphs are built from these samples instead.
+    """
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id: int = thread_id
+        self.interval: float = interval
+        self.stacks: Counter = Counter()
+        self.stopped: threading.Event = threading.Event()
+        self.thread: threading.Thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread.ident is not None:
+            self.thread.join()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            names: list[str] = []
+            while frame is not None:
+                names.append(f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_qualname}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples in the collapsed format: one line per stack, root first, followed by its count.
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def capture_directory() -> Path:
+    return Path(settings.PROFILING['DIR'])
+
+
+def capture_id(method: str, route: str, duration_ms: int) -> str:
+    """
+    Returns the ID of a capture, also used as the name of its files, tagged with its route and duration.
+    """
+    slug: str = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    timestamp: str = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    return f'{timestamp}-{method}-{slug}-{duration_ms}ms-{uuid.uuid4().hex[:6]}'
+
+
+def list_captures() -> list[dict[str, Any]]:
+    """
+    Returns the metadata of every capture in the profiling directory, slowest first.
+    """
+    captures: list[dict[str, Any]] = []
+    for path in capture_directory().glob('*.json'):
+        try:
+            captures.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Removed while being read
+            continue
+    return sorted(captures, key=lambda capture: capture['duration_ms'], reverse=True)
+
+
+def prune_captures(directory: Path, keep: int) -> None:
+    """
+    Deletes the oldest captures beyond the `keep` most recent ones.
+    """
+    metadata: list[Path] = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in metadata[keep:]:
+        for extension in ('json', *CAPTURE_FORMATS):
+            path.with_suffix(f'.{extension}').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    Runs selected requests under cProfile and a stack sampler, and saves both profiles to `PROFILING['DIR']`.
+
+    A request is profiled when `PROFILING['ENABLED']` is true and either it has the `X-Profile: 1`
+    header or it is picked at random with probability `PROFILING['SAMPLE_RATE']`. Only the most
+    recent `PROFILING['MAX_CAPTURES']` captures are kept. Requests arriving while another one is being
+    profiled are not profiled.
+
+    Should come right after `MetricsMiddleware`, so that the other middleware is profiled too.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response: Callable[[HttpRequest], HttpResponse] = get_response
+        self.directory: Path = capture_directory()
+        self.sample_rate: float = settings.PROFILING['SAMPLE_RATE']
+        self.stack_interval: float = settings.PROFILING['STACK_INTERVAL']
+        self.max_captures: int = settings.PROFILING['MAX_CAPTURES']
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def should_profile(self, request: HttpRequest) -> bool:
+        if request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes'):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not self.should_profile(request) or not capture_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            return self.profile(request)
+        finally:
+            capture_lock.release()
+
+    def profile(self, request: HttpRequest) -> HttpResponse:
+        """
+        Serves a request under the profilers and saves the capture.
+        """
+        profiler: cProfile.Profile = cProfile.Profile()
+        sampler: StackSampler = StackSampler(threading.get_ident(), self.stack_interval)
+        started_at: float = time.perf_counter()
+        try:
+            sampler.start()
+            profiler.enable()
+            response: HttpResponse = self.get_response(request)
+        finally:
+            profiler.disable()
+            duration: float = time.perf_counter() - started_at
+            sampler.stop()
+
+        route: str = request.resolver_match.route if request.resolver_match else UNMATCHED_ROUTE
+        capture: str = capture_id(request.method, route, round(duration * 1000))
+        profiler.dump_stats(self.directory / f'{capture}.prof')
+        (self.directory / f'{capture}.collapsed').write_text(sampler.collapsed())
+        # Written last: a capture is only listed once its profiles are complete
+        (self.directory / f'{capture}.json').write_text(json.dumps({
+            'id': capture,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }))
+        prune_captures(self.directory, self.max_captures)
+
+        response[PROFILE_ID_HEADER] = capture
+        return response
@@ -0,0 +1,124 @@
+from decimal import Decimal
+from typing import Any, Optional
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+MSGPACK_MEDIA_TYPE: str = 'application/msgpack'
+
+# Non-string keys are converted as the standard library does; dates are left to `JSONEncoder` so that
+# they are formatted exactly as DRF formats them.
+ORJSON_OPTIONS: int = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+# Line and paragraph separators, escaped by DRF because they are not valid inside JavaScript strings.
+LINE_SEPARATORS: tuple[tuple[bytes, bytes], ...] = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+_encoder: JSONEncoder = JSONEncoder()
+
+
+def exact_float(value: Decimal) -> Optional[float]:
+    """
+    Returns a decimal as a float, or None if the float cannot hold its exact value.
+    """
+    number: float = float(value)
+    return number if value.is_finite() and Decimal(repr(number)) == value else None
+
+
+def json_default(value: Any) -> Any:
+    """
+    Encodes the values orjson does not handle natively.
+
+    DRF renders decimals through `float`, e.g. `37.5` for `Decimal('37.50')`. The same text is produced
+    whenever the float holds the exact value; otherwise the exact digits are written instead of a rounded float.
+    """
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            raise TypeError(f'Out of range decimal value: {value}')
+        number: Optional[float] = exact_float(value)
+        return orjson.Fragment(repr(number) if number is not None else format(value, 'f'))
+    return _encoder.default(value)
+
+
+def msgpack_default(value: Any) -> Any:
+    """
+    Encodes the values MessagePack does not handle natively, as they appear in the JSON responses.
+    Decimals become floats when that is exact and strings otherwise, so no precision is lost.
+    """
+    if isinstance(value, Decimal):
+        number: Optional[float] = exact_float(value)
+        return number if number is not None else format(value, 'f')
+    return _encoder.default(value)
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Encodes data as compact JSON, byte for byte as DRF's `JSONRenderer` does with its default settings.
+    """
+    content: bytes = orjson.dumps(data, default=json_default, option=ORJSON_OPTIONS)
+    if b'\xe2\x80' in content:
+        for separator, escaped in LINE_SEPARATORS:
+            content = content.replace(separator, escaped)
+    return content
+
+
+def encode_msgpack(data: Any) -> bytes:
+    return msgpack.packb(data, default=msgpack_default, use_bin_type=True)
+
+
+def representation_etag(request: Request, etag: str) -> str:
+    """
+    Tags the ETag of some data with the format negotiated for the response.
+
+    Every format is a different representation of the same data, with different bytes, so each needs its own
+    strong ETag; otherwise a client or cache could validate the bytes of one format against another. JSON
+    keeps the untagged ETag.
+
+    Args:
+        request (Request): The request, after content negotiation.
+        etag (str): The ETag of the data, without quotes.
+
+    Returns:
+        str: The ETag of the representation, without quotes.
+    """
+    renderer: Optional[BaseRenderer] = getattr(request, 'accepted_renderer', None)
+    if renderer is None or renderer.format == 'json':
+        return etag
+    return f'{etag}-{renderer.format}'
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer for JSON based on orjson.
+
+    Produces the same output as `JSONRenderer` several times faster. Indented output (e.g. requested
+    with `Accept: application/json; indent=4`) and non-default JSON settings fall back to `JSONRenderer`.
+    """
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[dict] = None) -> bytes:
+        if data is None:
+            return b''
+
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return encode_json(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer for MessagePack, a compact binary equivalent of the JSON responses.
+    Lets clients negotiate `application/msgpack`.
+    """
+    media_type: str = MSGPACK_MEDIA_TYPE
+    format: str = 'msgpack'
+    charset: Optional[str] = None
+    render_style: str = 'binary'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[dict] = None) -> bytes:
+        if data is None:
+            return b''
+        return encode_msgpack(data)
@@ -0,0 +1,92 @@
+from typing import Any, Callable, Iterable, Optional
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+# Fields whose representation is the value read from the database, so no conversion is needed.
+PASSTHROUGH_FIELDS: tuple[type[serializers.Field], ...] = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+)
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer of rows fetched with `values_list()`.
+
+    The fields, their order and their converters are taken once from a `ModelSerializer`, so the output is
+    exactly that of the serializer, without building a model instance or walking the serializer fields for
+    every row. Only fields backed by a column of the model are supported, plus nested serializers, whose
+    representations are looked up by the primary key of each row (see `serialize`).
+
+    Usage:
+        serializer = ValuesSerializer(ProductSerializer)
+        data = serializer.serialize(Product.objects.values_list(*serializer.columns))
+    """
+    def __init__(self, serializer_class: type[serializers.ModelSerializer]) -> None:
+        model_serializer: serializers.ModelSerializer = serializer_class()
+        pk_column: str = serializer_class.Meta.model._meta.pk.attname
+
+        # Columns to read, in the order of the values of each row
+        self.columns: list[str] = []
+        # For each output field: its name, the position of its column and its converter, if any
+        self.fields: list[tuple[str, int, Optional[Callable[[Any], Any]]]] = []
+        # Names of the nested serializers, filled in from their column (the primary key of the row)
+        self.nested: set[str] = set()
+
+        for name, field in model_serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                self.nested.add(name)
+                self.fields.append((name, self.column_index(pk_column), None))
+                continue
+            if field.source == '*' or '.' in field.source or isinstance(field, serializers.SerializerMethodField):
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{name} is not backed by a column')
+
+            converter: Optional[Callable[[Any], Any]] = (
+                None if type(field) in PASSTHROUGH_FIELDS or isinstance(field, serializers.PrimaryKeyRelatedField)
+                else field.to_representation
+            )
+            self.fields.append((name, self.column_index(field.source), converter))
+
+    def column_index(self, column: str) -> int:
+        if column not in self.columns:
+            self.columns.append(column)
+        return self.columns.index(column)
+
+    def serialize(self, rows: Iterable[tuple], nested: Optional[dict[str, dict[Any, Any]]] = None) -> list[dict[str, Any]]:
+        """
+        Serializes rows whose first values are those of `columns`; any further values are ignored.
+
+        Args:
+            rows (Iterable[tuple]): The rows, as returned by `values_list(*columns)`.
+            nested (Optional[dict[str, dict[Any, Any]]]): For each nested serializer, the representations
+                of the related objects keyed by the primary key of the row. Rows without any get `[]`.
+
+        Returns:
+            list[dict[str, Any]]: The representation of every row.
+        """
+        nested = nested or {}
+        missing: set[str] = self.nested - set(nested)
+        if missing:
+            raise ValueError(f'Missing nested representations: {", ".join(sorted(missing))}')
+
+        fields: list[tuple[str, int, Optional[Callable[[Any], Any]], Optional[dict[Any, Any]]]] = [
+            (name, index, converter, nested.get(name)) for name, index, converter in self.fields
+        ]
+        data: list[dict[str, Any]] = []
+
+        for row in rows:
+            representation: dict[str, Any] = {}
+            for name, index, converter, related in fields:
+                value: Any = row[index]
+                if related is not None:
+                    representation[name] = related.get(value, [])
+                elif converter is None or value is None:
+                    representation[name] = value
+                else:
+                    representation[name] = converter(value)
+            data.append(representation)
+
+        return data
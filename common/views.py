@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import Any
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+from . import metrics, profiling
+
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_PROFILE_LIMIT: int = 50
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Exposes the request metrics of every worker process in the Prometheus text format.
+    """
+    return HttpResponse(metrics.render(metrics.collect(settings.METRICS['DIR'])), content_type=CONTENT_TYPE)
+
+
+@require_GET
+def profile_list_view(request: HttpRequest) -> JsonResponse:
+    """
+    Lists the profiled requests, slowest first, with the URLs of their profiles.
+
+    Query parameters:
+        limit: Maximum number of captures returned (50 by default).
+        route: Only captures of this route, e.g. `api/orders/`.
+    """
+    if not settings.PROFILING['ENABLED']:
+        raise Http404('Profiling is disabled')
+
+    try:
+        limit: int = int(request.GET.get('limit', DEFAULT_PROFILE_LIMIT))
+        if limit < 0:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a non-negative integer'}, status=400)
+
+    captures: list[dict[str, Any]] = profiling.list_captures()
+    if 'route' in request.GET:
+        captures = [capture for capture in captures if capture['route'] == request.GET['route']]
+
+    for capture in captures[:limit]:
+        capture['files'] = {
+            extension: request.build_absolute_uri(reverse('profile-file', args=[capture['id'], extension]))
+            for extension in profiling.CAPTURE_FORMATS
+        }
+    return JsonResponse({'count': len(captures), 'results': captures[:limit]})
+
+
+@require_GET
+def profile_file_view(request: HttpRequest, capture: str, extension: str) -> FileResponse:
+    """
+    Downloads a profile of a capture: `prof` (cProfile statistics) or `collapsed` (sampled stacks).
+    """
+    if not settings.PROFILING['ENABLED'] or extension not in profiling.CAPTURE_FORMATS:
+        raise Http404('Profile not found')
+
+    path: Path = profiling.capture_directory() / f'{capture}.{extension}'
+    if not path.is_file():
+        raise Http404('Profile not found')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
@@ -1,8 +1,16 @@
+import os
+import sys
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Code shared by both projects (the `common` package) lives in the root of the repository.
+REPO_DIR = BASE_DIR.parent
+if str(REPO_DIR) not in sys.path:
+    sys.path.append(str(REPO_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -34,6 +42,19 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON is rendered and parsed with orjson, producing the same bytes as DRF's JSONRenderer.
+    # Clients may also negotiate MessagePack (`application/msgpack`) for smaller responses.
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.ORJSONRenderer',
+        'common.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.parsers.ORJSONParser',
+        'common.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -42,7 +63,95 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Keyset pagination of the order list (orders.pagination.OrderPagination).
+# Kept out of REST_FRAMEWORK: DRF warns about a PAGE_SIZE without a DEFAULT_PAGINATION_CLASS.
+
+ORDER_PAGINATION = {
+    # Orders per page when the client does not send `limit`.
+    'PAGE_SIZE': 100,
+}
+
+# Product Manager API
+# Every call to the Product Manager goes through orders.clients.ProductClient, configured here.
+
+PRODUCT_API = {
+    'BASE_URL': os.environ.get('PRODUCT_API_BASE_URL', 'http://127.0.0.1:8000/api/products/'),
+    # Seconds to wait for a connection and for each response, respectively.
+    'CONNECT_TIMEOUT': float(os.environ.get('PRODUCT_API_CONNECT_TIMEOUT', 2)),
+    'READ_TIMEOUT': float(os.environ.get('PRODUCT_API_READ_TIMEOUT', 5)),
+    # Retries for idempotent (GET) requests and for connections that could not be established.
+    'RETRIES': int(os.environ.get('PRODUCT_API_RETRIES', 2)),
+    # Keep-alive connections kept open per worker process.
+    'POOL_SIZE': int(os.environ.get('PRODUCT_API_POOL_SIZE', 10)),
+    # Consecutive failures that open the circuit, and seconds before a trial request is let through.
+    'CIRCUIT_BREAKER_THRESHOLD': int(os.environ.get('PRODUCT_API_CIRCUIT_BREAKER_THRESHOLD', 5)),
+    'CIRCUIT_BREAKER_RESET_TIMEOUT': float(os.environ.get('PRODUCT_API_CIRCUIT_BREAKER_RESET_TIMEOUT', 30)),
+    # Format requested for the responses of the Product Manager: 'msgpack' (smaller and faster to decode) or 'json'.
+    'FORMAT': os.environ.get('PRODUCT_API_FORMAT', 'msgpack'),
+}
+
+# Cache of product names and prices kept by the order manager.
+# BACKEND names a cache from CACHES to share entries between workers; by default each worker keeps its own.
+
+PRODUCT_CACHE = {
+    'MAX_SIZE': int(os.environ.get('PRODUCT_CACHE_MAX_SIZE', 1000)),
+    'TTL': float(os.environ.get('PRODUCT_CACHE_TTL', 60)),
+    'BACKEND': os.environ.get('PRODUCT_CACHE_BACKEND') or None,
+}
+
+# Idempotency keys of order creation requests (`Idempotency-Key` header).
+# TTL: seconds a completed request is remembered and replayed.
+# WAIT_TIMEOUT: seconds a duplicate request waits for the original one to finish before answering 409.
+# LOCK_TIMEOUT: seconds after which a request still in progress is considered abandoned and can be retried.
+
+IDEMPOTENCY = {
+    'TTL': float(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)),
+    'WAIT_TIMEOUT': float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 10)),
+    'LOCK_TIMEOUT': float(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60)),
+}
+
+# Asynchronous order creation (orders.outbox). When ENABLED, new orders are stored as pending together with
+# an outbox row and answered with 202; the `process_order_outbox` command reserves their stock in batches
+# of BATCH_SIZE, polling every POLL_INTERVAL seconds. A claimed row is retried by another worker after LEASE
+# seconds; rows that fail because the Product Manager is unavailable are retried after RETRY_DELAY seconds,
+# doubling on every attempt up to MAX_RETRY_DELAY.
+
+ORDER_OUTBOX = {
+    'ENABLED': os.environ.get('ORDER_OUTBOX_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    'BATCH_SIZE': int(os.environ.get('ORDER_OUTBOX_BATCH_SIZE', 100)),
+    'POLL_INTERVAL': float(os.environ.get('ORDER_OUTBOX_POLL_INTERVAL', 1)),
+    'LEASE': float(os.environ.get('ORDER_OUTBOX_LEASE', 60)),
+    'RETRY_DELAY': float(os.environ.get('ORDER_OUTBOX_RETRY_DELAY', 1)),
+    'MAX_RETRY_DELAY': float(os.environ.get('ORDER_OUTBOX_MAX_RETRY_DELAY', 60)),
+}
+
+# Request metrics exposed on /metrics in the Prometheus text format (common.middleware.MetricsMiddleware).
+# DIR: directory shared by the worker processes of a server, each writing its metrics there at most every
+# FLUSH_INTERVAL seconds so that any worker can expose the totals. Empty it when the server starts.
+# Without it, each worker only exposes its own metrics.
+
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+    'DIR': os.environ.get('METRICS_DIR') or None,
+    'FLUSH_INTERVAL': float(os.environ.get('METRICS_FLUSH_INTERVAL', 5)),
+}
+
+# Profiling of selected requests (common.profiling.ProfilingMiddleware), for debugging only.
+# When ENABLED, requests with the `X-Profile: 1` header, plus a random SAMPLE_RATE fraction of all requests,
+# run under cProfile and a stack sampler (every STACK_INTERVAL seconds). Their profiles are saved to DIR,
+# keeping the MAX_CAPTURES most recent, and listed slowest first on /debug/profiles/.
+
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    'DIR': os.environ.get('PROFILING_DIR') or BASE_DIR / 'profiles',
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', 0)),
+    'STACK_INTERVAL': float(os.environ.get('PROFILING_STACK_INTERVAL', 0.001)),
+    'MAX_CAPTURES': int(os.environ.get('PROFILING_MAX_CAPTURES', 200)),
+}
+
 MIDDLEWARE = [
+    'common.middleware.MetricsMiddleware',
+    'common.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +185,50 @@ WSGI_APPLICATION = 'order_manager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the backend: 'sqlite' (default) or 'postgresql'. Connections are kept open between
+# requests for DB_CONN_MAX_AGE seconds and checked before being reused.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'order_manager'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
-}
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME') or BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Seconds a writer waits for another writer to commit before failing with "database is locked".
+                'timeout': float(os.environ.get('DB_TIMEOUT', 20)),
+                # Take the write lock when a transaction begins, so that concurrent writers queue on the timeout
+                # instead of failing when they try to upgrade a read lock halfway through.
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets reads run while a write is in progress; with it, synchronous=NORMAL only syncs on
+                # checkpoints and stays consistent after a crash. Reads go through a 256 MB memory map.
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'sqlite' or 'postgresql', not {DB_ENGINE!r}")
 
 
 # Password validation
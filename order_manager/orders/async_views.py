@@ -0,0 +1,77 @@
+from typing import Any, Optional
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from common.renderers import encode_json
+from .clients import ProductServiceError, async_product_client
+from .idempotency import async_idempotent
+from .models import Order
+from .outbox import accept_order
+from .serializers import OrderSerializer
+from .services import aplace_order
+from .views import validate_and_group_items
+
+
+def render_json(data: Any, status_code: int) -> HttpResponse:
+    """
+    Renders a response body exactly as the DRF views of this API do.
+
+    Args:
+        data (Any): The data to render.
+        status_code (int): The HTTP status code of the response.
+
+    Returns:
+        HttpResponse: The rendered JSON response.
+    """
+    return HttpResponse(encode_json(data), content_type='application/json', status=status_code)
+
+
+@csrf_exempt
+@require_POST
+@async_idempotent
+async def order_create_async(request: HttpRequest) -> HttpResponse:
+    """
+    Creates a new order without blocking the worker while the Product Manager is called.
+
+    Accepts the same body and returns the same responses as `OrderListCreateView.post`, including the `202`
+    of a pending order when the outbox is enabled and the `Idempotency-Key` header. When served through `order_manager/asgi.py`, a single
+    worker process can keep many orders in flight at once.
+
+    Args:
+        request (HttpRequest): The request containing the order data.
+
+    Returns:
+        HttpResponse: A response containing the serialized order created or validation errors.
+    """
+    try:
+        data: Any = orjson.loads(request.body or b'{}')
+    except ValueError as error:
+        return render_json({'detail': f'JSON parse error - {error}'}, status.HTTP_400_BAD_REQUEST)
+
+    items: Optional[list[dict[str, int]]] = data.get('items', []) if isinstance(data, dict) else []
+    if not items:
+        return render_json({'error': 'No items provided'}, status.HTTP_400_BAD_REQUEST)
+
+    grouped_items, error = validate_and_group_items(items)
+
+    if error:
+        return render_json({'error': error}, status.HTTP_400_BAD_REQUEST)
+
+    if settings.ORDER_OUTBOX['ENABLED']:
+        # The stock is reserved later by the outbox worker
+        pending_data: dict[str, Any] = await sync_to_async(lambda: OrderSerializer(accept_order(grouped_items)).data)()
+        return render_json(pending_data, status.HTTP_202_ACCEPTED)
+
+    try:
+        async with async_product_client(shared=isinstance(request, ASGIRequest)) as client:
+            order: Order = await aplace_order(grouped_items, client)
+    except ProductServiceError as error:
+        return render_json({'error': error.message}, error.status_code)
+
+    order_data: dict[str, Any] = await sync_to_async(lambda: OrderSerializer(order).data)()
+    return render_json(order_data, status.HTTP_201_CREATED)
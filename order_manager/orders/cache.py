@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from .clients import ProductData
+
+# Product fields kept in the cache. Stock is left out on purpose: it is always checked by the
+# Product Manager when it is reserved.
+CACHED_FIELDS: tuple[str, ...] = ('id', 'name', 'price')
+
+CACHE_KEY_PREFIX: str = 'orders:product:'
+
+
+class ProductCache:
+    """
+    Cache of product metadata (name and price) used to avoid fetching the same products on every order.
+
+    Entries live in an in-process LRU of `max_size` products and expire after `ttl` seconds. When
+    `backend` names a cache from the `CACHES` setting, entries are stored there instead, so that every
+    worker shares them and invalidations reach all of them.
+    """
+    def __init__(self, max_size: int, ttl: float, backend: Optional[str] = None) -> None:
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.backend: Optional[BaseCache] = caches[backend] if backend else None
+        self.entries: OrderedDict[int, tuple[float, ProductData]] = OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def snapshot(product: ProductData) -> ProductData:
+        """
+        Returns the cached subset of a product.
+        """
+        return {field: product[field] for field in CACHED_FIELDS}
+
+    def record(self, found: dict[int, ProductData], requested: int) -> None:
+        """
+        Updates the hit and miss counters after a lookup.
+        """
+        with self.lock:
+            self.hits += len(found)
+            self.misses += requested - len(found)
+
+    def get_many(self, product_ids: Iterable[int]) -> dict[int, ProductData]:
+        """
+        Looks up several products.
+
+        Args:
+            product_ids (Iterable[int]): The IDs of the products.
+
+        Returns:
+            dict[int, ProductData]: The cached products, keyed by ID. Missing or expired products are omitted.
+        """
+        product_ids = list(product_ids)
+
+        if self.backend is not None:
+            found: dict[int, ProductData] = {
+                product['id']: product
+                for product in self.backend.get_many([f'{CACHE_KEY_PREFIX}{product_id}' for product_id in product_ids]).values()
+            }
+            self.record(found, len(product_ids))
+            return found
+
+        found = {}
+        now: float = time.monotonic()
+        with self.lock:
+            for product_id in product_ids:
+                entry: Optional[tuple[float, ProductData]] = self.entries.get(product_id)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self.entries[product_id]
+                    continue
+                self.entries.move_to_end(product_id)
+                found[product_id] = entry[1]
+
+        self.record(found, len(product_ids))
+        return found
+
+    def set_many(self, products: Iterable[ProductData]) -> None:
+        """
+        Stores several products, evicting the least recently used ones beyond `max_size`.
+
+        Args:
+            products (Iterable[ProductData]): The products, as returned by the Product Manager.
+        """
+        snapshots: list[ProductData] = [self.snapshot(product) for product in products]
+
+        if self.backend is not None:
+            self.backend.set_many({f'{CACHE_KEY_PREFIX}{product["id"]}': product for product in snapshots}, timeout=self.ttl)
+            return
+
+        expires_at: float = time.monotonic() + self.ttl
+        with self.lock:
+            for product in snapshots:
+                self.entries[product['id']] = (expires_at, product)
+                self.entries.move_to_end(product['id'])
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Removes several products from the cache, or every product if no IDs are given.
+
+        Args:
+            product_ids (Optional[Iterable[int]]): The IDs of the products to remove.
+        """
+        if self.backend is not None:
+            if product_ids is None:
+                # Entries cannot be listed in a generic cache backend; they simply expire after the TTL
+                self.backend.clear()
+            else:
+                self.backend.delete_many([f'{CACHE_KEY_PREFIX}{product_id}' for product_id in product_ids])
+            return
+
+        with self.lock:
+            if product_ids is None:
+                self.entries.clear()
+                return
+            for product_id in product_ids:
+                self.entries.pop(product_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns the counters and configuration of the cache, to tune its size and TTL.
+        """
+        with self.lock:
+            lookups: int = self.hits + self.misses
+            return {
+                'backend': 'shared' if self.backend is not None else 'local',
+                'size': len(self.entries) if self.backend is None else None,
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_cache: Optional[ProductCache] = None
+_cache_lock: threading.Lock = threading.Lock()
+
+
+def get_product_cache() -> ProductCache:
+    """
+    Returns the product cache of the current worker process, creating it on first use.
+
+    Returns:
+        ProductCache: A cache configured from the `PRODUCT_CACHE` setting.
+    """
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config: dict[str, Any] = settings.PRODUCT_CACHE
+                _cache = ProductCache(max_size=config['MAX_SIZE'], ttl=config['TTL'], backend=config['BACKEND'])
+
+    return _cache
@@ -0,0 +1,614 @@
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Callable, Optional, Union
+import httpx
+import orjson
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from urllib3.util.retry import Retry
+from common.metrics import record_outbound
+from common.parsers import decode_msgpack
+from common.renderers import MSGPACK_MEDIA_TYPE
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Target label of the outbound request metrics.
+METRICS_TARGET: str = 'product_manager'
+
+# Maximum number of IDs accepted by the Product Manager batch endpoint.
+MAX_BATCH_IDS: int = 500
+
+# Status codes worth retrying for idempotent requests.
+RETRY_STATUS_CODES: tuple[int, ...] = (
+    status.HTTP_502_BAD_GATEWAY,
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+    status.HTTP_504_GATEWAY_TIMEOUT,
+)
+
+# Errors raised before a request reaches the Product Manager because every connection of the local pool is
+# busy. They say nothing about the health of the service, so they do not trip the breaker. A connect timeout
+# is not one of them: it is what a down or unreachable Product Manager produces.
+LOCAL_HTTPX_ERRORS: tuple[type[httpx.HTTPError], ...] = (httpx.PoolTimeout,)
+
+# Media types the client can ask the Product Manager to respond with, by `PRODUCT_API['FORMAT']`.
+RESPONSE_MEDIA_TYPES: dict[str, str] = {
+    'json': 'application/json',
+    'msgpack': MSGPACK_MEDIA_TYPE,
+}
+
+ProductData = dict[str, Union[str, int, float]]
+
+
+class ProductServiceError(Exception):
+    """
+    Raised when the Product Manager rejects a request or cannot be reached.
+
+    Attributes:
+        message (str): Error message to report to the API client.
+        status_code (int): HTTP status code to report to the API client.
+    """
+    def __init__(self, message: str, status_code: int = status.HTTP_400_BAD_REQUEST) -> None:
+        super().__init__(message)
+        self.message: str = message
+        self.status_code: int = status_code
+
+
+class ProductServiceUnavailable(ProductServiceError):
+    """
+    Raised when the Product Manager times out, refuses connections, fails with a server error
+    or while the circuit breaker is open.
+    """
+    def __init__(self, message: str = 'Product service unavailable') -> None:
+        super().__init__(message, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class CircuitOpen(ProductServiceUnavailable):
+    """
+    Raised instead of calling the Product Manager while the circuit breaker is open, so the request was
+    never sent.
+    """
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a remote service is down.
+
+    After `failure_threshold` consecutive failures the circuit opens and every request is rejected
+    without touching the network. Once `reset_timeout` seconds have passed a single trial request is
+    let through: if it succeeds the circuit closes again, otherwise it stays open for another period.
+    """
+    CLOSED: str = 'closed'
+    OPEN: str = 'open'
+    HALF_OPEN: str = 'half-open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.failures: int = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_progress: bool = False
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Returns the current state of the circuit: closed, open or half-open.
+        """
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        Checks whether a request may be sent, reserving the trial slot when the circuit is half-open.
+
+        Returns:
+            bool: True if the request may be sent, False if it must fail fast.
+        """
+        with self.lock:
+            state: str = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """
+        Closes the circuit after a successful request.
+        """
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def release_trial(self) -> None:
+        """
+        Frees the trial slot of a half-open circuit after a request that did not tell whether the service
+        is back, e.g. because it was cancelled or could not be sent. At worst, this lets one more trial through.
+        """
+        with self.lock:
+            self.trial_in_progress = False
+
+    def record_failure(self) -> None:
+        """
+        Counts a failed request, opening the circuit once the threshold is reached.
+        """
+        with self.lock:
+            self.failures += 1
+            self.trial_in_progress = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning('Product service circuit opened after %d consecutive failures', self.failures)
+                self.opened_at = time.monotonic()
+
+
+def decode_response(response: Union[requests.Response, httpx.Response]) -> Any:
+    """
+    Decodes the body of a Product Manager response, as MessagePack or JSON depending on its content type.
+    """
+    if response.headers.get('Content-Type', '').split(';', 1)[0].strip() == MSGPACK_MEDIA_TYPE:
+        return decode_msgpack(response.content)
+    return orjson.loads(response.content)
+
+
+def stock_operation_body(items: list[dict[str, int]], reservation: Optional[str]) -> dict[str, Any]:
+    """
+    Returns the body of a multi-product stock operation.
+    """
+    if reservation is None:
+        return {'items': items}
+    return {'items': items, 'reservation': reservation}
+
+
+def stock_operation_result(status_code: int, get_payload: Callable[[], Any]) -> list[ProductData]:
+    """
+    Maps the response of a multi-product stock operation to its result or error.
+
+    Args:
+        status_code (int): The status code of the response.
+        get_payload (Callable[[], Any]): Returns the decoded body of the response.
+
+    Returns:
+        list[ProductData]: The updated products.
+
+    Raises:
+        ProductServiceError: If the operation was rejected.
+    """
+    if status_code in (status.HTTP_400_BAD_REQUEST, status.HTTP_404_NOT_FOUND, status.HTTP_409_CONFLICT):
+        raise ProductServiceError(get_payload().get('error', 'Failed to update stock'), status_code)
+
+    if status_code != 200:
+        raise ProductServiceError('Failed to update stock')
+
+    return get_payload()
+
+
+class ProductClient:
+    """
+    Client for the Product Manager API.
+
+    Keeps a pool of keep-alive connections, applies connect/read timeouts to every call, retries
+    idempotent reads and stops calling the service through a circuit breaker while it is down.
+    Responses are requested in `response_format` ('json' or 'msgpack').
+    """
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        retries: int,
+        pool_size: int,
+        circuit_breaker: CircuitBreaker,
+        response_format: str = 'json',
+    ) -> None:
+        self.base_url: str = base_url if base_url.endswith('/') else f'{base_url}/'
+        self.timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        self.circuit_breaker: CircuitBreaker = circuit_breaker
+
+        # Only GET requests are retried after being sent; connection errors are retried for every
+        # method because in that case the request never reached the Product Manager.
+        retry: Retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.1,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False,
+        )
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session: requests.Session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = RESPONSE_MEDIA_TYPES[response_format]
+
+    def request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends a request to the Product Manager through the connection pool and the circuit breaker.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path relative to the base URL of the Product Manager API.
+            **kwargs: Extra arguments passed to `requests.Session.request`.
+
+        Returns:
+            requests.Response: The response, for any status code below 500.
+
+        Raises:
+            ProductServiceUnavailable: If the circuit is open, the request fails at the network level
+                                       or the Product Manager answers with a server error.
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpen()
+
+        started_at: float = time.perf_counter()
+        try:
+            response: requests.Response = self.session.request(method, f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+        except requests.RequestException as error:
+            self.circuit_breaker.record_failure()
+            record_outbound(METRICS_TARGET, method, path, 'error', time.perf_counter() - started_at)
+            logger.warning('Product service %s %s failed: %s', method, path, error)
+            raise ProductServiceUnavailable() from error
+
+        elapsed: float = time.perf_counter() - started_at
+        record_outbound(METRICS_TARGET, method, path, str(response.status_code), elapsed)
+        logger.debug('Product service %s %s -> %d in %.1f ms', method, path, response.status_code, elapsed * 1000)
+
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+            raise ProductServiceUnavailable()
+
+        self.circuit_breaker.record_success()
+        return response
+
+    def get_products(self, product_ids: list[int]) -> dict[int, ProductData]:
+        """
+        Fetches several products, using one batch request per `MAX_BATCH_IDS` IDs.
+
+        Args:
+            product_ids (list[int]): The IDs of the products to fetch.
+
+        Returns:
+            dict[int, ProductData]: The products found, keyed by ID. Unknown IDs are omitted.
+
+        Raises:
+            ProductServiceError: If the Product Manager rejects the request or is unavailable.
+        """
+        products: dict[int, ProductData] = {}
+
+        for start in range(0, len(product_ids), MAX_BATCH_IDS):
+            chunk: list[int] = product_ids[start:start + MAX_BATCH_IDS]
+            response: requests.Response = self.request('GET', 'batch/', params={'ids': ','.join(map(str, chunk))})
+            if response.status_code != 200:
+                raise ProductServiceError('Failed to fetch products')
+            products.update({product['id']: product for product in decode_response(response)})
+
+        return products
+
+    def reserve_stock(self, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        """
+        Atomically decrements the stock of several products.
+
+        Args:
+            items (list[dict[str, int]]): The 'product_id'/'quantity' pairs to reserve.
+            reservation (Optional[str]): A token identifying the reservation, so that it can be released with
+                                         `release_stock` even if its outcome is unknown.
+
+        Returns:
+            list[ProductData]: The updated products.
+
+        Raises:
+            ProductServiceError: If a product does not exist or has insufficient stock, in which case no
+                                 stock was modified, or if the Product Manager is unavailable.
+        """
+        return self.stock_operation('stock/reserve/', items, reservation)
+
+    def release_stock(self, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        """
+        Atomically returns previously reserved stock of several products.
+
+        Args:
+            items (list[dict[str, int]]): The 'product_id'/'quantity' pairs to release.
+            reservation (Optional[str]): The token of the reservation to release. Its stock is given back only
+                                         if it was reserved, and the reservation is refused if it arrives later.
+
+        Returns:
+            list[ProductData]: The updated products.
+
+        Raises:
+            ProductServiceError: If a product does not exist or the Product Manager is unavailable.
+        """
+        return self.stock_operation('stock/release/', items, reservation)
+
+    def stock_operation(self, path: str, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        """
+        Sends a multi-product stock operation and maps its errors.
+
+        Args:
+            path (str): The path of the stock operation endpoint.
+            items (list[dict[str, int]]): The 'product_id'/'quantity' pairs to send.
+            reservation (Optional[str]): The token of the reservation, if any.
+
+        Returns:
+            list[ProductData]: The updated products.
+
+        Raises:
+            ProductServiceError: If the operation is rejected or the Product Manager is unavailable.
+        """
+        response: requests.Response = self.request('POST', path, json=stock_operation_body(items, reservation))
+        return stock_operation_result(response.status_code, lambda: decode_response(response))
+
+
+class AsyncProductClient:
+    """
+    Asynchronous client for the Product Manager API, used by the ASGI order creation path.
+
+    Shares the behaviour of `ProductClient`: a pool of keep-alive connections, connect/read timeouts,
+    retries for idempotent reads and the circuit breaker of the worker process. Requests for more
+    than `MAX_BATCH_IDS` products are sent concurrently.
+    """
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        retries: int,
+        pool_size: int,
+        circuit_breaker: CircuitBreaker,
+        response_format: str = 'json',
+    ) -> None:
+        self.base_url: str = base_url if base_url.endswith('/') else f'{base_url}/'
+        self.retries: int = retries
+        self.circuit_breaker: CircuitBreaker = circuit_breaker
+        self.client: httpx.AsyncClient = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            # Connections that could not be established are retried for every method.
+            transport=httpx.AsyncHTTPTransport(retries=retries),
+            headers={'Accept': RESPONSE_MEDIA_TYPES[response_format]},
+        )
+
+    async def aclose(self) -> None:
+        """
+        Closes the connections of the pool.
+        """
+        await self.client.aclose()
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a request to the Product Manager through the connection pool and the circuit breaker.
+
+        GET requests are retried on network errors and on 502/503/504 responses. Requests that could not be
+        sent because the local pool is exhausted (`LOCAL_HTTPX_ERRORS`) or that are cancelled do not count
+        as failures of the service.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path relative to the base URL of the Product Manager API.
+            **kwargs: Extra arguments passed to `httpx.AsyncClient.request`.
+
+        Returns:
+            httpx.Response: The response, for any status code below 500.
+
+        Raises:
+            ProductServiceUnavailable: If the circuit is open, the request fails at the network level
+                                       or the Product Manager answers with a server error.
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpen()
+
+        started_at: float = time.perf_counter()
+        try:
+            response: httpx.Response = await self.send(method, path, started_at, **kwargs)
+        except asyncio.CancelledError:
+            # Otherwise a cancelled trial would keep the circuit half-open, rejecting every request
+            self.circuit_breaker.release_trial()
+            raise
+
+        elapsed: float = time.perf_counter() - started_at
+        record_outbound(METRICS_TARGET, method, path, str(response.status_code), elapsed)
+        logger.debug('Product service %s %s -> %d in %.1f ms', method, path, response.status_code, elapsed * 1000)
+
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+            raise ProductServiceUnavailable()
+
+        self.circuit_breaker.record_success()
+        return response
+
+    async def send(self, method: str, path: str, started_at: float, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a request, retrying GET requests, and records network errors. See `request`.
+        """
+        attempts: int = self.retries + 1 if method == 'GET' else 1
+
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+
+            try:
+                response: httpx.Response = await self.client.request(method, path, **kwargs)
+            except httpx.HTTPError as error:
+                if attempt + 1 < attempts:
+                    continue
+                if isinstance(error, LOCAL_HTTPX_ERRORS):
+                    self.circuit_breaker.release_trial()
+                else:
+                    self.circuit_breaker.record_failure()
+                record_outbound(METRICS_TARGET, method, path, 'error', time.perf_counter() - started_at)
+                logger.warning('Product service %s %s failed: %s', method, path, error)
+                raise ProductServiceUnavailable() from error
+
+            if response.status_code in RETRY_STATUS_CODES and attempt + 1 < attempts:
+                continue
+            break
+
+        return response
+
+    async def get_products(self, product_ids: list[int]) -> dict[int, ProductData]:
+        """
+        Fetches several products, sending one batch request per `MAX_BATCH_IDS` IDs concurrently.
+
+        Args:
+            product_ids (list[int]): The IDs of the products to fetch.
+
+        Returns:
+            dict[int, ProductData]: The products found, keyed by ID. Unknown IDs are omitted.
+
+        Raises:
+            ProductServiceError: If the Product Manager rejects the request or is unavailable.
+        """
+        responses: list[httpx.Response] = await asyncio.gather(*(
+            self.request('GET', 'batch/', params={'ids': ','.join(map(str, product_ids[start:start + MAX_BATCH_IDS]))})
+            for start in range(0, len(product_ids), MAX_BATCH_IDS)
+        ))
+
+        products: dict[int, ProductData] = {}
+        for response in responses:
+            if response.status_code != 200:
+                raise ProductServiceError('Failed to fetch products')
+            products.update({product['id']: product for product in decode_response(response)})
+
+        return products
+
+    async def reserve_stock(self, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        """
+        Atomically decrements the stock of several products. See `ProductClient.reserve_stock`.
+        """
+        response: httpx.Response = await self.request('POST', 'stock/reserve/', json=stock_operation_body(items, reservation))
+        return stock_operation_result(response.status_code, lambda: decode_response(response))
+
+    async def release_stock(self, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        """
+        Atomically returns previously reserved stock of several products. See `ProductClient.release_stock`.
+        """
+        response: httpx.Response = await self.request('POST', 'stock/release/', json=stock_operation_body(items, reservation))
+        return stock_operation_result(response.status_code, lambda: decode_response(response))
+
+
+_client: Optional[ProductClient] = None
+_circuit_breaker: Optional[CircuitBreaker] = None
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncProductClient] = weakref.WeakKeyDictionary()
+_client_lock: threading.Lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Returns the circuit breaker of the current worker process, shared by the sync and async clients.
+
+    Returns:
+        CircuitBreaker: A circuit breaker configured from the `PRODUCT_API` setting.
+    """
+    global _circuit_breaker
+
+    if _circuit_breaker is None:
+        with _client_lock:
+            if _circuit_breaker is None:
+                config: dict[str, Any] = settings.PRODUCT_API
+                _circuit_breaker = CircuitBreaker(
+                    failure_threshold=config['CIRCUIT_BREAKER_THRESHOLD'],
+                    reset_timeout=config['CIRCUIT_BREAKER_RESET_TIMEOUT'],
+                )
+
+    return _circuit_breaker
+
+
+def get_product_client() -> ProductClient:
+    """
+    Returns the Product Manager client of the current worker process, creating it on first use.
+
+    Returns:
+        ProductClient: A client configured from the `PRODUCT_API` setting.
+    """
+    global _client
+
+    if _client is None:
+        circuit_breaker: CircuitBreaker = get_circuit_breaker()
+        with _client_lock:
+            if _client is None:
+                config: dict[str, Any] = settings.PRODUCT_API
+                _client = ProductClient(
+                    base_url=config['BASE_URL'],
+                    connect_timeout=config['CONNECT_TIMEOUT'],
+                    read_timeout=config['READ_TIMEOUT'],
+                    retries=config['RETRIES'],
+                    pool_size=config['POOL_SIZE'],
+                    circuit_breaker=circuit_breaker,
+                    response_format=config['FORMAT'],
+                )
+
+    return _client
+
+
+def build_async_product_client() -> AsyncProductClient:
+    """
+    Returns a new asynchronous client configured from the `PRODUCT_API` setting.
+    """
+    config: dict[str, Any] = settings.PRODUCT_API
+    return AsyncProductClient(
+        base_url=config['BASE_URL'],
+        connect_timeout=config['CONNECT_TIMEOUT'],
+        read_timeout=config['READ_TIMEOUT'],
+        retries=config['RETRIES'],
+        pool_size=config['POOL_SIZE'],
+        circuit_breaker=get_circuit_breaker(),
+        response_format=config['FORMAT'],
+    )
+
+
+def get_async_product_client() -> AsyncProductClient:
+    """
+    Returns the asynchronous Product Manager client of the running event loop, creating it on first use.
+
+    Under ASGI each worker process runs a single event loop for its whole life, so its connection pool is
+    shared by every request the worker handles. Must be called from a coroutine, and only from an event loop
+    that outlives the request (see `async_product_client`).
+
+    Returns:
+        AsyncProductClient: A client configured from the `PRODUCT_API` setting.
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    client: Optional[AsyncProductClient] = _async_clients.get(loop)
+
+    if client is None:
+        client = build_async_product_client()
+        _async_clients[loop] = client
+
+    return client
+
+
+@contextlib.asynccontextmanager
+async def async_product_client(shared: bool) -> AsyncIterator[AsyncProductClient]:
+    """
+    Provides the asynchronous client used by a request.
+
+    Args:
+        shared (bool): Whether the request is served under ASGI, so that the client of the event loop of the
+            worker can be reused. Otherwise (e.g. under `runserver` or any WSGI server) Django runs every
+            asynchronous view in an event loop of its own, closed right after the request, so a client is
+            created for the request and closed with it instead of leaving its connections open.
+
+    Yields:
+        AsyncProductClient: The client.
+    """
+    if shared:
+        yield get_async_product_client()
+        return
+
+    client: AsyncProductClient = build_async_product_client()
+    try:
+        yield client
+    finally:
+        await client.aclose()
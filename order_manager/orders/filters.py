@@ -0,0 +1,136 @@
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.request import Request
+from .models import Order, OrderItem
+
+
+class InvalidFilter(ValueError):
+    """
+    Raised when a filter parameter of the order list cannot be parsed.
+    """
+
+
+def parse_datetime_param(request: Request, name: str) -> Optional[datetime]:
+    """
+    Parses a query parameter holding a date (`2025-02-04`) or a date and time in ISO 8601 format.
+
+    A date alone stands for its midnight and values without a time zone use the current time zone.
+
+    Raises:
+        InvalidFilter: If the value is not a valid date.
+    """
+    raw: Optional[str] = request.query_params.get(name)
+    if not raw:
+        return None
+
+    try:
+        value: Optional[datetime] = parse_datetime(raw)
+        if value is None:
+            date = parse_date(raw)
+            value = datetime.combine(date, time.min) if date else None
+    except ValueError:
+        value = None
+
+    if value is None:
+        raise InvalidFilter(f"'{name}' must be a date or a date and time in ISO 8601 format")
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def parse_date_param(request: Request, name: str) -> Optional[date]:
+    """
+    Parses a query parameter holding a date (`2025-02-04`).
+
+    Raises:
+        InvalidFilter: If the value is not a valid date.
+    """
+    raw: Optional[str] = request.query_params.get(name)
+    if not raw:
+        return None
+
+    try:
+        value: Optional[date] = parse_date(raw)
+    except ValueError:
+        value = None
+
+    if value is None:
+        raise InvalidFilter(f"'{name}' must be a date in ISO 8601 format")
+    return value
+
+
+def parse_decimal_param(request: Request, name: str) -> Optional[Decimal]:
+    """
+    Parses a query parameter holding a non-negative amount.
+
+    Raises:
+        InvalidFilter: If the value is not a valid amount.
+    """
+    raw: Optional[str] = request.query_params.get(name)
+    if not raw:
+        return None
+
+    try:
+        value: Decimal = Decimal(raw)
+    except InvalidOperation:
+        raise InvalidFilter(f"'{name}' must be a number")
+
+    if not value.is_finite() or value < 0:
+        raise InvalidFilter(f"'{name}' must be a non-negative number")
+    return value
+
+
+def filter_orders(queryset: QuerySet, request: Request) -> QuerySet:
+    """
+    Applies the filter parameters of the order list to a queryset of orders.
+
+    - `product_id`: orders containing the product, resolved through the (`product_id`, `order`) index of
+      the order items, so only the matching items are read.
+    - `created_after` / `created_before`: orders created at or after / before the given date, resolved
+      through the (`created_at`, `id`) index of the orders.
+    - `min_total` / `max_total`: orders whose stored total price is within the bounds.
+    - `status`: orders in the given status (`pending`, `confirmed` or `rejected`).
+
+    Args:
+        queryset (QuerySet): The orders.
+        request (Request): The request containing the optional filter parameters.
+
+    Returns:
+        QuerySet: The filtered orders.
+
+    Raises:
+        InvalidFilter: If a parameter is malformed.
+    """
+    raw_product_id: Optional[str] = request.query_params.get('product_id')
+    if raw_product_id:
+        try:
+            product_id: int = int(raw_product_id)
+        except ValueError:
+            raise InvalidFilter("'product_id' must be an integer")
+        queryset = queryset.filter(pk__in=OrderItem.objects.filter(product_id=product_id).values('order_id'))
+
+    created_after: Optional[datetime] = parse_datetime_param(request, 'created_after')
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+
+    created_before: Optional[datetime] = parse_datetime_param(request, 'created_before')
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+
+    min_total: Optional[Decimal] = parse_decimal_param(request, 'min_total')
+    if min_total is not None:
+        queryset = queryset.filter(total_price__gte=min_total)
+
+    max_total: Optional[Decimal] = parse_decimal_param(request, 'max_total')
+    if max_total is not None:
+        queryset = queryset.filter(total_price__lte=max_total)
+
+    order_status: Optional[str] = request.query_params.get('status')
+    if order_status:
+        if order_status not in Order.Status.values:
+            raise InvalidFilter(f"'status' must be one of: {', '.join(Order.Status.values)}")
+        queryset = queryset.filter(status=order_status)
+
+    return queryset
@@ -0,0 +1,283 @@
+import asyncio
+import functools
+import hashlib
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from common.renderers import encode_json
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER: str = 'Idempotency-Key'
+
+# Header added to responses replayed from a stored key.
+REPLAYED_HEADER: str = 'Idempotent-Replayed'
+
+MAX_KEY_LENGTH: int = 255
+
+# Seconds between two checks of a key in progress, doubled up to the maximum on every check.
+POLL_INTERVAL: float = 0.05
+MAX_POLL_INTERVAL: float = 0.5
+
+
+def fingerprint_request(method: str, path: str, body: bytes) -> str:
+    """
+    Fingerprints a request, so that a key reused for a different request can be told apart from a retry.
+
+    Args:
+        method (str): The HTTP method of the request.
+        path (str): The path of the request.
+        body (bytes): The body of the request, re-encoded from its parsed data when possible so that
+                      formatting differences do not matter.
+
+    Returns:
+        str: The SHA-256 of the method, path and body of the request.
+    """
+    return hashlib.sha256(b'\n'.join([method.encode(), path.encode(), body])).hexdigest()
+
+
+def request_hash(request: Request) -> str:
+    """
+    Fingerprints a DRF request. See `fingerprint_request`.
+    """
+    return fingerprint_request(request.method, request.path, encode_json(request.data))
+
+
+def claim_key(key: str, fingerprint: str) -> tuple[bool, IdempotencyKey]:
+    """
+    Records a key as in progress, unless another request already holds it.
+
+    Args:
+        key (str): The idempotency key.
+        fingerprint (str): The fingerprint of the request.
+
+    Returns:
+        tuple[bool, IdempotencyKey]: Whether the key was claimed by this request, and the row of the key:
+            the one just created, or the existing one.
+    """
+    config: dict[str, Any] = settings.IDEMPOTENCY
+    now = timezone.now()
+
+    try:
+        with transaction.atomic():
+            claimed: IdempotencyKey = IdempotencyKey.objects.create(
+                key=key, request_hash=fingerprint, expires_at=now + timedelta(seconds=config['TTL'])
+            )
+        return True, claimed
+    except IntegrityError:
+        pass
+
+    existing: Optional[IdempotencyKey] = IdempotencyKey.objects.filter(key=key).first()
+    if existing is None:
+        # Released in the meantime by a request that failed
+        return claim_key(key, fingerprint)
+
+    abandoned: bool = existing.status_code is None and existing.created_at <= now - timedelta(seconds=config['LOCK_TIMEOUT'])
+    if existing.expires_at <= now or abandoned:
+        # Only the request that deletes the stale key gets to claim it
+        if IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()[0]:
+            return claim_key(key, fingerprint)
+
+    return False, existing
+
+
+def must_wait(claimed: bool, existing: IdempotencyKey, fingerprint: str) -> bool:
+    """
+    Returns whether a key is held by a duplicate of the request that is still in progress.
+    """
+    return not claimed and existing.status_code is None and existing.request_hash == fingerprint
+
+
+def wait_for_key(key: str, fingerprint: str) -> tuple[bool, IdempotencyKey]:
+    """
+    Claims a key, or waits for the request holding it to finish.
+
+    Duplicates of a request in progress poll the stored key instead of running the request again, so
+    concurrent retries never race to create the same order.
+
+    Args:
+        key (str): The idempotency key.
+        fingerprint (str): The fingerprint of the request.
+
+    Returns:
+        tuple[bool, IdempotencyKey]: Whether the key was claimed by this request, and the row of the key,
+            which is still in progress only if the wait timed out.
+    """
+    deadline: float = time.monotonic() + settings.IDEMPOTENCY['WAIT_TIMEOUT']
+    interval: float = POLL_INTERVAL
+
+    while True:
+        claimed, existing = claim_key(key, fingerprint)
+        if not must_wait(claimed, existing, fingerprint) or time.monotonic() >= deadline:
+            return claimed, existing
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+async def await_key(key: str, fingerprint: str) -> tuple[bool, IdempotencyKey]:
+    """
+    Asynchronous version of `wait_for_key`, which does not block the event loop while waiting.
+    """
+    deadline: float = time.monotonic() + settings.IDEMPOTENCY['WAIT_TIMEOUT']
+    interval: float = POLL_INTERVAL
+
+    while True:
+        claimed, existing = await sync_to_async(claim_key)(key, fingerprint)
+        if not must_wait(claimed, existing, fingerprint) or time.monotonic() >= deadline:
+            return claimed, existing
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+def key_error(key: str) -> Optional[str]:
+    """
+    Returns the error of a malformed key, or None if it is valid.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        return f'{IDEMPOTENCY_KEY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+    return None
+
+
+def held_key_response(existing: IdempotencyKey, fingerprint: str) -> tuple[Any, int, dict[str, str]]:
+    """
+    Returns the answer to a request whose key is held by another request: the stored response of a
+    completed duplicate, or an error.
+
+    Returns:
+        tuple[Any, int, dict[str, str]]: The body, status code and headers of the response.
+    """
+    if existing.request_hash != fingerprint:
+        return (
+            {'error': f'{IDEMPOTENCY_KEY_HEADER} was already used for a different request'},
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            {},
+        )
+    if existing.status_code is None:
+        return (
+            {'error': f'A request with this {IDEMPOTENCY_KEY_HEADER} is still being processed'},
+            status.HTTP_409_CONFLICT,
+            {},
+        )
+    return existing.response_body, existing.status_code, {REPLAYED_HEADER: 'true'}
+
+
+def finish_key(claimed: IdempotencyKey, status_code: Optional[int], body: Any = None) -> None:
+    """
+    Stores the response of a successful request under its key, or releases the key otherwise.
+
+    Only the row claimed by the request is touched: if it expired and was claimed again by another
+    request meanwhile, that request keeps it.
+
+    Args:
+        claimed (IdempotencyKey): The row claimed by the request.
+        status_code (Optional[int]): The status code of the response, or None if the request raised.
+        body (Any): The rendered body of the response, decoded.
+    """
+    row: QuerySet = IdempotencyKey.objects.filter(pk=claimed.pk, created_at=claimed.created_at)
+    if status_code is not None and status.is_success(status_code):
+        row.update(status_code=status_code, response_body=body)
+    else:
+        row.delete()
+
+
+def idempotent(view_method: Callable[..., Response]) -> Callable[..., Response]:
+    """
+    Makes a POST handler idempotent when the client sends an `Idempotency-Key` header.
+
+    The first request with a key runs the handler. If it succeeds (2xx), its response is stored until the
+    key expires and every retry with the same key and body gets that response back without running the
+    handler again. If it fails, the key is released so that the request can be retried. A key reused with
+    a different request is rejected with 422, and a retry that arrives while the original request is
+    still running waits for it, answering 409 if it does not finish in time.
+
+    Args:
+        view_method (Callable[..., Response]): The handler, a method of an APIView.
+
+    Returns:
+        Callable[..., Response]: The wrapped handler.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self: Any, request: Request, *args: Any, **kwargs: Any) -> Response:
+        key: Optional[str] = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        error: Optional[str] = key_error(key)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint: str = request_hash(request)
+        claimed, existing = wait_for_key(key, fingerprint)
+
+        if not claimed:
+            body, status_code, headers = held_key_response(existing, fingerprint)
+            return Response(body, status=status_code, headers=headers)
+
+        try:
+            response: Response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            finish_key(existing, None)
+            raise
+
+        # Store the body as it is rendered, so that replays are identical to the original response
+        finish_key(existing, response.status_code, orjson.loads(encode_json(response.data)))
+        return response
+
+    return wrapper
+
+
+def async_idempotent(view: Callable[..., Awaitable[HttpResponse]]) -> Callable[..., Awaitable[HttpResponse]]:
+    """
+    Makes an asynchronous POST view returning JSON idempotent when the client sends an `Idempotency-Key`
+    header. Behaves as `idempotent`, and shares its keys.
+
+    Args:
+        view (Callable[..., Awaitable[HttpResponse]]): The view, a coroutine function.
+
+    Returns:
+        Callable[..., Awaitable[HttpResponse]]: The wrapped view.
+    """
+    def json_response(body: Any, status_code: int, headers: Optional[dict[str, str]] = None) -> HttpResponse:
+        return HttpResponse(encode_json(body), content_type='application/json', status=status_code, headers=headers)
+
+    @functools.wraps(view)
+    async def wrapper(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        key: Optional[str] = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return await view(request, *args, **kwargs)
+
+        error: Optional[str] = key_error(key)
+        if error:
+            return json_response({'error': error}, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            body: bytes = encode_json(orjson.loads(request.body))
+        except ValueError:
+            body = request.body
+        fingerprint: str = fingerprint_request(request.method, request.path, body)
+        claimed, existing = await await_key(key, fingerprint)
+
+        if not claimed:
+            return json_response(*held_key_response(existing, fingerprint))
+
+        try:
+            response: HttpResponse = await view(request, *args, **kwargs)
+        except BaseException:
+            await sync_to_async(finish_key)(existing, None)
+            raise
+
+        await sync_to_async(finish_key)(
+            existing, response.status_code, orjson.loads(response.content) if status.is_success(response.status_code) else None
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    """
+    Fills in the stored total price and number of items of orders created before these columns existed.
+    """
+    help: str = 'Computes the total_price and item_count columns of every order from its items.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of orders updated per statement.')
+
+    def handle(self, *args, **options) -> None:
+        batch_size: int = options['batch_size']
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        total = items.annotate(total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=20, decimal_places=2))).values('total')
+        count = items.annotate(count=Count('pk')).values('count')
+
+        updated: int = 0
+        last_pk: int = 0
+        max_pk: int = Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        # Each batch is a single UPDATE over a range of primary keys, so the table is never locked as a whole
+        while last_pk < max_pk:
+            with transaction.atomic():
+                updated += Order.objects.filter(pk__gt=last_pk, pk__lte=last_pk + batch_size).update(
+                    total_price=Coalesce(Subquery(total), Value(0), output_field=DecimalField(max_digits=20, decimal_places=2)),
+                    item_count=Coalesce(Subquery(count), Value(0)),
+                )
+            last_pk += batch_size
+
+        self.stdout.write(self.style.SUCCESS(f'Updated the totals of {updated} orders'))
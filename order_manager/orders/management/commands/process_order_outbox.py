@@ -0,0 +1,52 @@
+import logging
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from orders.clients import ProductClient, get_product_client
+from orders.outbox import process_outbox
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Reserves the stock of pending orders (see `orders.outbox`), confirming or rejecting them.
+    Meant to run as a long-lived worker next to the server; several workers can run at once.
+    """
+    help: str = 'Processes the outbox of pending orders, reserving their stock in batches.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ORDER_OUTBOX['BATCH_SIZE'],
+            help='Maximum number of orders whose stock is reserved with a single call.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=settings.ORDER_OUTBOX['POLL_INTERVAL'],
+            help='Seconds to wait before polling again when there are no pending orders.',
+        )
+        parser.add_argument('--once', action='store_true', help='Process the pending orders and exit.')
+
+    def handle(self, *args, **options) -> None:
+        client: ProductClient = get_product_client()
+        totals: Counter = Counter()
+
+        while True:
+            try:
+                counts: Counter = process_outbox(client, options['batch_size'])
+            except Exception:
+                logger.exception('Failed to process the order outbox')
+                counts = Counter()
+                if options['once']:
+                    raise
+
+            totals.update(counts)
+            if counts:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Confirmed {totals['confirmed']} orders, rejected {totals['rejected']} and postponed {totals['postponed']}"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """
+    Deletes expired idempotency keys. Meant to be run periodically (e.g. from cron).
+    """
+    help: str = 'Deletes the idempotency keys whose TTL has expired.'
+
+    def handle(self, *args, **options) -> None:
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from orders.rollups import rebuild_sales
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the sales rollups from the items of every confirmed order. They are kept up to date on every
+    order creation and deletion, so this is only needed to initialize them or after changing `TIME_ZONE`.
+    """
+    help: str = 'Rebuilds the per product and day sales rollups from the order history.'
+
+    def handle(self, *args, **options) -> None:
+        written: int = rebuild_sales()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} sales rollup rows'))
@@ -1,8 +1,26 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Order(models.Model):
+    class Status(models.TextChoices):
+        # Accepted in outbox mode; its stock has not been reserved yet and it has no items.
+        PENDING = 'pending'
+        CONFIRMED = 'confirmed'
+        # Its stock could not be reserved.
+        REJECTED = 'rejected'
+
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    status: models.CharField = models.CharField(max_length=16, choices=Status.choices, default=Status.CONFIRMED)
+    # Totals are computed once when the items are written: on creation, or on confirmation for pending orders.
+    total_price: models.DecimalField = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    item_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes: list[models.Index] = [
+            # Supports keyset pagination of the order list and filtering it by creation date.
+            models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -10,3 +28,64 @@ class OrderItem(models.Model):
     product_id: models.IntegerField = models.IntegerField()
     quantity: models.PositiveIntegerField = models.PositiveIntegerField()
     price: models.DecimalField = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes: list[models.Index] = [
+            # Supports finding the orders that contain a product.
+            models.Index(fields=['product_id', 'order'], name='orderitem_product_order_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    A request made with an `Idempotency-Key` header. While the request is in progress `status_code` is null;
+    once it succeeds, its response is stored so that retries can be answered without running it again.
+    """
+    key: models.CharField = models.CharField(max_length=255, unique=True)
+    request_hash: models.CharField = models.CharField(max_length=64)
+    status_code: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField(null=True)
+    response_body: models.JSONField = models.JSONField(null=True)
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    expires_at: models.DateTimeField = models.DateTimeField(db_index=True)
+
+
+class OrderOutbox(models.Model):
+    """
+    Stock of a pending order still to be reserved in the Product Manager.
+
+    Written in the same transaction as the order and processed in batches by the `process_order_outbox`
+    command, which deletes the row once the order is confirmed or rejected.
+    """
+    order: models.OneToOneField = models.OneToOneField(Order, related_name='outbox', on_delete=models.CASCADE)
+    # The 'product_id'/'quantity' pairs of the order.
+    items: models.JSONField = models.JSONField()
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    # When the row can next be claimed: after a failed attempt, or once the claim of a worker expires.
+    available_at: models.DateTimeField = models.DateTimeField(default=timezone.now, db_index=True)
+    claimed_by: models.CharField = models.CharField(max_length=32, blank=True)
+    attempts: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    last_error: models.TextField = models.TextField(blank=True)
+
+
+class ProductDailySales(models.Model):
+    """
+    Units, revenue and number of orders of a product on a day (in `TIME_ZONE`), for sales reports.
+
+    Maintained in the same transaction as the orders (see orders.rollups), so reports read this table
+    alone instead of aggregating the order items. Only confirmed orders are counted.
+    """
+    product_id: models.IntegerField = models.IntegerField()
+    day: models.DateField = models.DateField()
+    units: models.BigIntegerField = models.BigIntegerField(default=0)
+    revenue: models.DecimalField = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    order_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [
+            # Target of the upserts of orders.rollups; also serves reports of a single product.
+            models.UniqueConstraint(fields=['product_id', 'day'], name='productdailysales_product_day_uniq'),
+        ]
+        indexes: list[models.Index] = [
+            # Supports reports over a range of days for every product.
+            models.Index(fields=['day', 'product_id'], name='productdailysales_day_idx'),
+        ]
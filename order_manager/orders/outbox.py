@@ -0,0 +1,243 @@
+import logging
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .cache import get_product_cache
+from .clients import ProductClient, ProductData, ProductServiceError, ProductServiceUnavailable
+from .models import Order, OrderItem, OrderOutbox
+from .rollups import record_sales, sales_day
+from .services import build_order, build_stock_items, release_stock, reserve_stock
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def accept_order(grouped_items: dict[int, int]) -> Order:
+    """
+    Writes a pending order together with its outbox row in a single local transaction, without calling
+    the Product Manager. Its stock is reserved later by `process_outbox`.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+
+    Returns:
+        Order: The pending order, without items until it is confirmed.
+    """
+    with transaction.atomic():
+        order: Order = Order.objects.create(status=Order.Status.PENDING, item_count=len(grouped_items))
+        OrderOutbox.objects.create(order=order, items=build_stock_items(grouped_items))
+    return order
+
+
+def outbox_items(entry: OrderOutbox) -> dict[int, int]:
+    """
+    Returns the items of an outbox row as product IDs mapped to their quantity.
+    """
+    return {item['product_id']: item['quantity'] for item in entry.items}
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Returns the seconds to wait before retrying a row after `attempts` failed attempts, doubling every time.
+    """
+    config: dict[str, Any] = settings.ORDER_OUTBOX
+    return min(config['RETRY_DELAY'] * 2 ** (attempts - 1), config['MAX_RETRY_DELAY'])
+
+
+def claim_batch(batch_size: int) -> list[OrderOutbox]:
+    """
+    Claims the oldest available outbox rows for the current worker.
+
+    Claimed rows are unavailable to other workers for `ORDER_OUTBOX['LEASE']` seconds, so a worker that dies
+    halfway through a batch only delays its rows.
+
+    Args:
+        batch_size (int): Maximum number of rows claimed.
+
+    Returns:
+        list[OrderOutbox]: The claimed rows, oldest first.
+    """
+    now = timezone.now()
+    token: str = uuid.uuid4().hex
+    available = OrderOutbox.objects.filter(available_at__lte=now)
+
+    # Rows claimed meanwhile by another worker no longer match the condition and are skipped
+    available.filter(pk__in=available.order_by('pk').values('pk')[:batch_size]).update(
+        claimed_by=token, available_at=now + timedelta(seconds=settings.ORDER_OUTBOX['LEASE'])
+    )
+    return list(OrderOutbox.objects.filter(claimed_by=token).order_by('pk'))
+
+
+def confirm_orders(entries: list[OrderOutbox], products: dict[int, ProductData]) -> dict[int, int]:
+    """
+    Writes the items and totals of orders whose stock was reserved, confirms them and adds them to the sales
+    rollups, in a single transaction.
+
+    Args:
+        entries (list[OrderOutbox]): The outbox rows of the orders.
+        products (dict[int, ProductData]): The reserved products, keyed by ID.
+
+    Returns:
+        dict[int, int]: The stock reserved for orders deleted in the meantime, to be released.
+    """
+    orphaned: defaultdict[int, int] = defaultdict(int)
+
+    with transaction.atomic():
+        pending: dict[int, datetime] = dict(
+            Order.objects.select_for_update()
+            .filter(pk__in=[entry.order_id for entry in entries], status=Order.Status.PENDING)
+            .values_list('pk', 'created_at')
+        )
+        orders: list[Order] = []
+        items: list[OrderItem] = []
+
+        for entry in entries:
+            grouped_items: dict[int, int] = outbox_items(entry)
+            if entry.order_id not in pending:
+                for product_id, quantity in grouped_items.items():
+                    orphaned[product_id] += quantity
+                continue
+
+            order: Order = build_order(grouped_items, products)
+            order.pk = entry.order_id
+            order.status = Order.Status.CONFIRMED
+            orders.append(order)
+            items += [
+                OrderItem(order_id=entry.order_id, product_id=product_id, quantity=quantity, price=products[product_id]['price'])
+                for product_id, quantity in grouped_items.items()
+            ]
+
+        Order.objects.bulk_update(orders, ['status', 'total_price', 'item_count'])
+        OrderItem.objects.bulk_create(items)
+        record_sales(items, {pk: sales_day(created_at) for pk, created_at in pending.items()})
+        OrderOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+
+    return dict(orphaned)
+
+
+def reserve_and_confirm(entries: list[OrderOutbox], client: ProductClient) -> None:
+    """
+    Reserves the stock of several pending orders with a single call and confirms them.
+
+    If the orders cannot be written after their stock was reserved, or the outcome of the reservation is
+    unknown, the reservation is released.
+
+    Raises:
+        ProductServiceError: If the stock cannot be reserved; in that case no stock remains reserved.
+    """
+    batch_items: defaultdict[int, int] = defaultdict(int)
+    for entry in entries:
+        for product_id, quantity in outbox_items(entry).items():
+            batch_items[product_id] += quantity
+
+    stock_items: list[dict[str, int]] = build_stock_items(dict(sorted(batch_items.items())))
+    reservation, reserved = reserve_stock(client, stock_items)
+    get_product_cache().set_many(reserved)
+
+    try:
+        orphaned: dict[int, int] = confirm_orders(entries, {product['id']: product for product in reserved})
+    except Exception:
+        release_stock(client, stock_items, reservation)
+        raise
+
+    if orphaned:
+        release_orphaned_stock(client, build_stock_items(orphaned))
+
+
+def release_orphaned_stock(client: ProductClient, stock_items: list[dict[str, int]]) -> None:
+    """
+    Releases stock that was reserved for orders deleted before they were confirmed, logging any failure.
+    """
+    try:
+        client.release_stock(stock_items)
+    except ProductServiceError:
+        logger.exception('Failed to release stock of deleted pending orders: %s', stock_items)
+
+
+def reject(entry: OrderOutbox, error: ProductServiceError) -> None:
+    """
+    Rejects a pending order whose stock cannot be reserved.
+    """
+    logger.info('Rejected order %d: %s', entry.order_id, error.message)
+    with transaction.atomic():
+        Order.objects.filter(pk=entry.order_id, status=Order.Status.PENDING).update(status=Order.Status.REJECTED)
+        entry.delete()
+
+
+def postpone(entries: list[OrderOutbox], error: ProductServiceError) -> None:
+    """
+    Releases rows that could not be processed because the Product Manager is unavailable, to be retried later.
+    """
+    logger.warning('Postponed %d pending orders: %s', len(entries), error.message)
+    now = timezone.now()
+    for entry in entries:
+        attempts: int = entry.attempts + 1
+        OrderOutbox.objects.filter(pk=entry.pk).update(
+            claimed_by='',
+            attempts=attempts,
+            available_at=now + timedelta(seconds=retry_delay(attempts)),
+            last_error=error.message,
+        )
+
+
+def process_batch(entries: list[OrderOutbox], client: ProductClient) -> Counter:
+    """
+    Reserves the stock of a batch of pending orders and confirms or rejects them.
+
+    The stock of the whole batch is reserved with a single call. If that is rejected (a product is missing
+    or has insufficient stock), each order is retried on its own so that only the failing ones are rejected,
+    oldest first. If the Product Manager is unavailable, the remaining orders are left for a later attempt.
+
+    Args:
+        entries (list[OrderOutbox]): The claimed outbox rows.
+        client (ProductClient): The Product Manager client.
+
+    Returns:
+        Counter: The number of orders confirmed, rejected and postponed.
+    """
+    counts: Counter = Counter()
+
+    try:
+        reserve_and_confirm(entries, client)
+        counts['confirmed'] += len(entries)
+        return counts
+    except ProductServiceUnavailable as error:
+        postpone(entries, error)
+        counts['postponed'] += len(entries)
+        return counts
+    except ProductServiceError:
+        pass
+
+    for index, entry in enumerate(entries):
+        try:
+            reserve_and_confirm([entry], client)
+            counts['confirmed'] += 1
+        except ProductServiceUnavailable as error:
+            postpone(entries[index:], error)
+            counts['postponed'] += len(entries) - index
+            break
+        except ProductServiceError as error:
+            reject(entry, error)
+            counts['rejected'] += 1
+
+    return counts
+
+
+def process_outbox(client: ProductClient, batch_size: int) -> Counter:
+    """
+    Claims and processes one batch of pending orders.
+
+    Args:
+        client (ProductClient): The Product Manager client.
+        batch_size (int): Maximum number of orders processed.
+
+    Returns:
+        Counter: The number of orders confirmed, rejected and postponed; empty if there was nothing to do.
+    """
+    entries: list[OrderOutbox] = claim_batch(batch_size)
+    if not entries:
+        return Counter()
+    return process_batch(entries, client)
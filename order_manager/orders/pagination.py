@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Any, Callable, Optional
+from django.conf import settings
+from common.pagination import KeysetPagination
+
+
+class OrderPagination(KeysetPagination):
+    """
+    Keyset pagination of the order list on (`created_at`, `id`), served by the `order_created_at_id_idx` index.
+    """
+    ordering_query_param: Optional[str] = None
+    orderings: dict[str, tuple[str, Callable[[str], Any]]] = {'created_at': ('created_at', datetime.fromisoformat)}
+    default_ordering: str = 'created_at'
+
+    def get_default_limit(self) -> int:
+        return settings.ORDER_PAGINATION['PAGE_SIZE']
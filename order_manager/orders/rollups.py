@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Order, OrderItem, ProductDailySales
+
+# Rows written per upsert statement (5 parameters each).
+UPSERT_BATCH_SIZE: int = 500
+
+# Rows read and inserted per batch when rebuilding the rollups.
+REBUILD_BATCH_SIZE: int = 2000
+
+
+def sales_day(created_at: datetime) -> date:
+    """
+    Returns the day an order counts for in the rollups, in the current time zone.
+    """
+    return timezone.localdate(created_at)
+
+
+def upsert_statement(rows: int) -> str:
+    """
+    Returns an INSERT adding `rows` rows to the rollups, or adding their values to the existing rows.
+    ON CONFLICT ... DO UPDATE is supported by both SQLite and PostgreSQL.
+    """
+    table: str = connection.ops.quote_name(ProductDailySales._meta.db_table)
+    values: str = ', '.join(['(%s, %s, %s, %s, %s)'] * rows)
+    return (
+        f'INSERT INTO {table} (product_id, day, units, revenue, order_count) VALUES {values} '
+        f'ON CONFLICT (product_id, day) DO UPDATE SET '
+        f'units = {table}.units + excluded.units, '
+        f'revenue = {table}.revenue + excluded.revenue, '
+        f'order_count = {table}.order_count + excluded.order_count'
+    )
+
+
+def record_sales(items: Iterable[OrderItem], days: dict[int, date], sign: int = 1) -> None:
+    """
+    Adds the sales of some order items to the rollups, or subtracts them with `sign=-1`.
+
+    Meant to be called inside the transaction that writes or deletes the items. The items are first summed
+    per product and day, then added with one upsert per `UPSERT_BATCH_SIZE` rows (or subtracted with one
+    UPDATE per row), so concurrent transactions only serialize on the rows of the products they share.
+    Rows left without orders are deleted.
+
+    Args:
+        items (Iterable[OrderItem]): The order items. An order holds at most one item per product.
+        days (dict[int, date]): The sales day of every order of the items, keyed by order ID.
+        sign (int): 1 when the items are created, -1 when they are deleted.
+    """
+    totals: defaultdict[tuple[int, date], list] = defaultdict(lambda: [0, Decimal(0), 0])
+    for item in items:
+        total: list = totals[(item.product_id, days[item.order_id])]
+        total[0] += item.quantity
+        total[1] += Decimal(str(item.price)) * item.quantity
+        total[2] += 1
+
+    if not totals:
+        return
+
+    keys: list[tuple[int, date]] = sorted(totals)
+    if sign < 0:
+        # The rows exist since the items were added to them, and an upsert would check the negative
+        # values against the constraints of the table before updating them
+        for product_id, day in keys:
+            units, revenue, order_count = totals[(product_id, day)]
+            ProductDailySales.objects.filter(product_id=product_id, day=day).update(
+                units=F('units') - units, revenue=F('revenue') - revenue, order_count=F('order_count') - order_count
+            )
+        ProductDailySales.objects.filter(
+            product_id__in={product_id for product_id, _ in keys}, day__in={day for _, day in keys}, order_count=0
+        ).delete()
+        return
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+            batch: list[tuple[int, date]] = keys[start:start + UPSERT_BATCH_SIZE]
+            params: list = []
+            for product_id, day in batch:
+                units, revenue, order_count = totals[(product_id, day)]
+                params += [
+                    product_id,
+                    connection.ops.adapt_datefield_value(day),
+                    units,
+                    connection.ops.adapt_decimalfield_value(revenue, 20, 2),
+                    order_count,
+                ]
+            cursor.execute(upsert_statement(len(batch)), params)
+
+
+def daily_sales_rows() -> Iterator[ProductDailySales]:
+    """
+    Computes the rollups from the items of every confirmed order, aggregated by the database.
+    """
+    rows = (
+        OrderItem.objects.filter(order__status=Order.Status.CONFIRMED)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('product_id', 'day')
+        .annotate(
+            total_units=Sum('quantity'),
+            total_revenue=Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=20, decimal_places=2))),
+            total_orders=Count('order'),
+        )
+        .order_by()
+    )
+    for row in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        yield ProductDailySales(
+            product_id=row['product_id'],
+            day=row['day'],
+            units=row['total_units'],
+            revenue=row['total_revenue'],
+            order_count=row['total_orders'],
+        )
+
+
+def rebuild_sales() -> int:
+    """
+    Recomputes the rollups from scratch in a single transaction, e.g. after changing `TIME_ZONE` or
+    importing orders without going through the API.
+
+    Returns:
+        int: The number of rows written.
+    """
+    written: int = 0
+    with transaction.atomic():
+        ProductDailySales.objects.all().delete()
+        batch: list[ProductDailySales] = []
+        for row in daily_sales_rows():
+            batch.append(row)
+            if len(batch) == REBUILD_BATCH_SIZE:
+                written += len(ProductDailySales.objects.bulk_create(batch))
+                batch = []
+        written += len(ProductDailySales.objects.bulk_create(batch))
+    return written
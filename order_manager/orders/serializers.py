@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from common.serializers import ValuesSerializer
 from .models import Order, OrderItem
 
 
@@ -19,29 +20,89 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields: list[str] = ['product_id', 'quantity', 'price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSummarySerializer(serializers.ModelSerializer):
     """
-    Serializer for orders.
-    Handles nested serialization for order items and calculates the total price of an order.
+    Serializer for orders without their items.
+    Reads the total price and number of items stored with each order, so it never touches the order items.
     """
-    def get_total_price(self, obj: Order) -> float:
-        """
-        Calculate the total price of an order.
+    total_price: serializers.DecimalField = serializers.DecimalField(max_digits=20, decimal_places=2, coerce_to_string=False)
 
-        The total price is calculated by summing the product of 
-        the price and quantity for each item in the order.
+    class Meta:
+        model: type[Order] = Order
+        fields: list[str] = ['id', 'created_at', 'status', 'item_count', 'total_price']
 
-        Args:
-            obj (Order): The order instance being serialized.
 
-        Returns:
-            float: The total price of the order.
-        """
-        return sum(item.price * item.quantity for item in obj.items.all())
-    
+class OrderSerializer(OrderSummarySerializer):
+    """
+    Serializer for orders.
+    Handles nested serialization for order items.
+    """
     items: list[OrderItemSerializer] = OrderItemSerializer(many=True)
-    total_price: serializers.SerializerMethodField = serializers.SerializerMethodField()
 
-    class Meta:
-        model: type[Order] = Order
-        fields: list[str] = ['id', 'created_at', 'items', 'total_price']
+    class Meta(OrderSummarySerializer.Meta):
+        fields: list[str] = ['id', 'created_at', 'status', 'items', 'item_count', 'total_price']
+
+
+# Serialize rows read with `values_list()`, for the read-only list endpoints.
+ORDER_ITEM_VALUES: ValuesSerializer = ValuesSerializer(OrderItemSerializer)
+ORDER_SUMMARY_VALUES: ValuesSerializer = ValuesSerializer(OrderSummarySerializer)
+ORDER_VALUES: ValuesSerializer = ValuesSerializer(OrderSerializer)
+
+
+class OrderPageSerializer(serializers.Serializer):
+    """
+    Serializer for a page of orders.
+    Used to document paginated responses in the API.
+    """
+    next: serializers.CharField = serializers.CharField(allow_null=True)
+    results: OrderSerializer = OrderSerializer(many=True)
+
+
+class OrderBatchResultSerializer(serializers.Serializer):
+    """
+    Serializer for the outcome of one order of a batch.
+    Contains either the created order or the reason it was not created.
+    """
+    status: serializers.IntegerField = serializers.IntegerField()
+    order: OrderSerializer = OrderSerializer(required=False)
+    error: serializers.CharField = serializers.CharField(required=False)
+
+
+class OrderBatchSerializer(serializers.Serializer):
+    """
+    Serializer for the response of a batch of orders, one result per order in input order.
+    """
+    results: OrderBatchResultSerializer = OrderBatchResultSerializer(many=True)
+
+
+class ProductCacheInvalidationSerializer(serializers.Serializer):
+    """
+    Serializer for product cache invalidation requests.
+    Omitting `product_ids` invalidates every cached product.
+    """
+    product_ids: serializers.ListField = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+class ProductCacheStatsSerializer(serializers.Serializer):
+    """
+    Serializer for the counters and configuration of the product cache.
+    """
+    backend: serializers.CharField = serializers.CharField()
+    size: serializers.IntegerField = serializers.IntegerField(allow_null=True)
+    max_size: serializers.IntegerField = serializers.IntegerField()
+    ttl: serializers.FloatField = serializers.FloatField()
+    hits: serializers.IntegerField = serializers.IntegerField()
+    misses: serializers.IntegerField = serializers.IntegerField()
+    hit_ratio: serializers.FloatField = serializers.FloatField(allow_null=True)
+
+
+class ProductSalesSerializer(serializers.Serializer):
+    """
+    Serializer for a row of the sales report.
+    `product_id` is omitted when grouping by day and `day` when grouping by product.
+    """
+    product_id: serializers.IntegerField = serializers.IntegerField(required=False)
+    day: serializers.DateField = serializers.DateField(required=False)
+    units: serializers.IntegerField = serializers.IntegerField()
+    revenue: serializers.DecimalField = serializers.DecimalField(max_digits=20, decimal_places=2, coerce_to_string=False)
+    order_count: serializers.IntegerField = serializers.IntegerField()
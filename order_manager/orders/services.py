@@ -0,0 +1,449 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Callable, Optional, Union
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from rest_framework import status
+from .cache import ProductCache, get_product_cache
+from .clients import (
+    AsyncProductClient,
+    CircuitOpen,
+    ProductClient,
+    ProductData,
+    ProductServiceError,
+    ProductServiceUnavailable,
+)
+from .models import Order, OrderItem
+from .rollups import record_sales, sales_day
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+CENTS: Decimal = Decimal('0.01')
+
+BATCH_ABORTED_ERROR: str = 'Not created because another order in the batch failed'
+
+
+def build_stock_items(grouped_items: dict[int, int]) -> list[dict[str, int]]:
+    """
+    Converts grouped order items into the payload expected by the Product Manager stock endpoints.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+
+    Returns:
+        list[dict[str, int]]: A list of 'product_id'/'quantity' pairs.
+    """
+    return [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in grouped_items.items()]
+
+
+def check_availability(grouped_items: dict[int, int], products: dict[int, ProductData]) -> None:
+    """
+    Ensures that every product exists and has enough stock for the requested quantity.
+
+    Stock is only checked for products fetched from the Product Manager; cached products carry no
+    stock and are checked when their stock is reserved.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+        products (dict[int, ProductData]): The known products, keyed by ID.
+
+    Raises:
+        ProductServiceError: If a product does not exist (404) or its stock is insufficient (400).
+    """
+    for product_id in grouped_items:
+        if product_id not in products:
+            raise ProductServiceError(f'Product {product_id} not found', status.HTTP_404_NOT_FOUND)
+
+    for product_id, quantity in grouped_items.items():
+        if 'stock' in products[product_id] and products[product_id]['stock'] < quantity:
+            raise ProductServiceError(f'Insufficient stock for product {product_id}', status.HTTP_400_BAD_REQUEST)
+
+
+def fetch_products(product_ids: list[int], client: ProductClient) -> dict[int, ProductData]:
+    """
+    Looks up several products in the product cache, fetching the missing ones in a single call.
+
+    Args:
+        product_ids (list[int]): The IDs of the products.
+        client (ProductClient): The Product Manager client.
+
+    Returns:
+        dict[int, ProductData]: The products found, keyed by ID. Unknown IDs are omitted.
+
+    Raises:
+        ProductServiceError: If the Product Manager rejects the request or is unavailable.
+    """
+    cache: ProductCache = get_product_cache()
+    products: dict[int, ProductData] = cache.get_many(product_ids)
+    missing: list[int] = [product_id for product_id in product_ids if product_id not in products]
+
+    if missing:
+        fetched: dict[int, ProductData] = client.get_products(missing)
+        cache.set_many(fetched.values())
+        products.update(fetched)
+
+    return products
+
+
+def build_order(grouped_items: dict[int, int], products: dict[int, ProductData]) -> Order:
+    """
+    Builds an unsaved order with its total price and number of items.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+        products (dict[int, ProductData]): The products of the order, keyed by ID.
+
+    Returns:
+        Order: The order, ready to be inserted.
+    """
+    total_price: Decimal = sum(
+        (Decimal(str(products[product_id]['price'])) * quantity for product_id, quantity in grouped_items.items()),
+        Decimal(0),
+    )
+    return Order(total_price=total_price.quantize(CENTS), item_count=len(grouped_items))
+
+
+def save_order(grouped_items: dict[int, int], products: dict[int, ProductData]) -> Order:
+    """
+    Writes an order and its items, and adds them to the sales rollups, in a single transaction.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+        products (dict[int, ProductData]): The products of the order, keyed by ID.
+
+    Returns:
+        Order: The created order.
+    """
+    with transaction.atomic():
+        order: Order = build_order(grouped_items, products)
+        order.save()
+        items: list[OrderItem] = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=product_id,
+                quantity=quantity,
+                price=products[product_id]['price']
+            )
+            for product_id, quantity in grouped_items.items()
+        ])
+        record_sales(items, {order.pk: sales_day(order.created_at)})
+    return order
+
+
+def save_orders(grouped_orders: list[dict[int, int]], products: dict[int, ProductData]) -> list[Order]:
+    """
+    Writes several orders and all their items with two bulk inserts, and adds them to the sales rollups,
+    in a single transaction.
+
+    Args:
+        grouped_orders (list[dict[int, int]]): For each order, product IDs mapped to their total quantity.
+        products (dict[int, ProductData]): The products of every order, keyed by ID.
+
+    Returns:
+        list[Order]: The created orders, in the same order as `grouped_orders`.
+    """
+    with transaction.atomic():
+        orders: list[Order] = Order.objects.bulk_create([build_order(grouped_items, products) for grouped_items in grouped_orders])
+        items: list[OrderItem] = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=product_id,
+                quantity=quantity,
+                price=products[product_id]['price']
+            )
+            for order, grouped_items in zip(orders, grouped_orders)
+            for product_id, quantity in grouped_items.items()
+        ])
+        record_sales(items, {order.pk: sales_day(order.created_at) for order in orders})
+    return orders
+
+
+def delete_order(order: Order) -> None:
+    """
+    Deletes an order and its items, and subtracts them from the sales rollups, in a single transaction.
+
+    Args:
+        order (Order): The order to delete.
+    """
+    with transaction.atomic():
+        # Lock the order so that a concurrent deletion does not subtract its sales twice
+        if not Order.objects.select_for_update().filter(pk=order.pk).exists():
+            return
+        record_sales(order.items.all(), {order.pk: sales_day(order.created_at)}, sign=-1)
+        order.delete()
+
+
+def reserve_stock(client: ProductClient, stock_items: list[dict[str, int]]) -> tuple[str, list[ProductData]]:
+    """
+    Reserves stock under a new reservation token.
+
+    When the reservation fails without a definitive answer (a timeout, a network error or a server error), the
+    Product Manager may have applied it all the same, so it is undone by releasing its token: the stock is
+    given back only if it was reserved, and a reservation still on its way is refused when it arrives.
+
+    Args:
+        client (ProductClient): The Product Manager client.
+        stock_items (list[dict[str, int]]): The 'product_id'/'quantity' pairs to reserve.
+
+    Returns:
+        tuple[str, list[ProductData]]: The token of the reservation and the updated products.
+
+    Raises:
+        ProductServiceError: If the stock cannot be reserved; in that case no stock remains reserved, unless
+                             the compensating release failed too (which is logged).
+    """
+    reservation: str = uuid.uuid4().hex
+    try:
+        return reservation, client.reserve_stock(stock_items, reservation)
+    except CircuitOpen:
+        # Never sent
+        raise
+    except ProductServiceUnavailable:
+        release_stock(client, stock_items, reservation)
+        raise
+
+
+def release_stock(client: ProductClient, stock_items: list[dict[str, int]], reservation: str) -> None:
+    """
+    Releases a reservation whose order could not be completed, logging any failure.
+
+    Args:
+        client (ProductClient): The Product Manager client.
+        stock_items (list[dict[str, int]]): The 'product_id'/'quantity' pairs that were reserved.
+        reservation (str): The token of the reservation.
+    """
+    try:
+        client.release_stock(stock_items, reservation)
+    except ProductServiceError:
+        logger.exception('Failed to release reservation %s: %s', reservation, stock_items)
+
+
+def reserve_and_save(
+    grouped_items: dict[int, int],
+    products: dict[int, ProductData],
+    client: ProductClient,
+    save: Callable[[dict[int, ProductData]], Any],
+) -> Any:
+    """
+    Reserves the stock of an order and saves it, releasing the reservation if it cannot be saved.
+
+    The reservation returns the current product details, which are used for the order and cached. A reservation
+    whose outcome is unknown is released as well (see `reserve_stock`).
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to the total quantity to reserve.
+        products (dict[int, ProductData]): The known products, keyed by ID. Updated in place.
+        client (ProductClient): The Product Manager client.
+        save (Callable[[dict[int, ProductData]], Any]): Saves the order(s) given the products.
+
+    Returns:
+        Any: The result of `save`.
+
+    Raises:
+        ProductServiceError: If the stock cannot be reserved; in that case nothing is saved.
+    """
+    # Reserve the stock of every product at once; the Product Manager applies all decrements or none
+    stock_items: list[dict[str, int]] = build_stock_items(grouped_items)
+    reservation, reserved = reserve_stock(client, stock_items)
+    products.update({product['id']: product for product in reserved})
+    get_product_cache().set_many(reserved)
+
+    try:
+        return save(products)
+    except Exception:
+        # Give the reserved stock back so a failed write does not leak it
+        release_stock(client, stock_items, reservation)
+        raise
+
+
+def place_order(grouped_items: dict[int, int], client: ProductClient) -> Order:
+    """
+    Creates an order: fetches its products, reserves their stock and saves it.
+
+    If the order cannot be saved after its stock was reserved, the reservation is released.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+        client (ProductClient): The Product Manager client.
+
+    Returns:
+        Order: The created order.
+
+    Raises:
+        ProductServiceError: If a product does not exist, its stock is insufficient or the
+                             Product Manager is unavailable.
+    """
+    # Look up every product of the order, fetching those not cached from the Product Manager in a single call
+    products: dict[int, ProductData] = fetch_products(list(grouped_items), client)
+    check_availability(grouped_items, products)
+    return reserve_and_save(grouped_items, products, client, lambda products: save_order(grouped_items, products))
+
+
+def place_orders(
+    grouped_orders: list[dict[int, int]],
+    client: ProductClient,
+    atomic: bool,
+) -> list[Union[Order, ProductServiceError]]:
+    """
+    Creates several orders, resolving every distinct product of the batch with a single lookup.
+
+    With `atomic`, the stock of the whole batch is reserved at once and every order is written in a
+    single transaction, so either all orders are created or none. Otherwise each order is reserved
+    and written in its own transaction and fails on its own.
+
+    Args:
+        grouped_orders (list[dict[int, int]]): For each order, product IDs mapped to their total quantity.
+        client (ProductClient): The Product Manager client.
+        atomic (bool): Whether the batch succeeds or fails as a whole.
+
+    Returns:
+        list[Union[Order, ProductServiceError]]: For each order, in the same order as `grouped_orders`,
+            the created order or the reason it was not created.
+
+    Raises:
+        ProductServiceError: If the products cannot be fetched, which fails the whole batch.
+    """
+    product_ids: list[int] = sorted({product_id for grouped_items in grouped_orders for product_id in grouped_items})
+    products: dict[int, ProductData] = fetch_products(product_ids, client)
+
+    if not atomic:
+        results: list[Union[Order, ProductServiceError]] = []
+        for grouped_items in grouped_orders:
+            try:
+                check_availability(grouped_items, products)
+                results.append(reserve_and_save(
+                    grouped_items, products, client, lambda products, grouped_items=grouped_items: save_order(grouped_items, products)
+                ))
+            except ProductServiceError as error:
+                results.append(error)
+        return results
+
+    failures: list[Optional[ProductServiceError]] = []
+    for grouped_items in grouped_orders:
+        try:
+            check_availability(grouped_items, products)
+            failures.append(None)
+        except ProductServiceError as error:
+            failures.append(error)
+
+    if any(failures):
+        aborted: ProductServiceError = ProductServiceError(BATCH_ABORTED_ERROR, status.HTTP_424_FAILED_DEPENDENCY)
+        return [failure or aborted for failure in failures]
+
+    batch_items: defaultdict[int, int] = defaultdict(int)
+    for grouped_items in grouped_orders:
+        for product_id, quantity in grouped_items.items():
+            batch_items[product_id] += quantity
+
+    try:
+        return reserve_and_save(dict(batch_items), products, client, lambda products: save_orders(grouped_orders, products))
+    except ProductServiceError as error:
+        return [error for _ in grouped_orders]
+
+
+async def aplace_order(grouped_items: dict[int, int], client: AsyncProductClient) -> Order:
+    """
+    Asynchronous version of `place_order`.
+
+    The lookup of the products missing from the cache and the stock reservation are sent concurrently:
+    the reservation is all-or-nothing, so it can run before the product details arrive. If the
+    reservation fails, the error is derived from the product details when possible, so that responses
+    match `place_order`.
+
+    Args:
+        grouped_items (dict[int, int]): Product IDs mapped to their total quantity.
+        client (AsyncProductClient): The asynchronous Product Manager client.
+
+    Returns:
+        Order: The created order.
+
+    Raises:
+        ProductServiceError: If a product does not exist, its stock is insufficient or the
+                             Product Manager is unavailable.
+    """
+    cache: ProductCache = get_product_cache()
+    products: dict[int, ProductData] = await call_cache(cache.get_many, cache, list(grouped_items))
+    missing: list[int] = [product_id for product_id in grouped_items if product_id not in products]
+    stock_items: list[dict[str, int]] = build_stock_items(grouped_items)
+    reservation: str = uuid.uuid4().hex
+
+    if missing:
+        fetched, reserved = await asyncio.gather(
+            client.get_products(missing),
+            client.reserve_stock(stock_items, reservation),
+            return_exceptions=True,
+        )
+
+        if isinstance(reserved, BaseException):
+            await arelease_unknown(client, stock_items, reservation, reserved)
+            if not isinstance(fetched, BaseException):
+                check_availability(grouped_items, {**products, **fetched})
+            raise reserved
+
+        if isinstance(fetched, BaseException):
+            await arelease_stock(client, stock_items, reservation)
+            raise fetched
+
+        products.update(fetched)
+    else:
+        try:
+            reserved = await client.reserve_stock(stock_items, reservation)
+        except ProductServiceError as error:
+            await arelease_unknown(client, stock_items, reservation, error)
+            raise
+
+    products.update({product['id']: product for product in reserved})
+    await call_cache(cache.set_many, cache, reserved)
+
+    try:
+        return await sync_to_async(save_order)(grouped_items, products)
+    except Exception:
+        await arelease_stock(client, stock_items, reservation)
+        raise
+
+
+async def arelease_unknown(
+    client: AsyncProductClient,
+    stock_items: list[dict[str, int]],
+    reservation: str,
+    error: BaseException,
+) -> None:
+    """
+    Releases a reservation that failed with `error` if the Product Manager may have applied it anyway.
+    See `reserve_stock`.
+    """
+    if isinstance(error, ProductServiceUnavailable) and not isinstance(error, CircuitOpen):
+        await arelease_stock(client, stock_items, reservation)
+
+
+async def arelease_stock(client: AsyncProductClient, stock_items: list[dict[str, int]], reservation: str) -> None:
+    """
+    Asynchronous version of `release_stock`.
+    """
+    try:
+        await client.release_stock(stock_items, reservation)
+    except ProductServiceError:
+        logger.exception('Failed to release reservation %s: %s', reservation, stock_items)
+
+
+async def call_cache(method: Callable[..., Any], cache: ProductCache, *args: Any) -> Any:
+    """
+    Calls a method of the product cache from asynchronous code.
+
+    The in-process cache is called directly; a shared cache backend may block on I/O, so it is
+    called from a worker thread.
+
+    Args:
+        method (Callable[..., Any]): The bound method of the cache to call.
+        cache (ProductCache): The product cache.
+        *args: The arguments of the method.
+
+    Returns:
+        Any: The result of the method.
+    """
+    if cache.backend is None:
+        return method(*args)
+    return await sync_to_async(method)(*args)
@@ -0,0 +1,645 @@
+import os
+import pstats
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Optional
+from unittest import mock
+import httpx
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .cache import get_product_cache
+from .clients import (
+    AsyncProductClient,
+    CircuitBreaker,
+    CircuitOpen,
+    ProductData,
+    ProductServiceError,
+    ProductServiceUnavailable,
+)
+from common.profiling import PROFILE_ID_HEADER, list_captures, prune_captures
+from common.renderers import encode_json
+from .idempotency import REPLAYED_HEADER, fingerprint_request
+from .models import IdempotencyKey, Order, OrderItem, OrderOutbox, ProductDailySales
+from .outbox import accept_order, claim_batch, process_batch, process_outbox, retry_delay
+from .pagination import OrderPagination
+from .rollups import rebuild_sales, sales_day
+from .services import delete_order, save_order, save_orders
+from .views import order_queryset, order_serializer_class, order_values, serialize_order_rows
+
+
+class FakeProductClient:
+    """
+    In-memory stand-in for `ProductClient`, holding the products and their stock and recording every call.
+    """
+    def __init__(self, products: dict[int, tuple[str, int]]) -> None:
+        # Product IDs mapped to their price and stock
+        self.products: dict[int, ProductData] = {
+            product_id: {'id': product_id, 'name': f'Producto {product_id}', 'price': price, 'stock': stock}
+            for product_id, (price, stock) in products.items()
+        }
+        self.calls: list[str] = []
+        self.unavailable: bool = False
+
+    def call(self, name: str) -> None:
+        self.calls.append(name)
+        if self.unavailable:
+            raise ProductServiceUnavailable()
+
+    def get_products(self, product_ids: list[int]) -> dict[int, ProductData]:
+        self.call('get_products')
+        return {product_id: dict(self.products[product_id]) for product_id in product_ids if product_id in self.products}
+
+    def reserve_stock(self, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        self.call('reserve_stock')
+        for item in items:
+            product: Optional[ProductData] = self.products.get(item['product_id'])
+            if product is None:
+                raise ProductServiceError(f'Product {item["product_id"]} not found', status.HTTP_404_NOT_FOUND)
+            if product['stock'] < item['quantity']:
+                raise ProductServiceError(f'Insufficient stock for product {item["product_id"]}')
+        return self.update_stock(items, -1)
+
+    def release_stock(self, items: list[dict[str, int]], reservation: Optional[str] = None) -> list[ProductData]:
+        self.call('release_stock')
+        return self.update_stock(items, 1)
+
+    def update_stock(self, items: list[dict[str, int]], sign: int) -> list[ProductData]:
+        for item in items:
+            self.products[item['product_id']]['stock'] += sign * item['quantity']
+        return [dict(self.products[item['product_id']]) for item in items]
+
+
+class SerializeOrderRowsTests(TestCase):
+    """
+    The list endpoints serialize rows read with `values_list()` (see `common.serializers.ValuesSerializer`);
+    their output must be exactly that of the model serializers used by the other endpoints.
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        with_items: Order = Order.objects.create(total_price=Decimal('1234.50'), item_count=3)
+        OrderItem.objects.create(order=with_items, product_id=1, quantity=2, price=Decimal('0.10'))
+        OrderItem.objects.create(order=with_items, product_id=7, quantity=1, price=Decimal('1234.30'))
+
+        rounded: Order = Order.objects.create(total_price=Decimal('99999999.99'), item_count=1)
+        OrderItem.objects.create(order=rounded, product_id=2, quantity=1, price=Decimal('99999999.99'))
+
+        Order.objects.create(status=Order.Status.PENDING)
+        Order.objects.create(status=Order.Status.REJECTED, total_price=Decimal('0.00'))
+
+    def assert_same_output(self, include_items: bool) -> None:
+        queryset = order_queryset(include_items).order_by('-created_at', '-id')
+        expected: list[dict[str, Any]] = order_serializer_class(include_items)(queryset, many=True).data
+
+        rows: list[tuple] = list(queryset.values_list(*order_values(include_items).columns))
+        actual: list[dict[str, Any]] = serialize_order_rows(rows, include_items)
+
+        self.assertEqual(len(actual), 4)
+        for actual_order, expected_order in zip(actual, expected):
+            self.assertEqual(list(actual_order), list(expected_order))
+            self.assertEqual(actual_order, expected_order)
+            # Equal values of different types would compare equal but render differently
+            for name, value in expected_order.items():
+                self.assertIs(type(actual_order[name]), type(value), name)
+
+    def test_orders_with_items(self) -> None:
+        self.assert_same_output(include_items=True)
+
+    def test_orders_without_items(self) -> None:
+        self.assert_same_output(include_items=False)
+
+    def test_empty_item_lists(self) -> None:
+        rows: list[tuple] = list(
+            Order.objects.filter(item_count=0).order_by('id').values_list(*order_values(True).columns)
+        )
+        self.assertEqual([order['items'] for order in serialize_order_rows(rows, include_items=True)], [[], []])
+
+    def test_decimals(self) -> None:
+        rows: list[tuple] = list(Order.objects.order_by('id').values_list(*order_values(True).columns))
+        first: dict[str, Any] = serialize_order_rows(rows, include_items=True)[0]
+
+        self.assertEqual(first['total_price'], Decimal('1234.50'))
+        self.assertEqual([item['price'] for item in first['items']], ['0.10', '1234.30'])
+
+
+class AsyncProductClientBreakerTests(SimpleTestCase):
+    """
+    Network errors of the async client count against the circuit breaker, except those raised
+    because the local pool is exhausted.
+    """
+    def build_client(self, error: type[httpx.TransportError]) -> AsyncProductClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise error('Product Manager unreachable', request=request)
+
+        client: AsyncProductClient = AsyncProductClient(
+            base_url='http://product-manager.test/api/products/',
+            connect_timeout=1,
+            read_timeout=1,
+            retries=0,
+            pool_size=1,
+            circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30),
+        )
+        client.client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+        return client
+
+    async def test_connect_timeouts_open_the_circuit(self) -> None:
+        client: AsyncProductClient = self.build_client(httpx.ConnectTimeout)
+        try:
+            with self.assertLogs('orders.clients', 'WARNING') as logs:
+                for _ in range(3):
+                    with self.assertRaises(ProductServiceUnavailable):
+                        await client.get_products([1])
+
+            self.assertTrue(any('circuit opened' in line for line in logs.output))
+            self.assertEqual(client.circuit_breaker.state, CircuitBreaker.OPEN)
+            with self.assertRaises(CircuitOpen):
+                await client.get_products([1])
+        finally:
+            await client.aclose()
+
+    async def test_pool_timeouts_keep_the_circuit_closed(self) -> None:
+        client: AsyncProductClient = self.build_client(httpx.PoolTimeout)
+        try:
+            with self.assertLogs('orders.clients', 'WARNING'):
+                for _ in range(5):
+                    with self.assertRaises(ProductServiceUnavailable) as context:
+                        await client.get_products([1])
+                    self.assertNotIsInstance(context.exception, CircuitOpen)
+
+            self.assertEqual(client.circuit_breaker.state, CircuitBreaker.CLOSED)
+        finally:
+            await client.aclose()
+
+
+class OrderBatchCreateTests(TestCase):
+    """
+    `POST /api/orders/batch/` looks up every product of the batch at once and creates each order on its own,
+    or the whole batch at once with `"transaction": "batch"`.
+    """
+    def setUp(self) -> None:
+        get_product_cache().invalidate()
+        self.client: APIClient = APIClient()
+        self.products: FakeProductClient = FakeProductClient({1: ('10.99', 5), 2: ('0.10', 1)})
+        patcher = mock.patch('orders.views.get_product_client', return_value=self.products)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, orders: list[Any], mode: str = 'order') -> Any:
+        return self.client.post(reverse('order-batch-create'), {'transaction': mode, 'orders': orders}, format='json')
+
+    def test_all_created(self) -> None:
+        response = self.post([
+            {'items': [{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 1}]},
+            {'items': [{'product_id': 1, 'quantity': 1}, {'product_id': 1, 'quantity': 1}]},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        results: list[dict[str, Any]] = response.json()['results']
+        self.assertEqual([result['status'] for result in results], [201, 201])
+        self.assertEqual(results[0]['order']['total_price'], 22.08)
+        self.assertEqual(results[1]['order']['items'], [{'product_id': 1, 'quantity': 2, 'price': '10.99'}])
+        # A single lookup for the whole batch
+        self.assertEqual(self.products.calls, ['get_products', 'reserve_stock', 'reserve_stock'])
+        self.assertEqual(self.products.products[1]['stock'], 1)
+
+    def test_orders_fail_on_their_own(self) -> None:
+        response = self.post([
+            {'items': [{'product_id': 1, 'quantity': 1}]},
+            {'items': [{'product_id': 2, 'quantity': 2}]},
+            {'items': [{'product_id': 9, 'quantity': 1}]},
+            {'items': []},
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.json()['results']], [201, 400, 404, 400])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_batch_transaction(self) -> None:
+        response = self.post([
+            {'items': [{'product_id': 1, 'quantity': 3}]},
+            {'items': [{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 1}]},
+        ], mode='batch')
+
+        self.assertEqual(response.status_code, 201)
+        # The stock of the whole batch is reserved with a single call
+        self.assertEqual(self.products.calls, ['get_products', 'reserve_stock'])
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_batch_transaction_fails_as_a_whole(self) -> None:
+        response = self.post([
+            {'items': [{'product_id': 1, 'quantity': 3}]},
+            {'items': [{'product_id': 1, 'quantity': 3}]},
+        ], mode='batch')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.json()['results']], [400, 400])
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(self.products.products[1]['stock'], 5)
+
+        response = self.post([{'items': [{'product_id': 1, 'quantity': 1}]}, {'items': []}], mode='batch')
+        self.assertEqual([result['status'] for result in response.json()['results']], [424, 400])
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_product_manager_unavailable(self) -> None:
+        self.products.unavailable = True
+
+        self.assertEqual(self.post([{'items': [{'product_id': 1, 'quantity': 1}]}]).status_code, 503)
+        self.assertEqual(Order.objects.count(), 0)
+
+
+class IdempotentOrderCreationTests(TestCase):
+    """
+    `POST /api/orders/` with an `Idempotency-Key` header creates the order once and replays its response.
+    """
+    def setUp(self) -> None:
+        get_product_cache().invalidate()
+        self.client: APIClient = APIClient()
+        self.products: FakeProductClient = FakeProductClient({1: ('10.99', 5)})
+        patcher = mock.patch('orders.views.get_product_client', return_value=self.products)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, data: dict[str, Any], key: str = 'order-1') -> Any:
+        return self.client.post(reverse('order-list-create'), data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self) -> None:
+        data: dict[str, Any] = {'items': [{'product_id': 1, 'quantity': 2}]}
+        first = self.post(data)
+        replayed = self.post(data)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn(REPLAYED_HEADER, first)
+        self.assertEqual(replayed.status_code, 201)
+        self.assertEqual(replayed[REPLAYED_HEADER], 'true')
+        self.assertEqual(replayed.content, first.content)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.products.calls.count('reserve_stock'), 1)
+
+        # Another key creates another order
+        self.assertEqual(self.post(data, key='order-2').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_different_request(self) -> None:
+        self.post({'items': [{'product_id': 1, 'quantity': 2}]})
+        response = self.post({'items': [{'product_id': 1, 'quantity': 3}]})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failure_releases_the_key(self) -> None:
+        data: dict[str, Any] = {'items': [{'product_id': 1, 'quantity': 2}]}
+        self.products.unavailable = True
+        self.assertEqual(self.post(data).status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.products.unavailable = False
+        self.assertEqual(self.post(data).status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY={**settings.IDEMPOTENCY, 'WAIT_TIMEOUT': 0})
+    def test_request_in_progress(self) -> None:
+        data: dict[str, Any] = {'items': [{'product_id': 1, 'quantity': 2}]}
+        fingerprint: str = fingerprint_request('POST', reverse('order-list-create'), encode_json(data))
+        IdempotencyKey.objects.create(key='order-1', request_hash=fingerprint, expires_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(self.post(data).status_code, 409)
+        self.assertEqual(self.products.calls, [])
+
+    def test_abandoned_key(self) -> None:
+        data: dict[str, Any] = {'items': [{'product_id': 1, 'quantity': 2}]}
+        fingerprint: str = fingerprint_request('POST', reverse('order-list-create'), encode_json(data))
+        abandoned: IdempotencyKey = IdempotencyKey.objects.create(
+            key='order-1', request_hash=fingerprint, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        IdempotencyKey.objects.filter(pk=abandoned.pk).update(
+            created_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY['LOCK_TIMEOUT'] + 1)
+        )
+
+        self.assertEqual(self.post(data).status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get(key='order-1').status_code, 201)
+
+
+class OrderFilterTests(TestCase):
+    """
+    The filters of `GET /api/orders/` combine with each other and are kept in the `next` link.
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.orders: list[Order] = []
+        for day, product_ids, total in [(1, [1], '10.00'), (3, [1, 2], '25.50'), (5, [2], '99.99'), (7, [1], '100.00')]:
+            order: Order = Order.objects.create(total_price=Decimal(total), item_count=len(product_ids))
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=1, price=Decimal(total) / len(product_ids))
+                for product_id in product_ids
+            ])
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime(2025, 2, day, 12)))
+            cls.orders.append(order)
+        Order.objects.filter(pk=cls.orders[3].pk).update(status=Order.Status.PENDING)
+
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+
+    def order_ids(self, query: str) -> list[int]:
+        response = self.client.get(f'{reverse("order-list-create")}?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        ids: list[int] = [order['id'] for order in response.json()['results']]
+
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            ids += [order['id'] for order in response.json()['results']]
+        return ids
+
+    def expected(self, *positions: int) -> list[int]:
+        return [self.orders[position].pk for position in positions]
+
+    def test_product(self) -> None:
+        self.assertEqual(self.order_ids('product_id=1'), self.expected(0, 1, 3))
+        self.assertEqual(self.order_ids('product_id=3'), [])
+
+    def test_created(self) -> None:
+        self.assertEqual(self.order_ids('created_after=2025-02-03'), self.expected(1, 2, 3))
+        self.assertEqual(self.order_ids('created_before=2025-02-05T12:00:00Z'), self.expected(0, 1))
+        self.assertEqual(self.order_ids('created_after=2025-02-02&created_before=2025-02-06'), self.expected(1, 2))
+
+    def test_total(self) -> None:
+        self.assertEqual(self.order_ids('min_total=25.50&max_total=99.99'), self.expected(1, 2))
+        self.assertEqual(self.order_ids('min_total=100'), self.expected(3))
+
+    def test_status(self) -> None:
+        self.assertEqual(self.order_ids('status=pending'), self.expected(3))
+        self.assertEqual(self.order_ids('status=confirmed'), self.expected(0, 1, 2))
+
+    def test_combined_across_pages(self) -> None:
+        self.assertEqual(self.order_ids('product_id=1&created_after=2025-02-02&limit=1'), self.expected(1, 3))
+        self.assertEqual(self.order_ids('product_id=2&max_total=50&limit=1'), self.expected(1))
+
+    def test_invalid(self) -> None:
+        for query in ['product_id=a', 'created_after=yesterday', 'min_total=-1', 'max_total=nan', 'status=lost']:
+            response = self.client.get(f'{reverse("order-list-create")}?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class OrderListPaginationTests(TestCase):
+    """
+    Following the `next` links of `GET /api/orders/` returns every order once, oldest first,
+    also when several orders were created at the same time.
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        orders: list[Order] = Order.objects.bulk_create([
+            Order(total_price=Decimal('10.00'), item_count=0) for _ in range(12)
+        ])
+        # Three orders per instant, created out of order
+        for position, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.make_aware(datetime(2025, 3, 1, 12)) + timedelta(minutes=(3 - position % 4))
+            )
+
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+
+    def test_every_order_once(self) -> None:
+        expected: list[int] = list(Order.objects.order_by('created_at', 'pk').values_list('pk', flat=True))
+
+        for limit in [1, 2, 5, 100]:
+            response = self.client.get(f'{reverse("order-list-create")}?include_items=false&limit={limit}')
+            ids: list[int] = []
+            while True:
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertLessEqual(len(response.json()['results']), limit)
+                ids += [order['id'] for order in response.json()['results']]
+                if not response.json()['next']:
+                    break
+                response = self.client.get(response.json()['next'])
+            self.assertEqual(ids, expected, limit)
+
+    def test_ordering_is_fixed(self) -> None:
+        response = self.client.get(f'{reverse("order-list-create")}?ordering=-created_at&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['id'], Order.objects.order_by('created_at', 'pk').first().pk)
+
+    def test_invalid(self) -> None:
+        foreign_cursor: str = OrderPagination.encode_cursor('id', 1, 1)
+        for query in ['cursor=garbage', f'cursor={foreign_cursor}', 'limit=0', 'limit=many']:
+            response = self.client.get(f'{reverse("order-list-create")}?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class ProfilingTests(TestCase):
+    """
+    With profiling enabled, requests sent with `X-Profile: 1` are captured and listed under `/debug/profiles/`.
+    """
+    def setUp(self) -> None:
+        directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory: Path = Path(directory.name)
+
+        profiling_settings = override_settings(PROFILING={
+            **settings.PROFILING, 'ENABLED': True, 'DIR': self.directory, 'SAMPLE_RATE': 0, 'MAX_CAPTURES': 2,
+        })
+        profiling_settings.enable()
+        self.addCleanup(profiling_settings.disable)
+        # Created after enabling profiling, since the middleware reads its settings when the client loads it
+        self.client: APIClient = APIClient()
+
+    def test_capture(self) -> None:
+        response = self.client.get(reverse('order-list-create'), HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        capture: str = response[PROFILE_ID_HEADER]
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()),
+            [f'{capture}.collapsed', f'{capture}.json', f'{capture}.prof'],
+        )
+        pstats.Stats(str(self.directory / f'{capture}.prof'))
+
+        listed: dict[str, Any] = self.client.get(reverse('profiles')).json()
+        self.assertEqual(listed['count'], 1)
+        self.assertEqual(listed['results'][0]['route'], 'api/orders/')
+        self.assertEqual(listed['results'][0]['status'], 200)
+        self.assertEqual(self.client.get(listed['results'][0]['files']['collapsed']).status_code, 200)
+
+    def test_not_requested(self) -> None:
+        response = self.client.get(reverse('order-list-create'))
+
+        self.assertNotIn(PROFILE_ID_HEADER, response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_oldest_captures_are_pruned(self) -> None:
+        for _ in range(3):
+            self.client.get(reverse('order-list-create'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(list_captures()), 2)
+        self.assertEqual(len(list(self.directory.iterdir())), 6)
+
+        # Modification times may be equal within the resolution of the file system, so age one capture
+        pruned, kept = [capture['id'] for capture in list_captures()]
+        os.utime(self.directory / f'{pruned}.json', (time.time() - 60, time.time() - 60))
+        prune_captures(self.directory, 1)
+
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()), [f'{kept}.collapsed', f'{kept}.json', f'{kept}.prof']
+        )
+
+    def test_disabled(self) -> None:
+        with override_settings(PROFILING={**settings.PROFILING, 'ENABLED': False}):
+            client: APIClient = APIClient()
+            response = client.get(reverse('order-list-create'), HTTP_X_PROFILE='1')
+
+            self.assertNotIn(PROFILE_ID_HEADER, response)
+            self.assertEqual(client.get(reverse('profiles')).status_code, 404)
+
+
+@override_settings(ORDER_OUTBOX={**settings.ORDER_OUTBOX, 'LEASE': 60, 'RETRY_DELAY': 1, 'MAX_RETRY_DELAY': 4})
+class OrderOutboxTests(TestCase):
+    """
+    Pending orders are claimed from the outbox in batches, confirmed or rejected, or retried later with
+    an increasing delay while the Product Manager is unavailable.
+    """
+    def setUp(self) -> None:
+        get_product_cache().invalidate()
+        self.products: FakeProductClient = FakeProductClient({1: ('10.99', 5), 2: ('0.10', 1)})
+
+    def test_confirm(self) -> None:
+        first: Order = accept_order({1: 2, 2: 1})
+        second: Order = accept_order({1: 3})
+
+        self.assertEqual(process_outbox(self.products, batch_size=10), {'confirmed': 2})
+        # The stock of the whole batch is reserved with a single call
+        self.assertEqual(self.products.calls, ['reserve_stock'])
+        self.assertEqual(self.products.products[1]['stock'], 0)
+
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.total_price, first.item_count), (Order.Status.CONFIRMED, Decimal('22.08'), 2))
+        self.assertEqual(Order.objects.get(pk=second.pk).items.get().quantity, 3)
+        self.assertFalse(OrderOutbox.objects.exists())
+        self.assertEqual(process_outbox(self.products, batch_size=10), {})
+
+    def test_claim_lease(self) -> None:
+        for _ in range(3):
+            accept_order({1: 1})
+
+        claimed: list[OrderOutbox] = claim_batch(2)
+        self.assertEqual(len(claimed), 2)
+        # Claimed rows are skipped by other workers until their lease expires
+        self.assertEqual([entry.pk for entry in claim_batch(10)], [OrderOutbox.objects.order_by('pk').last().pk])
+        self.assertEqual(claim_batch(10), [])
+
+        OrderOutbox.objects.filter(pk=claimed[0].pk).update(available_at=timezone.now())
+        self.assertEqual([entry.pk for entry in claim_batch(10)], [claimed[0].pk])
+
+    def test_reject(self) -> None:
+        accept_order({1: 4})
+        rejected: Order = accept_order({1: 2})
+        missing: Order = accept_order({9: 1})
+        accept_order({1: 1, 2: 1})
+
+        self.assertEqual(process_outbox(self.products, batch_size=10), {'confirmed': 2, 'rejected': 2})
+        self.assertEqual(
+            list(Order.objects.order_by('pk').values_list('status', flat=True)),
+            [Order.Status.CONFIRMED, Order.Status.REJECTED, Order.Status.REJECTED, Order.Status.CONFIRMED],
+        )
+        self.assertFalse(OrderItem.objects.filter(order__in=[rejected, missing]).exists())
+        self.assertEqual(self.products.products[1]['stock'], 0)
+        self.assertFalse(OrderOutbox.objects.exists())
+
+    def test_backoff(self) -> None:
+        order: Order = accept_order({1: 1})
+        self.products.unavailable = True
+
+        for attempts, delay in [(1, 1), (2, 2), (3, 4), (4, 4)]:
+            with self.assertLogs('orders', 'WARNING'):
+                self.assertEqual(process_outbox(self.products, batch_size=10), {'postponed': 1})
+
+            entry: OrderOutbox = OrderOutbox.objects.get()
+            self.assertEqual((entry.attempts, entry.claimed_by), (attempts, ''))
+            self.assertAlmostEqual((entry.available_at - timezone.now()).total_seconds(), delay, delta=0.5)
+            self.assertEqual(retry_delay(attempts), delay)
+            # Not retried before its delay
+            self.assertEqual(process_outbox(self.products, batch_size=10), {})
+            OrderOutbox.objects.update(available_at=timezone.now())
+
+        self.products.unavailable = False
+        self.assertEqual(process_outbox(self.products, batch_size=10), {'confirmed': 1})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.Status.CONFIRMED)
+
+    def test_deleted_pending_order(self) -> None:
+        kept: Order = accept_order({1: 1})
+        deleted: Order = accept_order({1: 2})
+        entries: list[OrderOutbox] = claim_batch(10)
+        deleted.delete()
+
+        self.assertEqual(process_batch(entries, self.products), {'confirmed': 2})
+        # The stock reserved for the deleted order is given back
+        self.assertEqual(self.products.calls, ['reserve_stock', 'release_stock'])
+        self.assertEqual(self.products.products[1]['stock'], 4)
+        self.assertEqual(Order.objects.get().pk, kept.pk)
+
+
+class SalesRollupTests(TestCase):
+    """
+    The daily sales of every product are kept up to date as orders are created and deleted.
+    """
+    products: dict[int, ProductData] = {
+        1: {'id': 1, 'name': 'Producto 1', 'price': '10.99'},
+        2: {'id': 2, 'name': 'Producto 2', 'price': '0.10'},
+    }
+
+    def sales(self) -> list[tuple[int, int, Decimal, int]]:
+        return list(ProductDailySales.objects.order_by('product_id').values_list('product_id', 'units', 'revenue', 'order_count'))
+
+    def test_upsert(self) -> None:
+        save_order({1: 2}, self.products)
+        self.assertEqual(self.sales(), [(1, 2, Decimal('21.98'), 1)])
+
+        save_order({1: 1, 2: 3}, self.products)
+        save_orders([{1: 1}, {2: 1}], self.products)
+        self.assertEqual(self.sales(), [(1, 4, Decimal('43.96'), 3), (2, 4, Decimal('0.40'), 2)])
+        self.assertEqual(ProductDailySales.objects.get(product_id=1).day, sales_day(Order.objects.first().created_at))
+
+    def test_delete(self) -> None:
+        first: Order = save_order({1: 2, 2: 1}, self.products)
+        save_order({1: 1}, self.products)
+
+        delete_order(first)
+        self.assertEqual(self.sales(), [(1, 1, Decimal('10.99'), 1)])
+        # A second deletion of the same order subtracts nothing
+        delete_order(first)
+        self.assertEqual(self.sales(), [(1, 1, Decimal('10.99'), 1)])
+
+        delete_order(Order.objects.get())
+        self.assertEqual(self.sales(), [])
+
+    def test_delete_endpoint(self) -> None:
+        order: Order = save_order({1: 2}, self.products)
+
+        self.assertEqual(APIClient().delete(reverse('product-detail-delete', args=[order.pk])).status_code, 204)
+        self.assertEqual(self.sales(), [])
+
+    def test_rebuild(self) -> None:
+        save_order({1: 2, 2: 1}, self.products)
+        save_orders([{1: 1}, {2: 5}], self.products)
+        Order.objects.create(status=Order.Status.PENDING)
+        incremental: list[tuple[int, int, Decimal, int]] = self.sales()
+
+        self.assertEqual(rebuild_sales(), 2)
+        self.assertEqual(self.sales(), incremental)
+
+    def test_report(self) -> None:
+        save_order({1: 2, 2: 1}, self.products)
+        save_order({1: 1}, self.products)
+        today: str = sales_day(timezone.now()).isoformat()
+        client: APIClient = APIClient()
+
+        response = client.get(reverse('sales-report'), {'start': today, 'end': today, 'group_by': 'day'})
+        self.assertEqual(response.json(), [{'day': today, 'units': 4, 'revenue': 33.07, 'order_count': 3}])
+
+        response = client.get(reverse('sales-report'), {'start': today, 'end': today, 'product_id': 2})
+        self.assertEqual(response.json(), [{'product_id': 2, 'day': today, 'units': 1, 'revenue': 0.1, 'order_count': 1}])
+
+        self.assertEqual(client.get(reverse('sales-report'), {'start': today}).status_code, 400)
@@ -1,5 +1,14 @@
 from django.urls import URLPattern, path
-from .views import OrderListCreateView, OrderDetailDeleteView
+from .views import (
+    OrderListCreateView,
+    OrderBatchCreateView,
+    OrderExportView,
+    OrderDetailDeleteView,
+    SalesReportView,
+    ProductCacheView,
+    ProductCacheInvalidateView,
+)
+from .async_views import order_create_async
 
 
 # Define the URL patterns for the order-related endpoints.
@@ -7,6 +16,24 @@ urlpatterns: list[URLPattern] = [
     # Endpoint to list all orders or create a new order.
     path('', OrderListCreateView.as_view(), name='order-list-create'),
 
+    # Endpoint to create several orders in a single request.
+    path('batch/', OrderBatchCreateView.as_view(), name='order-batch-create'),
+
+    # Endpoint to stream all orders as NDJSON.
+    path('export/', OrderExportView.as_view(), name='order-export'),
+
+    # Endpoint to create a new order asynchronously, intended to be served through ASGI.
+    path('async/', order_create_async, name='order-create-async'),
+
+    # Endpoint to report the sales of products per day, read from the sales rollups.
+    path('sales/', SalesReportView.as_view(), name='sales-report'),
+
+    # Endpoint to inspect the hit/miss counters of the product cache.
+    path('product-cache/', ProductCacheView.as_view(), name='product-cache'),
+
+    # Endpoint used by the Product Manager to invalidate cached products.
+    path('product-cache/invalidate/', ProductCacheInvalidateView.as_view(), name='product-cache-invalidate'),
+
     # Endpoint to retrieve or delete a specific order by its primary key (order_id).
     path('<int:pk>/', OrderDetailDeleteView.as_view(), name='product-detail-delete'),
 ]
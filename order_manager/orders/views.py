@@ -1,15 +1,71 @@
 from collections import defaultdict
-from typing import Union, Tuple, Optional
-import requests
+from datetime import date
+from typing import Any, Iterator, Union, Tuple, Optional
+from django.conf import settings
+from django.db.models import QuerySet, Sum
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.request import Request
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, ErrorSerializer
-from drf_spectacular.utils import extend_schema
-
-PRODUCT_API_BASE: str = 'http://127.0.0.1:8000/api/products/'
+from common.exports import EXPORT_CHUNK_SIZE, NDJSONRenderer, ndjson_response
+from common.pagination import InvalidCursor
+from common.serializers import ValuesSerializer
+from .models import Order, OrderItem, ProductDailySales
+from .pagination import OrderPagination
+from .filters import InvalidFilter, filter_orders, parse_date_param
+from .cache import get_product_cache
+from .serializers import (
+    ORDER_ITEM_VALUES,
+    ORDER_SUMMARY_VALUES,
+    ORDER_VALUES,
+    OrderSerializer,
+    OrderSummarySerializer,
+    OrderPageSerializer,
+    OrderBatchSerializer,
+    ProductCacheInvalidationSerializer,
+    ProductCacheStatsSerializer,
+    ProductSalesSerializer,
+    ErrorSerializer,
+)
+from .clients import ProductServiceError, get_product_client
+from .services import BATCH_ABORTED_ERROR, delete_order, place_order, place_orders
+from .outbox import accept_order
+from .idempotency import IDEMPOTENCY_KEY_HEADER, idempotent
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+# Maximum number of orders accepted in a single batch.
+MAX_BATCH_ORDERS: int = 500
+
+BATCH_TRANSACTION_MODES: tuple[str, ...] = ('order', 'batch')
+
+# Groupings of the sales report: totals per product or per day over the requested range.
+SALES_GROUPINGS: tuple[str, ...] = ('product', 'day')
+
+INCLUDE_ITEMS_PARAMETER: OpenApiParameter = OpenApiParameter(
+    name='include_items',
+    type=bool,
+    description='Whether to include the items of each order (default `true`). Without items, no order item is read.',
+)
+
+ORDER_FILTER_PARAMETERS: list[OpenApiParameter] = [
+    OpenApiParameter(name='product_id', type=int, description='Only orders containing this product'),
+    OpenApiParameter(name='created_after', type=str, description='Only orders created at or after this date (ISO 8601)'),
+    OpenApiParameter(name='created_before', type=str, description='Only orders created before this date (ISO 8601)'),
+    OpenApiParameter(name='min_total', type=float, description='Only orders whose total price is at least this amount'),
+    OpenApiParameter(name='max_total', type=float, description='Only orders whose total price is at most this amount'),
+    OpenApiParameter(name='status', type=str, enum=Order.Status.values, description='Only orders in this status'),
+]
+
+IDEMPOTENCY_KEY_PARAMETER: OpenApiParameter = OpenApiParameter(
+    name=IDEMPOTENCY_KEY_HEADER,
+    type=str,
+    location=OpenApiParameter.HEADER,
+    description=(
+        'Optional unique key of the request. Retries with the same key and body return the stored response '
+        'without creating anything again.'
+    ),
+)
 
 
 def validate_and_group_items(items: list[dict[str, int]]) -> Union[Tuple[dict[int, int], None], Tuple[None, str]]:
@@ -48,35 +104,126 @@ def validate_and_group_items(items: list[dict[str, int]]) -> Union[Tuple[dict[in
     return dict(grouped_items), None
 
 
+def includes_items(request: Request) -> bool:
+    """
+    Returns whether the client wants the items of the orders, from the `include_items` query parameter.
+    """
+    return request.query_params.get('include_items', '').lower() not in ('0', 'false', 'no')
+
+
+def order_queryset(include_items: bool) -> QuerySet:
+    """
+    Returns the orders to read, prefetching their items only if they are going to be serialized.
+    """
+    return Order.objects.prefetch_related('items') if include_items else Order.objects.all()
+
+
+def order_serializer_class(include_items: bool) -> type[OrderSummarySerializer]:
+    """
+    Returns the serializer matching `order_queryset`.
+    """
+    return OrderSerializer if include_items else OrderSummarySerializer
+
+
+def order_values(include_items: bool) -> ValuesSerializer:
+    """
+    Returns the row serializer matching `order_serializer_class`, for the read-only list endpoints.
+    """
+    return ORDER_VALUES if include_items else ORDER_SUMMARY_VALUES
+
+
+def serialize_order_rows(rows: list[tuple], include_items: bool) -> list[dict[str, Any]]:
+    """
+    Serializes orders read with `values_list(*order_values(include_items).columns)`, with the same output as
+    `order_serializer_class`. The items of all the orders are read with a single query, also as tuples.
+
+    Args:
+        rows (list[tuple]): The order rows.
+        include_items (bool): Whether to include the items of each order.
+
+    Returns:
+        list[dict[str, Any]]: The serialized orders.
+    """
+    if not include_items:
+        return ORDER_SUMMARY_VALUES.serialize(rows)
+
+    pk_index: int = ORDER_VALUES.columns.index('id')
+    item_rows: list[tuple] = list(
+        OrderItem.objects.filter(order__in=[row[pk_index] for row in rows])
+        .order_by('order', 'pk')
+        .values_list(*ORDER_ITEM_VALUES.columns, 'order')
+    )
+
+    items: defaultdict[int, list[dict[str, Any]]] = defaultdict(list)
+    for item_row, item in zip(item_rows, ORDER_ITEM_VALUES.serialize(item_rows)):
+        items[item_row[-1]].append(item)
+
+    return ORDER_VALUES.serialize(rows, nested={'items': items})
+
+
 class OrderListCreateView(APIView):
     """
     Handles listing all orders and creating new orders.
     """
     @extend_schema(
         summary='List all orders',
-        description='Returns a list of all available orders with their details.',
+        description=(
+            'Returns a page of orders with their details, oldest first, optionally filtered by product, '
+            'creation date and total price. '
+            'Follow the `next` link to fetch the following page; it is `null` on the last page.'
+        ),
         tags=['Orders'],
-        responses={200: OrderSerializer(many=True)},
+        parameters=[
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor taken from the `next` link of the previous page'),
+            OpenApiParameter(name='limit', type=int, description=f'Number of orders per page (maximum {OrderPagination.max_limit})'),
+            INCLUDE_ITEMS_PARAMETER,
+            *ORDER_FILTER_PARAMETERS,
+        ],
+        responses={
+            200: OrderPageSerializer,
+            400: ErrorSerializer,
+        },
     )
     def get(self, request: Request) -> Response:
         """
-        Retrieves a list of all orders.
+        Retrieves a page of orders.
+
+        Totals are stored with each order and items are fetched for the whole page with a single query,
+        or not at all with `include_items=false`, so the number of queries does not depend on the number of orders.
+        Orders and items are read as tuples and serialized without building model instances.
+
+        Args:
+            request (Request): The Request object containing the optional `cursor`, `limit`,
+                               `include_items` and filter parameters.
 
         Returns:
-            Response: A Response object containing the serialized list of orders.
+            Response: A Response object containing the serialized page of orders, or an error message
+                      if the pagination or filter parameters are invalid.
         """
-        orders: list[Order] = Order.objects.all()
-        serializer: OrderSerializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        paginator: OrderPagination = OrderPagination()
+        include_items: bool = includes_items(request)
+        columns: list[str] = order_values(include_items).columns
+
+        try:
+            rows: list[tuple] = paginator.paginate_queryset(
+                filter_orders(Order.objects.all(), request).values_list(*columns), request, columns
+            )
+        except (InvalidCursor, InvalidFilter) as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(paginator.get_paginated_data(serialize_order_rows(rows, include_items)))
 
 
     @extend_schema(
         summary='Create a new order',
         description=(
             'Creates a new order and validates product availability and stock. '
-            'Deducts the appropriate stock from the product inventory and adds the order items.'
+            'Deducts the appropriate stock from the product inventory and adds the order items. '
+            'When asynchronous creation is enabled, the order is stored as `pending` without items and answered '
+            'with 202; it becomes `confirmed` with its items once its stock is reserved, or `rejected`.'
         ),
         tags=['Orders'],
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
         request={
             'application/json': {
                 'example': {
@@ -89,10 +236,15 @@ class OrderListCreateView(APIView):
         },
         responses={
             201: OrderSerializer(),
+            202: OrderSerializer(),
             400: ErrorSerializer,
             404: ErrorSerializer,
+            409: ErrorSerializer,
+            422: ErrorSerializer,
+            503: ErrorSerializer,
         },
     )
+    @idempotent
     def post(self, request: Request) -> Response:
         """
         Creates a new order after validating items, checking product availability, and updating stock.
@@ -112,48 +264,181 @@ class OrderListCreateView(APIView):
         if error:
             return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-        order: Order = Order.objects.create()
+        if settings.ORDER_OUTBOX['ENABLED']:
+            # The stock is reserved later by the outbox worker
+            return Response(OrderSerializer(accept_order(grouped_items)).data, status=status.HTTP_202_ACCEPTED)
 
-        for product_id, quantity in grouped_items.items():
-            # Fetch product details from the Product Manager API
-            product_response: requests.Response = requests.get(f'{PRODUCT_API_BASE}{product_id}/')
-            if product_response.status_code != 200:
-                order.delete()
-                return Response({'error': f'Product {product_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            order: Order = place_order(grouped_items, get_product_client())
+        except ProductServiceError as error:
+            return Response({'error': error.message}, status=error.status_code)
 
-            product_data: dict[str, Union[str, int, float]] = product_response.json()
+        serializer: OrderSerializer = OrderSerializer(order)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
 
-            # Ensure that the total quantity does not exceed the available stock
-            if product_data['stock'] < quantity:
-                order.delete()
-                return Response(
-                    {'error': f'Insufficient stock for product {product_id}'},
-                    status=status.HTTP_400_BAD_REQUEST
+class OrderBatchCreateView(APIView):
+    """
+    Handles creating several orders in a single request.
+    """
+    @extend_schema(
+        summary='Create several orders',
+        description=(
+            f'Creates up to {MAX_BATCH_ORDERS} orders at once. Every distinct product of the batch is looked up '
+            'with a single call to the Product Manager. With `"transaction": "order"` (the default) each order is '
+            'created or rejected on its own; with `"transaction": "batch"` the stock of the whole batch is reserved '
+            'at once and either every order is created or none. Results are returned in the order of the request: '
+            'status 201 if every order was created, 207 if only some were, and 400 if none were.'
+        ),
+        tags=['Orders'],
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+        request={
+            'application/json': {
+                'example': {
+                    'transaction': 'order',
+                    'orders': [
+                        {'items': [{'product_id': 1, 'quantity': 2}, {'product_id': 3, 'quantity': 1}]},
+                        {'items': [{'product_id': 1, 'quantity': 1}]}
+                    ]
+                }
+            }
+        },
+        responses={
+            201: OrderBatchSerializer,
+            207: OrderBatchSerializer,
+            400: OrderBatchSerializer,
+            409: ErrorSerializer,
+            422: ErrorSerializer,
+            503: ErrorSerializer,
+        },
+    )
+    @idempotent
+    def post(self, request: Request) -> Response:
+        """
+        Creates several orders, validating each of them and checking product availability and stock.
+
+        Args:
+            request (Request): The Request object containing the orders and the transaction mode.
+
+        Returns:
+            Response: A Response object containing the outcome of each order, or an error message if the
+                      batch itself is invalid or the Product Manager is unavailable.
+        """
+        orders: Any = request.data.get('orders') if isinstance(request.data, dict) else None
+        if not isinstance(orders, list) or not orders:
+            return Response({'error': 'No orders provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(orders) > MAX_BATCH_ORDERS:
+            return Response({'error': f'At most {MAX_BATCH_ORDERS} orders can be sent at once'}, status=status.HTTP_400_BAD_REQUEST)
+
+        mode: Any = request.data.get('transaction', 'order')
+        if mode not in BATCH_TRANSACTION_MODES:
+            return Response({'error': "'transaction' must be 'order' or 'batch'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results: list[Optional[dict[str, Any]]] = []
+        valid_orders: list[tuple[int, dict[int, int]]] = []
+
+        for index, order_data in enumerate(orders):
+            items: Any = order_data.get('items', []) if isinstance(order_data, dict) else []
+            grouped_items, error = validate_and_group_items(items) if items else (None, 'No items provided')
+
+            if error:
+                results.append({'status': status.HTTP_400_BAD_REQUEST, 'error': error})
+            else:
+                results.append(None)
+                valid_orders.append((index, grouped_items))
+
+        if mode == 'batch' and len(valid_orders) < len(orders):
+            # A single invalid order rejects the whole batch
+            for index, _ in valid_orders:
+                results[index] = {'status': status.HTTP_424_FAILED_DEPENDENCY, 'error': BATCH_ABORTED_ERROR}
+            valid_orders = []
+
+        if valid_orders:
+            try:
+                outcomes: list[Union[Order, ProductServiceError]] = place_orders(
+                    [grouped_items for _, grouped_items in valid_orders], get_product_client(), atomic=mode == 'batch'
                 )
+            except ProductServiceError as error:
+                return Response({'error': error.message}, status=error.status_code)
 
-            # Update product stock
-            stock_update_response: requests.Response = requests.patch(
-                f'{PRODUCT_API_BASE}{product_id}/stock/',
-                data={'stock': product_data['stock'] - quantity}
+            # Fetch the created orders with their items in two queries
+            created: dict[int, Order] = Order.objects.prefetch_related('items').in_bulk(
+                [outcome.pk for outcome in outcomes if isinstance(outcome, Order)]
             )
 
-            if stock_update_response.status_code != 200:
-                order.delete()
-                return Response(
-                    {'error': f'Failed to update stock for product {product_id}'},
-                    status=status.HTTP_400_BAD_REQUEST
+            for (index, _), outcome in zip(valid_orders, outcomes):
+                if isinstance(outcome, Order):
+                    results[index] = {'status': status.HTTP_201_CREATED, 'order': OrderSerializer(created[outcome.pk]).data}
+                else:
+                    results[index] = {'status': outcome.status_code, 'error': outcome.message}
+
+        created_count: int = sum(result['status'] == status.HTTP_201_CREATED for result in results)
+        if created_count == len(results):
+            response_status: int = status.HTTP_201_CREATED
+        elif created_count:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({'results': results}, status=response_status)
+
+
+class OrderExportView(APIView):
+    """
+    Handles exporting the whole order history as a stream.
+    """
+    renderer_classes = [NDJSONRenderer]
+
+    @extend_schema(
+        summary='Export all orders',
+        description=(
+            'Streams every order with its items and total price as newline-delimited JSON (`application/x-ndjson`), '
+            'one order per line, ordered by ID. Accepts the same filters as the order list. '
+            'Orders and their items are fetched in batches, so memory usage '
+            'does not depend on the size of the history. The response is gzip-compressed when the request sends '
+            '`Accept-Encoding: gzip`.'
+        ),
+        tags=['Orders'],
+        parameters=[INCLUDE_ITEMS_PARAMETER, *ORDER_FILTER_PARAMETERS],
+        responses={
+            (200, 'application/x-ndjson'): OrderSerializer,
+            400: ErrorSerializer,
+        },
+    )
+    def get(self, request: Request) -> Union[StreamingHttpResponse, Response]:
+        """
+        Streams all orders as NDJSON.
+
+        Args:
+            request (Request): The Request object containing the optional `include_items` and filter parameters.
+
+        Returns:
+            StreamingHttpResponse: A streaming response with one serialized order per line, or an error
+                                   message if the filter parameters are invalid.
+        """
+        include_items: bool = includes_items(request)
+        columns: list[str] = order_values(include_items).columns
+        pk_index: int = columns.index('id')
+
+        try:
+            orders: QuerySet = filter_orders(Order.objects.all(), request).values_list(*columns)
+        except InvalidFilter as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def order_chunks() -> Iterator[list[dict[str, Any]]]:
+            last_pk: int = 0
+            while True:
+                # Each batch costs one query for the orders and, if requested, one for their items
+                chunk: list[tuple] = list(
+                    orders.filter(pk__gt=last_pk).order_by('pk')[:EXPORT_CHUNK_SIZE]
                 )
+                if not chunk:
+                    return
+                yield serialize_order_rows(chunk, include_items)
+                last_pk = chunk[-1][pk_index]
 
-            OrderItem.objects.create(
-                order=order,
-                product_id=product_id,
-                quantity=quantity,
-                price=product_data['price']
-            )
+        return ndjson_response(order_chunks(), request)
 
-        serializer: OrderSerializer = OrderSerializer(order)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    
 
 class OrderDetailDeleteView(APIView):
     """
@@ -163,6 +448,7 @@ class OrderDetailDeleteView(APIView):
         summary='Get order details',
         description='Returns detailed information about an order identified by its ID.',
         tags=['Orders'],
+        parameters=[INCLUDE_ITEMS_PARAMETER],
         responses={
             200: OrderSerializer,
             404: ErrorSerializer,
@@ -178,12 +464,14 @@ class OrderDetailDeleteView(APIView):
         Returns:
             Response: A Response object containing the serialized order or an error message if the order does not exist.
         """
+        include_items: bool = includes_items(request)
+
         try:
-            product: Order = Order.objects.get(pk=pk)
+            product: Order = order_queryset(include_items).get(pk=pk)
         except Order.DoesNotExist:
             return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer: OrderSerializer = OrderSerializer(product)
+        serializer: OrderSummarySerializer = order_serializer_class(include_items)(product)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -211,6 +499,138 @@ class OrderDetailDeleteView(APIView):
         except Order.DoesNotExist:
             return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        order.delete()
+        delete_order(order)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SalesReportView(APIView):
+    """
+    Handles reporting the sales of products over a range of days.
+    """
+    @extend_schema(
+        summary='Get product sales',
+        description=(
+            'Returns the units sold, revenue and number of orders of every product on every day between `start` '
+            'and `end` (both included), or their totals per product or per day with `group_by`. Only confirmed '
+            'orders count. Served from a rollup table kept up to date in the same transaction as every order '
+            'creation and deletion, so no order item is read.'
+        ),
+        tags=['Sales'],
+        parameters=[
+            OpenApiParameter(name='start', type=str, required=True, description='First day of the range (ISO 8601)'),
+            OpenApiParameter(name='end', type=str, required=True, description='Last day of the range (ISO 8601)'),
+            OpenApiParameter(name='product_id', type=int, description='Only the sales of this product'),
+            OpenApiParameter(name='group_by', type=str, enum=list(SALES_GROUPINGS), description='Sum the sales per product or per day'),
+        ],
+        responses={
+            200: ProductSalesSerializer(many=True),
+            400: ErrorSerializer,
+        },
+    )
+    def get(self, request: Request) -> Response:
+        """
+        Retrieves the sales of the requested range.
+
+        Args:
+            request (Request): The Request object containing the `start` and `end` days and the optional
+                               `product_id` and `group_by` parameters.
+
+        Returns:
+            Response: A Response object containing the sales, ordered by day and product, or an error message
+                      if the parameters are invalid.
+        """
+        try:
+            start: Optional[date] = parse_date_param(request, 'start')
+            end: Optional[date] = parse_date_param(request, 'end')
+        except InvalidFilter as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if start is None or end is None:
+            return Response({'error': "'start' and 'end' are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if end < start:
+            return Response({'error': "'end' must not be before 'start'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows: QuerySet = ProductDailySales.objects.filter(day__gte=start, day__lte=end)
+
+        raw_product_id: Optional[str] = request.query_params.get('product_id')
+        if raw_product_id:
+            try:
+                rows = rows.filter(product_id=int(raw_product_id))
+            except ValueError:
+                return Response({'error': "'product_id' must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by: Optional[str] = request.query_params.get('group_by')
+        if not group_by:
+            sales: list[dict[str, Any]] = list(
+                rows.order_by('day', 'product_id').values('product_id', 'day', 'units', 'revenue', 'order_count')
+            )
+        elif group_by in SALES_GROUPINGS:
+            key: str = 'product_id' if group_by == 'product' else 'day'
+            sales = [
+                {key: row[key], 'units': row['total_units'], 'revenue': row['total_revenue'], 'order_count': row['total_orders']}
+                for row in rows.values(key)
+                .annotate(total_units=Sum('units'), total_revenue=Sum('revenue'), total_orders=Sum('order_count'))
+                .order_by(key)
+            ]
+        else:
+            return Response({'error': "'group_by' must be 'product' or 'day'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ProductSalesSerializer(sales, many=True).data, status=status.HTTP_200_OK)
+
+
+class ProductCacheView(APIView):
+    """
+    Handles inspecting the product cache of the order manager.
+    """
+    @extend_schema(
+        summary='Get product cache statistics',
+        description=(
+            'Returns the hit and miss counters and the configuration of the product cache of the worker '
+            'that handles the request, to tune its size and TTL.'
+        ),
+        tags=['Product cache'],
+        responses={200: ProductCacheStatsSerializer},
+    )
+    def get(self, request: Request) -> Response:
+        """
+        Retrieves the statistics of the product cache.
+
+        Returns:
+            Response: A Response object containing the counters and configuration of the cache.
+        """
+        return Response(get_product_cache().stats(), status=status.HTTP_200_OK)
+
+
+class ProductCacheInvalidateView(APIView):
+    """
+    Handles invalidating cached products, called by the Product Manager when products change.
+    """
+    @extend_schema(
+        summary='Invalidate cached products',
+        description=(
+            'Removes the given products from the product cache, or every product if `product_ids` is omitted. '
+            'Called by the Product Manager whenever a product is deleted.'
+        ),
+        tags=['Product cache'],
+        request=ProductCacheInvalidationSerializer,
+        responses={
+            204: None,
+            400: ErrorSerializer,
+        },
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Invalidates cached products.
+
+        Args:
+            request (Request): The Request object containing the optional list of product IDs.
+
+        Returns:
+            Response: A Response object with status 204, or validation errors.
+        """
+        serializer: ProductCacheInvalidationSerializer = ProductCacheInvalidationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        get_product_cache().invalidate(serializer.validated_data.get('product_ids'))
         return Response(status=status.HTTP_204_NO_CONTENT)
-    
\ No newline at end of file
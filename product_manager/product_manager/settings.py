@@ -1,8 +1,16 @@
+import os
+import sys
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Code shared by both projects (the `common` package) lives in the root of the repository.
+REPO_DIR = BASE_DIR.parent
+if str(REPO_DIR) not in sys.path:
+    sys.path.append(str(REPO_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -34,6 +42,19 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON is rendered and parsed with orjson, producing the same bytes as DRF's JSONRenderer.
+    # Clients may also negotiate MessagePack (`application/msgpack`) for smaller responses.
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.ORJSONRenderer',
+        'common.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.parsers.ORJSONParser',
+        'common.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -42,7 +63,76 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Keyset pagination of the product list (products.pagination.ProductPagination).
+# Kept out of REST_FRAMEWORK: DRF warns about a PAGE_SIZE without a DEFAULT_PAGINATION_CLASS.
+
+PRODUCT_PAGINATION = {
+    # Products per page when the client does not send `limit`.
+    'PAGE_SIZE': 100,
+}
+
+# URLs notified with the IDs of deleted products, e.g. the product cache invalidation
+# endpoint of the order manager. Comma-separated in the environment variable.
+
+PRODUCT_CHANGE_WEBHOOKS = [url for url in os.environ.get('PRODUCT_CHANGE_WEBHOOKS', '').split(',') if url]
+
+# Default and maximum number of products inserted per query by the bulk creation endpoint.
+
+PRODUCT_BULK_BATCH_SIZE = int(os.environ.get('PRODUCT_BULK_BATCH_SIZE', 500))
+PRODUCT_BULK_MAX_BATCH_SIZE = 5000
+
+# Maximum number of slots the stock of a hot product can be split across (products.stock).
+
+PRODUCT_STOCK_MAX_SHARDS = int(os.environ.get('PRODUCT_STOCK_MAX_SHARDS', 64))
+
+# Change log of the products (products.changes).
+# WAIT_TIMEOUT: maximum seconds a request to the feed waits for new changes.
+# POLL_INTERVAL: seconds between checks of the log while waiting, for changes written by other processes.
+# RETENTION: seconds after which the entries superseded by a newer entry of the same product are compacted.
+# PAGE_SIZE: entries returned per request when the consumer does not send `limit`.
+
+PRODUCT_CHANGES = {
+    'WAIT_TIMEOUT': float(os.environ.get('PRODUCT_CHANGES_WAIT_TIMEOUT', 30)),
+    'POLL_INTERVAL': float(os.environ.get('PRODUCT_CHANGES_POLL_INTERVAL', 0.5)),
+    'RETENTION': float(os.environ.get('PRODUCT_CHANGES_RETENTION', 7 * 24 * 3600)),
+    'PAGE_SIZE': int(os.environ.get('PRODUCT_CHANGES_PAGE_SIZE', 100)),
+}
+
+# Tokens of the stock reservations made with `reservation` (products.stock.open_reservation), which make
+# retrying and undoing a reservation safe. RETENTION: seconds after which `purge_stock_reservations` deletes
+# them; a client must not retry or undo a reservation older than that.
+
+STOCK_RESERVATIONS = {
+    'RETENTION': float(os.environ.get('STOCK_RESERVATIONS_RETENTION', 24 * 3600)),
+}
+
+# Request metrics exposed on /metrics in the Prometheus text format (common.middleware.MetricsMiddleware).
+# DIR: directory shared by the worker processes of a server, each writing its metrics there at most every
+# FLUSH_INTERVAL seconds so that any worker can expose the totals. Empty it when the server starts.
+# Without it, each worker only exposes its own metrics.
+
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+    'DIR': os.environ.get('METRICS_DIR') or None,
+    'FLUSH_INTERVAL': float(os.environ.get('METRICS_FLUSH_INTERVAL', 5)),
+}
+
+# Profiling of selected requests (common.profiling.ProfilingMiddleware), for debugging only.
+# When ENABLED, requests with the `X-Profile: 1` header, plus a random SAMPLE_RATE fraction of all requests,
+# run under cProfile and a stack sampler (every STACK_INTERVAL seconds). Their profiles are saved to DIR,
+# keeping the MAX_CAPTURES most recent, and listed slowest first on /debug/profiles/.
+
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    'DIR': os.environ.get('PROFILING_DIR') or BASE_DIR / 'profiles',
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', 0)),
+    'STACK_INTERVAL': float(os.environ.get('PROFILING_STACK_INTERVAL', 0.001)),
+    'MAX_CAPTURES': int(os.environ.get('PROFILING_MAX_CAPTURES', 200)),
+}
+
 MIDDLEWARE = [
+    'common.middleware.MetricsMiddleware',
+    'common.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +166,50 @@ WSGI_APPLICATION = 'product_manager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the backend: 'sqlite' (default) or 'postgresql'. Connections are kept open between
+# requests for DB_CONN_MAX_AGE seconds and checked before being reused.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'product_manager'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
-}
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME') or BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Seconds a writer waits for another writer to commit before failing with "database is locked".
+                'timeout': float(os.environ.get('DB_TIMEOUT', 20)),
+                # Take the write lock when a transaction begins, so that concurrent writers queue on the timeout
+                # instead of failing when they try to upgrade a read lock halfway through.
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets reads run while a write is in progress; with it, synchronous=NORMAL only syncs on
+                # checkpoints and stays consistent after a crash. Reads go through a 256 MB memory map.
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'sqlite' or 'postgresql', not {DB_ENGINE!r}")
 
 
 # Password validation
@@ -1,12 +1,17 @@
 from django.contrib import admin
 from django.urls import URLPattern, path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from common.views import metrics_view, profile_file_view, profile_list_view
 
 
 urlpatterns: list[URLPattern] = [
     path('admin/', admin.site.urls),
     path('api/products/', include('products.urls')),
 
+    path('metrics', metrics_view, name='metrics'),
+    path('debug/profiles/', profile_list_view, name='profiles'),
+    path('debug/profiles/<slug:capture>/<slug:extension>/', profile_file_view, name='profile-file'),
+
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     default_auto_field: str = 'django.db.models.BigAutoField'
     name: str = 'products'
+
+    def ready(self) -> None:
+        from .search import create_search_index
+
+        # The search index is not part of the models, so it is created once their tables exist
+        post_migrate.connect(create_search_index, sender=self)
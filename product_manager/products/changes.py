@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef, QuerySet
+from django.utils import timezone
+from .models import ProductChange
+from .serializers import CHANGE_VALUES
+
+# Change log of the products: every creation, deletion and stock change appends one entry per product in the
+# transaction of the change, so consumers (caches, search indexers, the order manager) can follow the catalog
+# incrementally from the last sequence they have seen instead of downloading it again.
+#
+# Sequences must become visible in increasing order, or a consumer could move past an entry whose transaction
+# commits later. Numbering entries as they are inserted would require serializing every writer until it
+# commits, so writers only insert unnumbered entries and the readers of the log number the committed ones
+# (`assign_sequences`), one reader at a time. Stock writes of different products never wait for each other.
+
+# Key of the PostgreSQL advisory lock taken by the process numbering the entries.
+SEQUENCER_LOCK: int = 7301
+
+# Entries numbered per transaction.
+SEQUENCE_BATCH_SIZE: int = 1000
+
+# Entries deleted per query when compacting the log.
+COMPACTION_BATCH_SIZE: int = 1000
+
+# Notified whenever a transaction of this process that appended entries commits, waking up the requests
+# waiting for changes. Changes written by other processes are seen on the next poll of the log.
+changes_committed: threading.Condition = threading.Condition()
+
+
+def notify_waiters() -> None:
+    with changes_committed:
+        changes_committed.notify_all()
+
+
+def record_changes(change_type: str, product_ids: Iterable[int]) -> None:
+    """
+    Appends an unnumbered entry per product to the change log, within the current transaction.
+
+    Args:
+        change_type (str): The type of the change, one of `ProductChange.Type`.
+        product_ids (Iterable[int]): The IDs of the changed products.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+
+    ProductChange.objects.bulk_create([ProductChange(product_id=pk, type=change_type) for pk in product_ids])
+    transaction.on_commit(notify_waiters)
+
+
+def assign_sequences() -> int:
+    """
+    Numbers the committed entries that have no sequence yet, in insertion order, after the last sequence assigned.
+
+    Only one process numbers entries at a time, and its numbers are committed before the next one starts, so
+    sequences become visible in increasing order. SQLite runs one write transaction at a time; on PostgreSQL
+    the numbering takes an advisory lock, and returns at once if another process holds it, since that process
+    is already numbering the entries.
+
+    Returns:
+        int: The number of entries numbered.
+    """
+    pending: QuerySet = ProductChange.objects.filter(sequence__isnull=True)
+    assigned: int = 0
+
+    # Checked before opening a transaction, so that polling an idle log does not take the write lock of SQLite
+    while pending.exists():
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [SEQUENCER_LOCK])
+                    if not cursor.fetchone()[0]:
+                        break
+
+            entries: list[ProductChange] = list(pending.order_by('pk').only('pk')[:SEQUENCE_BATCH_SIZE])
+            last: int = ProductChange.objects.aggregate(last=Max('sequence'))['last'] or 0
+            for sequence, entry in enumerate(entries, start=last + 1):
+                entry.sequence = sequence
+            ProductChange.objects.bulk_update(entries, ['sequence'])
+
+        assigned += len(entries)
+    return assigned
+
+
+def read_changes(since: int, limit: int) -> list[dict[str, Any]]:
+    """
+    Returns the serialized entries following sequence `since`, oldest first, after numbering the new ones.
+    """
+    assign_sequences()
+    rows: QuerySet = ProductChange.objects.filter(sequence__gt=since).order_by('sequence').values_list(*CHANGE_VALUES.columns)
+    return CHANGE_VALUES.serialize(rows[:limit])
+
+
+def wait_for_changes(since: int, limit: int, timeout: float) -> list[dict[str, Any]]:
+    """
+    Returns the entries following sequence `since`, waiting up to `timeout` seconds for the first one to be
+    written (long polling).
+
+    Args:
+        since (int): The last sequence seen by the consumer.
+        limit (int): Maximum number of entries returned.
+        timeout (float): Maximum seconds to wait; 0 returns immediately.
+
+    Returns:
+        list[dict[str, Any]]: The serialized entries, oldest first; empty if none was written in time.
+    """
+    deadline: float = time.monotonic() + timeout
+
+    while True:
+        changes: list[dict[str, Any]] = read_changes(since, limit)
+        remaining: float = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            return changes
+
+        # Entries committed by other processes (or between the read and the wait) are found on the next poll
+        with changes_committed:
+            changes_committed.wait(min(remaining, settings.PRODUCT_CHANGES['POLL_INTERVAL']))
+
+
+def compact_changes(retention: float) -> int:
+    """
+    Deletes the entries older than `retention` seconds that are superseded by a newer entry of the same
+    product. The latest entry of every product is always kept (and with it the last sequence assigned, which
+    numbering continues from), so a consumer reading the log from any sequence (even 0) still learns about
+    every product changed since then.
+
+    Args:
+        retention (float): Seconds during which every entry is kept.
+
+    Returns:
+        int: The number of entries deleted.
+    """
+    # Unnumbered entries cannot supersede older ones yet
+    assign_sequences()
+    cutoff: datetime = timezone.now() - timedelta(seconds=retention)
+    superseded: QuerySet = ProductChange.objects.filter(created_at__lt=cutoff).filter(
+        Exists(ProductChange.objects.filter(product_id=OuterRef('product_id'), sequence__gt=OuterRef('sequence')))
+    )
+
+    deleted: int = 0
+    last: int = 0
+    # Each batch continues after the previous one, so the entries kept are not scanned again
+    while batch := list(superseded.filter(sequence__gt=last).order_by('sequence').values_list('sequence', flat=True)[:COMPACTION_BATCH_SIZE]):
+        deleted += ProductChange.objects.filter(sequence__in=batch).delete()[0]
+        last = batch[-1]
+    return deleted
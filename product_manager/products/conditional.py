@@ -0,0 +1,86 @@
+import hashlib
+from typing import Any, Optional
+from django.db.models import Count, Max, QuerySet, Sum
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+from common.renderers import representation_etag
+from .models import Product
+from .stock import shard_versions
+
+
+def queryset_etag(queryset: QuerySet, request: Request) -> str:
+    """
+    Builds the ETag of a list of products with a single aggregate query.
+
+    Every change to the list alters at least one of the aggregates: creating a product increases the
+    highest ID (IDs are never reused), deleting one lowers the count, and any other change increments
+    the version of the product, or of a stock slot for sharded products. Slots are only read when the
+    list includes a sharded product.
+
+    Args:
+        queryset (QuerySet): The products included in the response.
+        request (Request): The request, whose query string is part of the ETag.
+
+    Returns:
+        str: The ETag of the negotiated format, without quotes.
+    """
+    stats: dict[str, Optional[int]] = queryset.aggregate(
+        count=Count('pk'), max_pk=Max('pk'), versions=Sum('version'), shards=Sum('stock_shards')
+    )
+    slot_versions: Optional[int] = shard_versions(queryset) if stats['shards'] else None
+    key: str = f"{stats['count']}:{stats['max_pk']}:{stats['versions']}:{slot_versions}:{request.get_full_path()}"
+    return representation_etag(request, hashlib.md5(key.encode()).hexdigest())
+
+
+def page_response(request: Request, data: dict[str, Any]) -> HttpResponseBase:
+    """
+    Returns a page of the product list, or `304 Not Modified` if the client already has it.
+
+    The ETag is a hash of the serialized page itself (its products and its `next` link), so it costs no
+    query beyond the page and does not depend on the size of the catalog. Any change to a product of the
+    page, or a product entering or leaving it, changes the content and thus the ETag. Each format of the
+    page gets its own ETag.
+
+    Args:
+        request (Request): The request, whose `If-None-Match` header is checked.
+        data (dict[str, Any]): The serialized page.
+
+    Returns:
+        HttpResponseBase: The response, carrying the ETag of the page.
+    """
+    etag: str = quote_etag(representation_etag(request, hashlib.md5(repr(data).encode()).hexdigest()))
+    response: Optional[HttpResponseBase] = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = Response(data)
+    response.headers['ETag'] = etag
+    return response
+
+
+def product_batch_etag(request: Request) -> Optional[str]:
+    """
+    Returns the ETag of a batch of products, or None if the `ids` query parameter is invalid.
+    """
+    try:
+        product_ids: set[int] = {int(product_id) for product_id in request.GET.get('ids', '').split(',') if product_id.strip()}
+    except ValueError:
+        return None
+    if not product_ids:
+        return None
+    return queryset_etag(Product.objects.filter(pk__in=product_ids), request)
+
+
+def product_etag(request: Request, pk: int) -> Optional[str]:
+    """
+    Returns the ETag of a single product in the negotiated format, or None if it does not exist.
+    """
+    row: Optional[tuple[int, int]] = Product.objects.filter(pk=pk).values_list('version', 'stock_shards').first()
+    if row is None:
+        return None
+
+    version, shards = row
+    if shards:
+        return representation_etag(request, f'{pk}-{version}-{shard_versions(Product.objects.filter(pk=pk))}')
+    return representation_etag(request, f'{pk}-{version}')
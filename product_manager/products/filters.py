@@ -0,0 +1,123 @@
+import sys
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from rest_framework.request import Request
+from .models import StockShard
+
+TRUE_VALUES: tuple[str, ...] = ('1', 'true', 'yes')
+FALSE_VALUES: tuple[str, ...] = ('0', 'false', 'no')
+
+
+class InvalidFilter(ValueError):
+    """
+    Raised when a filter parameter of the product list cannot be parsed.
+    """
+
+
+def parse_bool_param(request: Request, name: str) -> Optional[bool]:
+    """
+    Parses a query parameter holding a boolean (`true`/`false`, `1`/`0` or `yes`/`no`).
+
+    Raises:
+        InvalidFilter: If the value is not a boolean.
+    """
+    raw: str = request.query_params.get(name, '').lower()
+    if not raw:
+        return None
+    if raw in TRUE_VALUES:
+        return True
+    if raw in FALSE_VALUES:
+        return False
+    raise InvalidFilter(f"'{name}' must be 'true' or 'false'")
+
+
+def parse_decimal_param(request: Request, name: str) -> Optional[Decimal]:
+    """
+    Parses a query parameter holding a non-negative amount.
+
+    Raises:
+        InvalidFilter: If the value is not a valid amount.
+    """
+    raw: Optional[str] = request.query_params.get(name)
+    if not raw:
+        return None
+
+    try:
+        value: Decimal = Decimal(raw)
+    except InvalidOperation:
+        raise InvalidFilter(f"'{name}' must be a number")
+
+    if not value.is_finite() or value < 0:
+        raise InvalidFilter(f"'{name}' must be a non-negative number")
+    return value
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Returns the smallest string greater than every string starting with `prefix` in binary order,
+    or None if there is none.
+    """
+    while prefix and ord(prefix[-1]) == sys.maxunicode:
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def filter_name_prefix(queryset: QuerySet, prefix: str) -> QuerySet:
+    """
+    Keeps the products whose name starts with `prefix` (case-sensitive), resolved through an index on the name.
+    """
+    if connection.vendor == 'postgresql':
+        # LIKE 'prefix%' is served by the `varchar_pattern_ops` index on the name
+        return queryset.filter(name__startswith=prefix)
+
+    # SQLite only uses an index for case-sensitive LIKE without ESCAPE, so the prefix is turned into a
+    # range on the unique index of the name, which is equivalent under its binary collation
+    upper: Optional[str] = prefix_upper_bound(prefix)
+    queryset = queryset.filter(name__gte=prefix)
+    return queryset.filter(name__lt=upper) if upper is not None else queryset
+
+
+def filter_products(queryset: QuerySet, request: Request) -> QuerySet:
+    """
+    Applies the filter parameters of the product list to a queryset of products.
+
+    - `in_stock`: products with (`true`) or without (`false`) stock, resolved through the (`stock`, `price`)
+      index. Sharded products keep their stock in their slots, which are checked for those products only.
+    - `min_price` / `max_price`: products whose price is within the bounds, resolved through the
+      (`price`, `id`) index.
+    - `name`: products whose name starts with the given prefix (case-sensitive).
+
+    Args:
+        queryset (QuerySet): The products.
+        request (Request): The request containing the optional filter parameters.
+
+    Returns:
+        QuerySet: The filtered products.
+
+    Raises:
+        InvalidFilter: If a parameter is malformed.
+    """
+    in_stock: Optional[bool] = parse_bool_param(request, 'in_stock')
+    if in_stock is not None:
+        has_stock: Q = Q(stock__gt=0) | Q(
+            Exists(StockShard.objects.filter(product=OuterRef('pk'), stock__gt=0)), stock_shards__gt=0
+        )
+        queryset = queryset.filter(has_stock if in_stock else ~has_stock)
+
+    min_price: Optional[Decimal] = parse_decimal_param(request, 'min_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+
+    max_price: Optional[Decimal] = parse_decimal_param(request, 'max_price')
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    prefix: Optional[str] = request.query_params.get('name')
+    if prefix:
+        queryset = filter_name_prefix(queryset, prefix)
+
+    return queryset
@@ -0,0 +1,32 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from products.changes import compact_changes
+
+
+class Command(BaseCommand):
+    """
+    Compacts the product change log, keeping only the latest entry of each product among the entries older
+    than the retention. Meant to run periodically (e.g. from cron), or as a long-lived process with `--interval`.
+    """
+    help: str = 'Deletes the old entries of the product change log superseded by a newer change of the same product.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--retention', type=float, default=settings.PRODUCT_CHANGES['RETENTION'],
+            help='Seconds during which every entry is kept. Defaults to PRODUCT_CHANGES_RETENTION.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running, compacting every this many seconds. By default the command runs once.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            deleted: int = compact_changes(options['retention'])
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Compacted {deleted} product change log entries'))
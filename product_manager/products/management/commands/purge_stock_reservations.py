@@ -0,0 +1,17 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products.models import StockReservation
+
+
+class Command(BaseCommand):
+    """
+    Deletes old stock reservation tokens. Meant to be run periodically (e.g. from cron).
+    """
+    help: str = 'Deletes the stock reservation tokens older than STOCK_RESERVATIONS_RETENTION.'
+
+    def handle(self, *args, **options) -> None:
+        cutoff = timezone.now() - timedelta(seconds=settings.STOCK_RESERVATIONS['RETENTION'])
+        deleted, _ = StockReservation.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stock reservation tokens'))
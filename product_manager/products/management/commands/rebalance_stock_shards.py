@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandParser
+from products.models import Product
+from products.stock import rebalance
+
+
+class Command(BaseCommand):
+    """
+    Spreads the stock of every sharded product evenly across its slots again.
+    Meant to run periodically (e.g. from cron), or as a long-lived process with `--interval`.
+    """
+    help: str = 'Rebalances the stock slots of the sharded products.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running, rebalancing every this many seconds. By default the command runs once.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            product_ids: list[int] = list(Product.objects.filter(stock_shards__gt=0).values_list('pk', flat=True))
+            # Each product is rebalanced in its own short transaction
+            rebalanced: int = sum(rebalance(product_id) for product_id in product_ids)
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebalanced {rebalanced} of {len(product_ids)} sharded products'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from products.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the full-text index of the product names. It is kept in sync on every write, so this is
+    only needed if it was lost or created by hand.
+    """
+    help: str = 'Rebuilds the full-text search index of the product names.'
+
+    def handle(self, *args, **options) -> None:
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the product search index'))
@@ -4,6 +4,86 @@ class Product(models.Model):
     name = models.CharField(max_length=255, unique=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Incremented on every change, used to build the ETags of the product endpoints.
+    version = models.PositiveIntegerField(default=1)
+    # Number of StockShard rows the stock of a hot product is split across; 0 keeps it all in `stock`.
+    stock_shards = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Stock and price band filters of the product list.
+            models.Index(fields=['stock', 'price'], name='product_stock_price_idx'),
+            # Product list ordered by price, and its keyset pagination.
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            # Name prefix filter on PostgreSQL (LIKE 'prefix%'); the default operator class cannot serve it
+            # unless the database uses the C collation.
+            models.Index(fields=['name'], name='product_name_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class StockShard(models.Model):
+    """
+    One slot of the stock of a hot product (see products.stock).
+
+    The stock of a sharded product is the sum of its slots, so concurrent reservations of the product
+    update different rows instead of all waiting for the lock of the product row.
+    """
+    product = models.ForeignKey(Product, related_name='shards', on_delete=models.CASCADE)
+    slot = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+    # Incremented on every change, part of the ETags of the product (the product row is left untouched).
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['product', 'slot'], name='unique_stock_shard_slot')]
+
+
+class ProductChange(models.Model):
+    """
+    An entry of the append-only change log of the products (see products.changes).
+
+    Writers only insert entries; `sequence` is assigned afterwards to the committed ones, in increasing order,
+    so consumers can follow the log from the last sequence they have seen.
+    """
+    class Type(models.TextChoices):
+        CREATED = 'created'
+        DELETED = 'deleted'
+        STOCK = 'stock'
+
+    # Null until the entry is numbered by `products.changes.assign_sequences`.
+    sequence = models.BigIntegerField(null=True, unique=True)
+    # Not a foreign key: the entries of a product outlive it, so that consumers learn it was deleted.
+    product_id = models.BigIntegerField()
+    type = models.CharField(max_length=8, choices=Type.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Latest entry of each product, looked up when compacting the log.
+            models.Index(fields=['product_id', 'sequence'], name='productchange_product_seq_idx'),
+            models.Index(fields=['created_at'], name='productchange_created_idx'),
+            # Entries waiting for a sequence, in insertion order.
+            models.Index(fields=['id'], name='productchange_pending_idx', condition=models.Q(sequence__isnull=True)),
+        ]
+
+
+class StockReservation(models.Model):
+    """
+    A stock reservation made with a token (see products.stock.open_reservation).
+
+    Lets a client whose reservation timed out retry it or undo it without knowing whether it was applied:
+    a retry does not reserve the stock twice, and a release gives back the stock only if it was reserved.
+    """
+    class Status(models.TextChoices):
+        RESERVED = 'reserved'
+        # Released, or released before it was made, in which case the reservation is refused if it arrives later.
+        RELEASED = 'released'
+
+    token = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=8, choices=Status.choices)
+    # The 'product_id'/'quantity' pairs reserved; empty if released before it was made.
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
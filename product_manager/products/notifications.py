@@ -0,0 +1,45 @@
+import logging
+import threading
+import requests
+from django.conf import settings
+from django.db import transaction
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Seconds to wait for each webhook to answer.
+WEBHOOK_TIMEOUT: float = 2
+
+
+def send_product_change(urls: list[str], product_ids: list[int]) -> None:
+    """
+    Posts the IDs of changed products to every webhook, logging failures.
+
+    Args:
+        urls (list[str]): The webhook URLs.
+        product_ids (list[int]): The IDs of the changed products.
+    """
+    for url in urls:
+        try:
+            requests.post(url, json={'product_ids': product_ids}, timeout=WEBHOOK_TIMEOUT).raise_for_status()
+        except requests.RequestException as error:
+            logger.warning('Failed to notify %s of changes to products %s: %s', url, product_ids, error)
+
+
+def notify_products_changed(product_ids: list[int]) -> None:
+    """
+    Notifies the `PRODUCT_CHANGE_WEBHOOKS` (e.g. the product cache of the order manager) that some
+    products changed.
+
+    Notifications are sent from a background thread once the current transaction commits, so the
+    request that changed the products never waits for them.
+
+    Args:
+        product_ids (list[int]): The IDs of the changed products.
+    """
+    urls: list[str] = settings.PRODUCT_CHANGE_WEBHOOKS
+    if not urls:
+        return
+
+    transaction.on_commit(
+        lambda: threading.Thread(target=send_product_change, args=(urls, product_ids), daemon=True).start()
+    )
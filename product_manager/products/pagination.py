@@ -0,0 +1,21 @@
+from decimal import Decimal
+from typing import Any, Callable
+from django.conf import settings
+from common.pagination import KeysetPagination
+
+
+class ProductPagination(KeysetPagination):
+    """
+    Keyset pagination of the product list. Every ordering is backed by an index of `Product`.
+    """
+    orderings: dict[str, tuple[str, Callable[[str], Any]]] = {
+        'id': ('id', int),
+        'price': ('price', Decimal),
+        '-price': ('price', Decimal),
+        'name': ('name', str),
+        '-name': ('name', str),
+    }
+    default_ordering: str = 'id'
+
+    def get_default_limit(self) -> int:
+        return settings.PRODUCT_PAGINATION['PAGE_SIZE']
@@ -0,0 +1,28 @@
+from typing import Any, Optional
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser for newline-delimited JSON, one object per line.
+    Returns the list of parsed objects; blank lines are ignored.
+    """
+    media_type: str = 'application/x-ndjson'
+
+    def parse(self, stream: Any, media_type: Optional[str] = None, parser_context: Optional[dict] = None) -> list[Any]:
+        encoding: str = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        rows: list[Any] = []
+
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(orjson.loads(line.decode(encoding)))
+            except ValueError as error:
+                raise ParseError(f'NDJSON parse error on line {line_number} - {error}')
+
+        return rows
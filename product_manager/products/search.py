@@ -0,0 +1,123 @@
+import re
+from typing import Any
+from django.db import DEFAULT_DB_ALIAS, connections
+from .models import Product
+
+# Full-text search of product names.
+#
+# On SQLite the names are indexed in an FTS5 table kept in sync with the product table by triggers, so
+# every write (including bulk inserts and queryset deletes) updates the index in the same transaction.
+# On PostgreSQL a GIN index on the `tsvector` of the name is maintained by the database itself.
+# Both are created after `migrate` (see `ProductsConfig.ready`), since they cannot be described by the model.
+
+SEARCH_TABLE: str = f'{Product._meta.db_table}_fts'
+SEARCH_INDEX: str = 'product_name_search_idx'
+
+# Text search configuration of PostgreSQL: no stemming nor stop words, since names are not prose.
+TS_CONFIG: str = 'simple'
+
+WORD_PATTERN: re.Pattern = re.compile(r'\w+')
+
+
+def sqlite_index_statements() -> list[str]:
+    """
+    Returns the statements creating the FTS5 table of the product names and the triggers that keep it in sync.
+    """
+    table: str = Product._meta.db_table
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"name, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF name ON {table} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    ]
+
+
+def create_search_index(using: str = DEFAULT_DB_ALIAS, **kwargs: Any) -> None:
+    """
+    Creates the search index if it does not exist yet, indexing the existing products. Connected to `post_migrate`.
+
+    Args:
+        using (str): The alias of the database.
+    """
+    connection = connections[using]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            created: bool = SEARCH_TABLE not in connection.introspection.table_names(cursor)
+            for statement in sqlite_index_statements():
+                cursor.execute(statement)
+            if created:
+                cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON {Product._meta.db_table} "
+                f"USING gin (to_tsvector('{TS_CONFIG}', name))"
+            )
+
+
+def rebuild_search_index(using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Rebuilds the search index from the product table, e.g. after restoring a database without it.
+    """
+    connection = connections[using]
+    create_search_index(using)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'REINDEX INDEX {SEARCH_INDEX}')
+
+
+def search_terms(query: str) -> list[str]:
+    """
+    Splits a search query into its words, ignoring punctuation and any search syntax.
+    """
+    return WORD_PATTERN.findall(query)
+
+
+def search_product_ids(terms: list[str], limit: int, using: str = DEFAULT_DB_ALIAS) -> list[int]:
+    """
+    Returns the IDs of the products whose name contains a word starting with each term (so results appear
+    while the user types), best matches first.
+
+    Every match is ranked within the indexed query, which keeps only the best `limit` while ranking, so the
+    results are the best matches of the whole catalog. A broad prefix (e.g. one or two letters matching most of
+    the catalog) still has to rank all its matches, so it is slower than a selective one.
+
+    Args:
+        terms (list[str]): The words searched, as returned by `search_terms`.
+        limit (int): Maximum number of products returned.
+        using (str): The alias of the database.
+
+    Returns:
+        list[int]: The IDs of the matching products, ranked by relevance and then by ID.
+    """
+    if not terms:
+        return []
+    connection = connections[using]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            tsquery: str = ' & '.join(f"'{term}':*" for term in terms)
+            cursor.execute(
+                f"SELECT id FROM {Product._meta.db_table} "
+                f"WHERE to_tsvector('{TS_CONFIG}', name) @@ to_tsquery('{TS_CONFIG}', %s) "
+                f"ORDER BY ts_rank(to_tsvector('{TS_CONFIG}', name), to_tsquery('{TS_CONFIG}', %s)) DESC, id "
+                f"LIMIT %s",
+                [tsquery, tsquery, limit],
+            )
+        else:
+            # Terms are quoted so that they are never read as FTS5 operators; `*` makes them prefixes
+            match: str = ' '.join(f'"{term}"*' for term in terms)
+            # `rank` is the bm25 score of the match, lower is better
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank, rowid LIMIT %s',
+                [match, limit],
+            )
+        return [row[0] for row in cursor.fetchall()]
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Product
+from common.serializers import ValuesSerializer
+from .models import Product, ProductChange
 
 
 class ErrorSerializer(serializers.Serializer):
@@ -17,3 +19,73 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model: type[Product] = Product
         fields: list[str] = ['id', 'name', 'price', 'stock']
+
+
+# Serializes product rows read with `values_list()`, for the read-only list endpoints.
+PRODUCT_VALUES: ValuesSerializer = ValuesSerializer(ProductSerializer)
+
+
+class ProductPageSerializer(serializers.Serializer):
+    """
+    Serializer for a page of products.
+    Used to document paginated responses in the API.
+    """
+    next: serializers.CharField = serializers.CharField(allow_null=True)
+    results: ProductSerializer = ProductSerializer(many=True)
+
+
+class ProductBulkSerializer(ProductSerializer):
+    """
+    Serializer for products created in bulk.
+    Name uniqueness is checked for the whole batch at once instead of with one query per product.
+    """
+    class Meta(ProductSerializer.Meta):
+        extra_kwargs: dict[str, dict] = {'name': {'validators': []}}
+
+
+class StockItemSerializer(serializers.Serializer):
+    """
+    Serializer for a single product/quantity pair in a stock operation.
+    """
+    product_id: serializers.IntegerField = serializers.IntegerField(min_value=0)
+    quantity: serializers.IntegerField = serializers.IntegerField(min_value=0)
+
+
+class StockOperationSerializer(serializers.Serializer):
+    """
+    Serializer for stock operations affecting several products at once.
+    `reservation` is an optional token that makes the reservation safe to retry and to release.
+    """
+    items: StockItemSerializer = StockItemSerializer(many=True, allow_empty=False)
+    reservation: serializers.CharField = serializers.CharField(max_length=64, required=False)
+
+
+class StockShardsSerializer(serializers.Serializer):
+    """
+    Serializer for the stock slots of a product.
+    """
+    shards: serializers.IntegerField = serializers.IntegerField(min_value=0, max_value=settings.PRODUCT_STOCK_MAX_SHARDS)
+    slots: serializers.ListField = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+    stock: serializers.IntegerField = serializers.IntegerField(read_only=True)
+
+
+class ProductChangeSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the entries of the product change log.
+    """
+    class Meta:
+        model: type[ProductChange] = ProductChange
+        fields: list[str] = ['sequence', 'product_id', 'type', 'created_at']
+
+
+# Serializes change log rows read with `values_list()`.
+CHANGE_VALUES: ValuesSerializer = ValuesSerializer(ProductChangeSerializer)
+
+
+class ProductChangeFeedSerializer(serializers.Serializer):
+    """
+    Serializer for a page of the product change log.
+    Used to document the feed responses in the API.
+    """
+    changes: ProductChangeSerializer = ProductChangeSerializer(many=True)
+    next: serializers.IntegerField = serializers.IntegerField()
@@ -0,0 +1,327 @@
+import random
+from typing import Any, Iterable, Optional
+from django.db import IntegrityError, transaction
+from django.db.models import F, QuerySet, Sum
+from .changes import record_changes
+from .models import Product, ProductChange, StockReservation, StockShard
+from .serializers import PRODUCT_VALUES
+
+# Sharded stock: the stock of a hot product can be split across `Product.stock_shards` StockShard rows.
+# Reservations decrement a random slot, so concurrent orders of the product lock different rows; the
+# stock reported by the API is always the stock of the product row plus the sum of its slots.
+
+# Columns read by the product list endpoints: those of `PRODUCT_VALUES` plus the number of slots.
+PRODUCT_COLUMNS: list[str] = [*PRODUCT_VALUES.columns, 'stock_shards']
+
+
+def distribute(total: int, shards: int) -> list[int]:
+    """
+    Splits a stock evenly across a number of slots, the first ones receiving the remainder.
+    """
+    share, remainder = divmod(total, shards)
+    return [share + (slot < remainder) for slot in range(shards)]
+
+
+def shard_stock(product_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Returns the stock held in the slots of the given products, keyed by product ID.
+    Products that are not sharded are omitted.
+    """
+    return dict(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values_list('product_id')
+        .annotate(total=Sum('stock'))
+        .order_by()
+    )
+
+
+def shard_versions(products: QuerySet) -> Optional[int]:
+    """
+    Returns the sum of the versions of the slots of the given products, part of their ETags.
+    """
+    return StockShard.objects.filter(product__in=products).aggregate(versions=Sum('version'))['versions']
+
+
+def serialize_product_rows(rows: Iterable[tuple]) -> list[dict[str, Any]]:
+    """
+    Serializes product rows read with `values_list(*PRODUCT_COLUMNS)`, adding the stock held in the slots
+    of sharded products. Slots are only read when the rows include a sharded product.
+
+    Args:
+        rows (Iterable[tuple]): The product rows.
+
+    Returns:
+        list[dict[str, Any]]: The serialized products.
+    """
+    rows = list(rows)
+    data: list[dict[str, Any]] = PRODUCT_VALUES.serialize(rows)
+    sharded: list[dict[str, Any]] = [product for row, product in zip(rows, data) if row[-1]]
+
+    if sharded:
+        totals: dict[int, int] = shard_stock([product['id'] for product in sharded])
+        for product in sharded:
+            product['stock'] += totals.get(product['id'], 0)
+    return data
+
+
+def load_shard_stock(products: Iterable[Product]) -> list[Product]:
+    """
+    Adds the stock held in the slots of sharded products to their `stock` attribute, before serializing them.
+    """
+    products = list(products)
+    sharded: list[Product] = [product for product in products if product.stock_shards]
+
+    if sharded:
+        totals: dict[int, int] = shard_stock([product.pk for product in sharded])
+        for product in sharded:
+            product.stock += totals.get(product.pk, 0)
+    return products
+
+
+def reserve_sharded(product_id: int, quantity: int, shards: int) -> bool:
+    """
+    Decrements the stock of a sharded product, within the current transaction.
+
+    A random slot is tried first, then the fullest one. Only when no single slot holds the quantity are
+    all the slots of the product locked to gather it from several of them.
+
+    Args:
+        product_id (int): The ID of the product.
+        quantity (int): The quantity to reserve.
+        shards (int): The number of slots of the product.
+
+    Returns:
+        bool: Whether the stock was reserved; if not, no slot was modified.
+    """
+    slots: QuerySet = StockShard.objects.filter(product_id=product_id)
+
+    def take(slot: int, amount: int) -> bool:
+        return bool(
+            slots.filter(slot=slot, stock__gte=amount).update(stock=F('stock') - amount, version=F('version') + 1)
+        )
+
+    if take(random.randrange(shards), quantity):
+        return True
+
+    fullest: Optional[int] = slots.filter(stock__gte=quantity).order_by('-stock').values_list('slot', flat=True).first()
+    if fullest is not None and take(fullest, quantity):
+        return True
+
+    locked: list[StockShard] = list(slots.select_for_update().order_by('slot'))
+    if sum(shard.stock for shard in locked) < quantity:
+        return False
+
+    remaining: int = quantity
+    for shard in locked:
+        amount: int = min(shard.stock, remaining)
+        if amount:
+            take(shard.slot, amount)
+            remaining -= amount
+        if not remaining:
+            break
+    return True
+
+
+def release_sharded(product_id: int, quantity: int, shards: int) -> bool:
+    """
+    Increments the stock of a random slot of a sharded product, within the current transaction.
+
+    If that slot does not exist because the number of slots has just changed, the stock goes to any remaining
+    slot instead, so that it can be reserved again (the product row is never credited while it is sharded).
+
+    Returns:
+        bool: Whether the product has any slot left.
+    """
+    slots: QuerySet = StockShard.objects.filter(product_id=product_id)
+
+    def give(slot: int) -> bool:
+        return bool(slots.filter(slot=slot).update(stock=F('stock') + quantity, version=F('version') + 1))
+
+    if give(random.randrange(shards)):
+        return True
+    slot: Optional[int] = slots.order_by('slot').values_list('slot', flat=True).first()
+    return slot is not None and give(slot)
+
+
+def locked_stock_shards(product_id: int) -> Optional[int]:
+    """
+    Reads the number of slots of a product under the lock of its row, which `set_stock_shards` also takes,
+    so the number cannot change until the current transaction ends.
+
+    Returns:
+        Optional[int]: The number of slots, or None if the product does not exist.
+    """
+    return Product.objects.select_for_update().filter(pk=product_id).values_list('stock_shards', flat=True).first()
+
+
+def reserve_product(product_id: int, quantity: int, shards: int) -> bool:
+    """
+    Decrements the stock of a product, from its slots if it is sharded, within the current transaction.
+
+    `shards` is read without locking the product row, so that concurrent reservations of a hot product do not
+    wait for each other. If the reservation fails, the number of slots is read again under the lock of the
+    row: if it has changed meanwhile (see `set_stock_shards`), the reservation is retried with the new one.
+
+    Args:
+        product_id (int): The ID of the product.
+        quantity (int): The quantity to reserve.
+        shards (int): The number of slots of the product, as read before the transaction locked anything.
+
+    Returns:
+        bool: Whether the stock was reserved; if not, the product does not exist or does not have enough stock.
+    """
+    def take(shards: int) -> bool:
+        if shards:
+            # Hot products are sharded: the product row is left untouched
+            return reserve_sharded(product_id, quantity, shards)
+        return bool(Product.objects.filter(pk=product_id, stock_shards=0, stock__gte=quantity).update(
+            stock=F('stock') - quantity, version=F('version') + 1
+        ))
+
+    if take(shards):
+        return True
+    current: Optional[int] = locked_stock_shards(product_id)
+    return current is not None and current != shards and take(current)
+
+
+def release_product(product_id: int, quantity: int, shards: int) -> bool:
+    """
+    Increments the stock of a product, in one of its slots if it is sharded, within the current transaction.
+    `shards` is read without locking the product row, as in `reserve_product`.
+
+    Returns:
+        bool: Whether the product exists.
+    """
+    def give(shards: int) -> bool:
+        if shards:
+            return release_sharded(product_id, quantity, shards)
+        return bool(Product.objects.filter(pk=product_id, stock_shards=0).update(
+            stock=F('stock') + quantity, version=F('version') + 1
+        ))
+
+    if give(shards):
+        return True
+    current: Optional[int] = locked_stock_shards(product_id)
+    return current is not None and current != shards and give(current)
+
+
+def open_reservation(token: str, grouped_items: dict[int, int]) -> Optional[StockReservation]:
+    """
+    Records a reservation made with a token, within the transaction that reserves its stock.
+
+    Args:
+        token (str): The token of the reservation, chosen by the client.
+        grouped_items (dict[int, int]): Product IDs mapped to the quantity reserved.
+
+    Returns:
+        Optional[StockReservation]: None if the reservation is new, so its stock must be reserved; otherwise the
+            existing reservation with the token, either already made (a retry) or already released.
+    """
+    try:
+        with transaction.atomic():
+            StockReservation.objects.create(
+                token=token,
+                status=StockReservation.Status.RESERVED,
+                items=[{'product_id': product_id, 'quantity': quantity} for product_id, quantity in grouped_items.items()],
+            )
+        return None
+    except IntegrityError:
+        return StockReservation.objects.select_for_update().get(token=token)
+
+
+def close_reservation(token: str) -> dict[int, int]:
+    """
+    Marks a reservation made with a token as released, within the transaction that releases its stock.
+
+    A reservation not made yet is recorded as released, so that it is refused if it arrives later.
+
+    Args:
+        token (str): The token of the reservation.
+
+    Returns:
+        dict[int, int]: The stock to give back, product IDs mapped to their quantity: that of the reservation
+            if it was reserved, or nothing if it was never made or was already released.
+    """
+    try:
+        with transaction.atomic():
+            StockReservation.objects.create(token=token, status=StockReservation.Status.RELEASED)
+        return {}
+    except IntegrityError:
+        pass
+
+    reservation: StockReservation = StockReservation.objects.select_for_update().get(token=token)
+    if reservation.status == StockReservation.Status.RELEASED:
+        return {}
+
+    reservation.status = StockReservation.Status.RELEASED
+    reservation.save(update_fields=['status'])
+    return {item['product_id']: item['quantity'] for item in reservation.items}
+
+
+def set_stock(product: Product, stock: int) -> None:
+    """
+    Sets the total stock of a product, spreading it across its slots if it is sharded, and records the change.
+    """
+    with transaction.atomic():
+        shards: list[StockShard] = list(product.shards.select_for_update().order_by('slot'))
+        if not shards:
+            Product.objects.filter(pk=product.pk).update(stock=stock, version=F('version') + 1)
+        else:
+            for shard, share in zip(shards, distribute(stock, len(shards))):
+                StockShard.objects.filter(pk=shard.pk).update(stock=share, version=F('version') + 1)
+            Product.objects.filter(pk=product.pk).update(stock=0, version=F('version') + 1)
+        record_changes(ProductChange.Type.STOCK, [product.pk])
+
+
+def set_stock_shards(product_id: int, shards: int) -> bool:
+    """
+    Changes the number of slots of a product, moving its whole stock into the new slots
+    (or back into the product row with 0 slots).
+
+    Args:
+        product_id (int): The ID of the product.
+        shards (int): The new number of slots.
+
+    Returns:
+        bool: Whether the product exists.
+    """
+    with transaction.atomic():
+        product: Optional[Product] = Product.objects.select_for_update().filter(pk=product_id).first()
+        if product is None:
+            return False
+
+        current: list[StockShard] = list(product.shards.select_for_update())
+        total: int = product.stock + sum(shard.stock for shard in current)
+        product.shards.all().delete()
+
+        if shards:
+            StockShard.objects.bulk_create([
+                StockShard(product=product, slot=slot, stock=share)
+                for slot, share in enumerate(distribute(total, shards))
+            ])
+        Product.objects.filter(pk=product_id).update(
+            stock=0 if shards else total, stock_shards=shards, version=F('version') + 1
+        )
+    return True
+
+
+def rebalance(product_id: int) -> bool:
+    """
+    Spreads the stock of a sharded product evenly across its slots again, so that reservations do not have
+    to fall back to other slots as some of them run out.
+
+    Returns:
+        bool: Whether any slot was changed; slots that differ by at most one unit are left as they are.
+    """
+    with transaction.atomic():
+        shards: list[StockShard] = list(StockShard.objects.select_for_update().filter(product_id=product_id).order_by('slot'))
+        stocks: list[int] = [shard.stock for shard in shards]
+        if not stocks or max(stocks) - min(stocks) <= 1:
+            return False
+
+        changed: bool = False
+        for shard, share in zip(shards, distribute(sum(stocks), len(shards))):
+            if shard.stock != share:
+                StockShard.objects.filter(pk=shard.pk).update(stock=share, version=F('version') + 1)
+                changed = True
+    return changed
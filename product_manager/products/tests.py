@@ -0,0 +1,516 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from typing import Any, Optional
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .changes import assign_sequences, compact_changes, record_changes
+from .models import Product, ProductChange, StockReservation, StockShard
+from .serializers import ProductSerializer
+from .pagination import ProductPagination
+from .search import search_product_ids
+from .stock import (
+    PRODUCT_COLUMNS,
+    load_shard_stock,
+    release_product,
+    reserve_product,
+    serialize_product_rows,
+    set_stock_shards,
+)
+
+
+class SerializeProductRowsTests(TestCase):
+    """
+    The list endpoints serialize rows read with `values_list()` (see `common.serializers.ValuesSerializer`);
+    their output must be exactly that of `ProductSerializer`, used by the other endpoints.
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Product.objects.create(name='Producto A', price=Decimal('10.99'), stock=5)
+        Product.objects.create(name='Producto B', price=Decimal('0.10'), stock=0)
+        Product.objects.create(name='Producto C', price=Decimal('99999999.99'), stock=1)
+
+        sharded: Product = Product.objects.create(name='Producto D', price=Decimal('1234.50'), stock=2, stock_shards=3)
+        StockShard.objects.bulk_create([
+            StockShard(product=sharded, slot=0, stock=4),
+            StockShard(product=sharded, slot=1, stock=0),
+            StockShard(product=sharded, slot=2, stock=7),
+        ])
+
+    def test_same_output_as_the_model_serializer(self) -> None:
+        expected: list[dict[str, Any]] = ProductSerializer(load_shard_stock(Product.objects.order_by('id')), many=True).data
+        actual: list[dict[str, Any]] = serialize_product_rows(Product.objects.order_by('id').values_list(*PRODUCT_COLUMNS))
+
+        self.assertEqual(len(actual), 4)
+        for actual_product, expected_product in zip(actual, expected):
+            self.assertEqual(list(actual_product), list(expected_product))
+            self.assertEqual(actual_product, expected_product)
+            # Equal values of different types would compare equal but render differently
+            for name, value in expected_product.items():
+                self.assertIs(type(actual_product[name]), type(value), name)
+
+    def test_sharded_stock(self) -> None:
+        products: dict[str, dict[str, Any]] = {
+            product['name']: product
+            for product in serialize_product_rows(Product.objects.values_list(*PRODUCT_COLUMNS))
+        }
+
+        self.assertEqual(products['Producto D']['stock'], 13)
+        self.assertEqual(products['Producto A']['stock'], 5)
+
+    def test_decimals(self) -> None:
+        rows: list[tuple] = list(Product.objects.order_by('id').values_list(*PRODUCT_COLUMNS))
+        self.assertEqual(
+            [product['price'] for product in serialize_product_rows(rows)], ['10.99', '0.10', '99999999.99', '1234.50']
+        )
+
+
+class ReshardedStockTests(TestCase):
+    """
+    The number of slots passed to `reserve_product` and `release_product` is read before the product row is
+    locked, so it may be out of date if the product was re-sharded meanwhile (simulated here by re-sharding
+    it between reading the number and using it).
+    """
+    def setUp(self) -> None:
+        self.product: Product = Product.objects.create(name='Producto A', price=Decimal('10.99'), stock=10)
+
+    def assert_stock(self, stock: int, shards: int) -> None:
+        product: Product = load_shard_stock([Product.objects.get(pk=self.product.pk)])[0]
+        self.assertEqual((product.stock, product.stock_shards), (stock, shards))
+        if shards:
+            # The stock of a sharded product is held only in its slots, where reservations take it from
+            self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 0)
+            self.assertEqual(StockShard.objects.filter(product=self.product).count(), shards)
+
+    def test_reserve_after_sharding(self) -> None:
+        set_stock_shards(self.product.pk, 3)
+
+        self.assertTrue(reserve_product(self.product.pk, 4, 0))
+        self.assert_stock(6, 3)
+
+    def test_reserve_after_unsharding(self) -> None:
+        set_stock_shards(self.product.pk, 3)
+        set_stock_shards(self.product.pk, 0)
+
+        self.assertTrue(reserve_product(self.product.pk, 4, 3))
+        self.assert_stock(6, 0)
+
+    def test_reserve_after_changing_the_number_of_slots(self) -> None:
+        set_stock_shards(self.product.pk, 4)
+        set_stock_shards(self.product.pk, 2)
+
+        self.assertTrue(reserve_product(self.product.pk, 10, 4))
+        self.assert_stock(0, 2)
+
+    def test_reserve_insufficient_stock(self) -> None:
+        set_stock_shards(self.product.pk, 3)
+
+        self.assertFalse(reserve_product(self.product.pk, 11, 0))
+        self.assertFalse(reserve_product(self.product.pk, 11, 3))
+        self.assert_stock(10, 3)
+
+    def test_missing_product(self) -> None:
+        self.assertFalse(reserve_product(self.product.pk + 1, 1, 0))
+        self.assertFalse(release_product(self.product.pk + 1, 1, 0))
+        self.assertFalse(release_product(self.product.pk + 1, 1, 3))
+
+    def test_release_after_sharding(self) -> None:
+        set_stock_shards(self.product.pk, 3)
+
+        self.assertTrue(release_product(self.product.pk, 5, 0))
+        self.assert_stock(15, 3)
+
+    def test_release_after_unsharding(self) -> None:
+        set_stock_shards(self.product.pk, 3)
+        set_stock_shards(self.product.pk, 0)
+
+        self.assertTrue(release_product(self.product.pk, 5, 3))
+        self.assert_stock(15, 0)
+
+    def test_released_stock_can_be_reserved_again(self) -> None:
+        set_stock_shards(self.product.pk, 8)
+        set_stock_shards(self.product.pk, 1)
+
+        # Most of the slots the release may pick no longer exist: the stock goes to the remaining one
+        for _ in range(5):
+            self.assertTrue(release_product(self.product.pk, 2, 8))
+        self.assert_stock(20, 1)
+
+        self.assertTrue(reserve_product(self.product.pk, 20, 1))
+        self.assert_stock(0, 1)
+
+
+class ProductBulkCreateTests(TestCase):
+    """
+    `POST /api/products/bulk/` creates the valid products and reports the invalid ones by their position.
+    """
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+        Product.objects.create(name='Producto A', price=Decimal('10.99'), stock=5)
+
+    def post(self, rows: Any, query: str = '') -> Any:
+        return self.client.post(f'{reverse("product-bulk-create")}{query}', rows, format='json')
+
+    def test_all_created(self) -> None:
+        response = self.post([{'name': f'Nuevo {index}', 'price': '1.50', 'stock': index} for index in range(5)], '?batch_size=2')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([created['index'] for created in response.json()['created']], [0, 1, 2, 3, 4])
+        self.assertEqual(response.json()['errors'], [])
+        self.assertEqual(Product.objects.filter(name__startswith='Nuevo').count(), 5)
+
+    def test_partial(self) -> None:
+        response = self.post([
+            {'name': 'Nuevo', 'price': '1.50'},
+            {'name': 'Producto A', 'price': '1.50'},
+            {'name': 'Nuevo', 'price': '2.50'},
+            {'name': 'Sin precio'},
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['created'], [{'index': 0, 'id': Product.objects.get(name='Nuevo').pk}])
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2, 3])
+        self.assertIn('price', response.json()['errors'][2]['errors'])
+
+    def test_atomic(self) -> None:
+        response = self.post([{'name': 'Nuevo', 'price': '1.50'}, {'name': 'Producto A', 'price': '1.50'}], '?atomic=true')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], [])
+        self.assertFalse(Product.objects.filter(name='Nuevo').exists())
+
+    def test_none_created(self) -> None:
+        self.assertEqual(self.post([{'name': 'Producto A', 'price': '1.50'}]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{'name': 'Nuevo', 'price': '1.50'}], '?batch_size=0').status_code, 400)
+
+
+class StockReservationTests(TestCase):
+    """
+    The stock endpoints reserve and release the stock of several products at once; with a `reservation` token,
+    a retried reservation is applied once and a release gives back only what the token reserved.
+    """
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+        self.first: Product = Product.objects.create(name='Producto A', price=Decimal('10.99'), stock=5)
+        self.second: Product = Product.objects.create(name='Producto B', price=Decimal('0.10'), stock=1)
+
+    def post(self, url_name: str, items: list[tuple[int, int]], reservation: Optional[str] = None) -> Any:
+        data: dict[str, Any] = {'items': [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in items]}
+        if reservation:
+            data['reservation'] = reservation
+        return self.client.post(reverse(url_name), data, format='json')
+
+    def stock(self) -> list[int]:
+        return list(Product.objects.order_by('pk').values_list('stock', flat=True))
+
+    def test_all_or_nothing(self) -> None:
+        response = self.post('product-stock-reserve', [(self.first.pk, 2), (self.second.pk, 1)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['stock'] for product in response.json()], [3, 0])
+
+        self.assertEqual(self.post('product-stock-reserve', [(self.first.pk, 1), (self.second.pk, 1)]).status_code, 400)
+        self.assertEqual(self.post('product-stock-reserve', [(self.first.pk, 1), (self.second.pk + 1, 1)]).status_code, 404)
+        self.assertEqual(self.stock(), [3, 0])
+
+        self.assertEqual(self.post('product-stock-release', [(self.first.pk, 2), (self.second.pk, 1)]).status_code, 200)
+        self.assertEqual(self.stock(), [5, 1])
+
+    def test_retried_reservation(self) -> None:
+        for _ in range(2):
+            response = self.post('product-stock-reserve', [(self.first.pk, 2)], reservation='order-1')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()[0]['stock'], 3)
+
+    def test_release(self) -> None:
+        self.post('product-stock-reserve', [(self.first.pk, 2), (self.second.pk, 1)], reservation='order-1')
+
+        # The items of the request are ignored: the stock reserved with the token is given back, only once
+        for _ in range(2):
+            response = self.post('product-stock-release', [(self.first.pk, 5)], reservation='order-1')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.stock(), [5, 1])
+
+        self.assertEqual(self.post('product-stock-reserve', [(self.first.pk, 2)], reservation='order-1').status_code, 409)
+        self.assertEqual(self.stock(), [5, 1])
+
+    def test_release_before_reserve(self) -> None:
+        self.assertEqual(self.post('product-stock-release', [(self.first.pk, 2)], reservation='order-1').status_code, 200)
+        self.assertEqual(self.stock(), [5, 1])
+
+        # The reservation arrives late, after it was given up
+        self.assertEqual(self.post('product-stock-reserve', [(self.first.pk, 2)], reservation='order-1').status_code, 409)
+        self.assertEqual(self.stock(), [5, 1])
+
+    def test_rejected_reservation_keeps_no_token(self) -> None:
+        self.assertEqual(self.post('product-stock-reserve', [(self.second.pk, 2)], reservation='order-1').status_code, 400)
+        self.assertFalse(StockReservation.objects.exists())
+
+        Product.objects.filter(pk=self.second.pk).update(stock=2)
+        self.assertEqual(self.post('product-stock-reserve', [(self.second.pk, 2)], reservation='order-1').status_code, 200)
+        self.assertEqual(self.stock(), [5, 0])
+
+    def test_purge(self) -> None:
+        self.post('product-stock-reserve', [(self.first.pk, 1)], reservation='old')
+        self.post('product-stock-reserve', [(self.first.pk, 1)], reservation='new')
+        StockReservation.objects.filter(token='old').update(
+            created_at=timezone.now() - timedelta(seconds=settings.STOCK_RESERVATIONS['RETENTION'] + 1)
+        )
+
+        call_command('purge_stock_reservations', stdout=StringIO())
+        self.assertEqual(list(StockReservation.objects.values_list('token', flat=True)), ['new'])
+
+
+class StockShardsTests(TestCase):
+    """
+    The stock of a sharded product is held in its slots, and every endpoint reports it as a single total.
+    """
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+        self.product: Product = Product.objects.create(name='Producto A', price=Decimal('10.99'), stock=10)
+        self.shards_url: str = reverse('product-stock-shards', args=[self.product.pk])
+
+    def reserve(self, quantity: int) -> Any:
+        return self.client.post(
+            reverse('product-stock-reserve'), {'items': [{'product_id': self.product.pk, 'quantity': quantity}]}, format='json'
+        )
+
+    def slots(self) -> list[int]:
+        return self.client.get(self.shards_url).json()['slots']
+
+    def test_shard_and_unshard(self) -> None:
+        response = self.client.put(self.shards_url, {'shards': 4}, format='json')
+        self.assertEqual(response.json(), {'shards': 4, 'slots': [3, 3, 2, 2], 'stock': 10})
+        self.assertEqual(self.client.get(reverse('product-detail-delete', args=[self.product.pk])).json()['stock'], 10)
+        self.assertEqual(self.client.get(reverse('product-list-create')).json()['results'][0]['stock'], 10)
+
+        response = self.client.put(self.shards_url, {'shards': 0}, format='json')
+        self.assertEqual(response.json(), {'shards': 0, 'slots': [], 'stock': 10})
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 10)
+
+        too_many: dict[str, int] = {'shards': settings.PRODUCT_STOCK_MAX_SHARDS + 1}
+        self.assertEqual(self.client.put(self.shards_url, too_many, format='json').status_code, 400)
+        missing_url: str = reverse('product-stock-shards', args=[self.product.pk + 1])
+        self.assertEqual(self.client.put(missing_url, {'shards': 2}, format='json').status_code, 404)
+
+    def test_reserve_and_release(self) -> None:
+        self.client.put(self.shards_url, {'shards': 3}, format='json')
+
+        self.assertEqual(self.reserve(3).json()[0]['stock'], 7)
+        # More than any single slot holds: gathered from several slots
+        self.assertEqual(self.reserve(6).json()[0]['stock'], 1)
+        self.assertEqual(self.reserve(2).status_code, 400)
+        self.assertEqual(sum(self.slots()), 1)
+
+        response = self.client.post(
+            reverse('product-stock-release'), {'items': [{'product_id': self.product.pk, 'quantity': 9}]}, format='json'
+        )
+        self.assertEqual(response.json()[0]['stock'], 10)
+        self.assertEqual(sum(self.slots()), 10)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 0)
+
+    def test_set_stock_and_rebalance(self) -> None:
+        self.client.put(self.shards_url, {'shards': 3}, format='json')
+
+        self.client.patch(reverse('product-stock-update', args=[self.product.pk]), {'stock': 8}, format='json')
+        self.assertEqual(self.slots(), [3, 3, 2])
+
+        StockShard.objects.filter(product=self.product, slot=0).update(stock=8)
+        StockShard.objects.filter(product=self.product).exclude(slot=0).update(stock=0)
+        call_command('rebalance_stock_shards', stdout=StringIO())
+        self.assertEqual(self.slots(), [3, 3, 2])
+
+
+class ProductSearchTests(TestCase):
+    """
+    `GET /api/products/search/` matches word prefixes through the full-text index and ranks every match of the
+    catalog, not only the first ones found.
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Product.objects.bulk_create([
+            Product(name=f'Blue cotton shirt with long sleeves, model {number}', price=Decimal('19.99'))
+            for number in range(3000)
+        ])
+        # Created last, so it has the highest ID, and the best match of `blue shirt`
+        cls.best: Product = Product.objects.create(name='Blue shirt', price=Decimal('9.99'))
+        cls.accented: Product = Product.objects.create(name='Café molido', price=Decimal('4.50'))
+
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+
+    def search(self, query: str, limit: int = 5) -> list[int]:
+        response = self.client.get(reverse('product-search'), {'q': query, 'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return [product['id'] for product in response.json()]
+
+    def test_best_match_of_the_whole_catalog(self) -> None:
+        self.assertEqual(self.search('blue shirt', limit=1), [self.best.pk])
+        self.assertEqual(self.search('blu shi')[0], self.best.pk)
+        self.assertEqual(len(self.search('blue', limit=1000)), 100)
+
+    def test_ties_ordered_by_id(self) -> None:
+        ids: list[int] = search_product_ids(['model'], limit=50)
+        self.assertEqual(ids, sorted(ids))
+
+    def test_words(self) -> None:
+        self.assertEqual(self.search('cafe'), [self.accented.pk])
+        self.assertEqual(self.search('MOLIDO café'), [self.accented.pk])
+        # Search syntax is ignored
+        self.assertEqual(self.search('"café" OR NOT*'), [])
+        self.assertEqual(self.search('shirt tea'), [])
+
+    def test_index_follows_writes(self) -> None:
+        Product.objects.filter(pk=self.accented.pk).update(name='Té verde')
+        self.assertEqual(self.search('cafe'), [])
+        self.assertEqual(self.search('te verde'), [self.accented.pk])
+
+        Product.objects.filter(pk=self.accented.pk).delete()
+        self.assertEqual(self.search('verde'), [])
+
+    def test_rebuild(self) -> None:
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('blue shirt', limit=1), [self.best.pk])
+
+    def test_invalid(self) -> None:
+        for params in [{}, {'q': '  ?! '}, {'q': 'blue', 'limit': 0}, {'q': 'blue', 'limit': 'a'}]:
+            self.assertEqual(self.client.get(reverse('product-search'), params).status_code, 400, params)
+
+
+class ProductChangeFeedTests(TestCase):
+    """
+    Every product change appends an entry to the change log, numbered once committed and followed through
+    `GET /api/products/changes/` from the last sequence seen.
+    """
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+
+    def feed(self, **params: Any) -> dict[str, Any]:
+        response = self.client.get(reverse('product-changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sequences(self) -> None:
+        record_changes(ProductChange.Type.STOCK, [3, 1, 3])
+        self.assertEqual(list(ProductChange.objects.values_list('sequence', flat=True)), [None, None])
+
+        self.assertEqual(assign_sequences(), 2)
+        record_changes(ProductChange.Type.DELETED, [2])
+        self.assertEqual(assign_sequences(), 1)
+        self.assertEqual(assign_sequences(), 0)
+
+        self.assertEqual(
+            list(ProductChange.objects.order_by('pk').values_list('sequence', 'product_id', 'type')),
+            [(1, 1, 'stock'), (2, 3, 'stock'), (3, 2, 'deleted')],
+        )
+
+    def test_follow(self) -> None:
+        created = self.client.post(reverse('product-list-create'), {'name': 'Producto A', 'price': '10.99'}, format='json')
+        product_id: int = created.json()['id']
+        self.client.patch(reverse('product-stock-update', args=[product_id]), {'stock': 5}, format='json')
+
+        first: dict[str, Any] = self.feed(limit=1)
+        self.assertEqual([(change['sequence'], change['type']) for change in first['changes']], [(1, 'created')])
+        self.assertEqual(first['next'], 1)
+
+        rest: dict[str, Any] = self.feed(since=first['next'])
+        self.assertEqual([(change['sequence'], change['type']) for change in rest['changes']], [(2, 'stock')])
+
+        self.client.delete(reverse('product-detail-delete', args=[product_id]))
+        latest: dict[str, Any] = self.feed(since=rest['next'])
+        self.assertEqual([(change['product_id'], change['type']) for change in latest['changes']], [(product_id, 'deleted')])
+        self.assertEqual(self.feed(since=latest['next']), {'changes': [], 'next': latest['next']})
+
+    def test_wait_without_changes(self) -> None:
+        record_changes(ProductChange.Type.STOCK, [1])
+
+        self.assertEqual(self.feed(since=1, wait=0.05), {'changes': [], 'next': 1})
+
+    def test_compaction(self) -> None:
+        for product_ids in [[1, 2], [1], [1, 3]]:
+            record_changes(ProductChange.Type.STOCK, product_ids)
+
+        self.assertEqual(compact_changes(retention=0), 2)
+        self.assertEqual(
+            list(ProductChange.objects.order_by('sequence').values_list('sequence', 'product_id')), [(2, 2), (4, 1), (5, 3)]
+        )
+
+        # Numbering continues after the last sequence, which compaction always keeps
+        record_changes(ProductChange.Type.STOCK, [2])
+        self.assertEqual([change['sequence'] for change in self.feed(since=5)['changes']], [6])
+        self.assertEqual(compact_changes(retention=3600), 0)
+
+    def test_invalid(self) -> None:
+        for params in [{'since': -1}, {'since': 'a'}, {'limit': 0}, {'wait': -1}, {'wait': 'inf'}]:
+            self.assertEqual(self.client.get(reverse('product-changes'), params).status_code, 400, params)
+
+
+class ProductListPaginationTests(TestCase):
+    """
+    `GET /api/products/` is paginated by keyset for every `ordering`: following the `next` links returns every
+    product exactly once, in order, even when several products share the value they are ordered by.
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Product.objects.bulk_create([
+            Product(name=name, price=Decimal(price), stock=1)
+            for name, price in [
+                ('Mesa', '10.00'), ('armario', '2.50'), ('Zapato', '10.00'), ('Banco', '99.99'),
+                ('Árbol', '0.10'), ('Cama', '10.00'), ('Lámpara', '2.50'), ('Silla', '10.00'),
+            ]
+        ])
+
+    def setUp(self) -> None:
+        self.client: APIClient = APIClient()
+
+    def follow(self, **params: Any) -> list[tuple[str, str]]:
+        response = self.client.get(reverse('product-list-create'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        products: list[dict[str, Any]] = response.json()['results']
+
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            self.assertEqual(response.status_code, 200, response.content)
+            products += response.json()['results']
+        return [(product['name'], product['price']) for product in products]
+
+    def test_every_ordering(self) -> None:
+        self.assertEqual(set(ProductPagination.orderings), {'id', 'price', '-price', 'name', '-name'})
+
+        for ordering in ProductPagination.orderings:
+            # Ties (several products share each price) are broken by ID, in the direction of the ordering
+            expected: list[Product] = list(Product.objects.order_by(ordering, '-pk' if ordering.startswith('-') else 'pk'))
+
+            for limit in (1, 3, 8, 100):
+                self.assertEqual(
+                    self.follow(ordering=ordering, limit=limit),
+                    [(product.name, f'{product.price:.2f}') for product in expected],
+                    (ordering, limit),
+                )
+
+    def test_filters_are_kept(self) -> None:
+        self.assertEqual(
+            self.follow(ordering='-price', limit=1, max_price='10.00'),
+            [('Silla', '10.00'), ('Cama', '10.00'), ('Zapato', '10.00'), ('Mesa', '10.00'),
+             ('Lámpara', '2.50'), ('armario', '2.50'), ('Árbol', '0.10')],
+        )
+
+    def test_invalid(self) -> None:
+        url: str = reverse('product-list-create')
+        cursor: str = ProductPagination.encode_cursor('price', '10.00', 1)
+
+        for params in [
+            {'ordering': 'stock'},
+            {'limit': 0},
+            {'cursor': 'not a cursor'},
+            {'cursor': ProductPagination.encode_cursor('price', 'abc', 1), 'ordering': 'price'},
+            # Issued for another ordering
+            {'cursor': cursor, 'ordering': '-price'},
+            {'cursor': cursor},
+        ]:
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+        self.assertEqual(self.client.get(url, {'cursor': cursor, 'ordering': 'price'}).status_code, 200)
@@ -1,14 +1,50 @@
 from django.urls import URLPattern, path
-from .views import ProductListCreateView, ProductStockUpdateView, ProductDetailDeleteView
+from .views import (
+    ProductListCreateView,
+    ProductBulkCreateView,
+    ProductExportView,
+    ProductBatchView,
+    ProductSearchView,
+    ProductChangeFeedView,
+    ProductStockUpdateView,
+    ProductStockReserveView,
+    ProductStockReleaseView,
+    ProductStockShardsView,
+    ProductDetailDeleteView,
+)
 
 # Define the URL patterns for the product-related endpoints.
 urlpatterns: list[URLPattern] = [
     # Endpoint to list all products or create a new product.
     path('', ProductListCreateView.as_view(), name='product-list-create'),
 
+    # Endpoint to create many products at once from a JSON array or NDJSON.
+    path('bulk/', ProductBulkCreateView.as_view(), name='product-bulk-create'),
+
+    # Endpoint to stream all products as NDJSON.
+    path('export/', ProductExportView.as_view(), name='product-export'),
+
+    # Endpoint to retrieve several products at once, identified by the `ids` query parameter.
+    path('batch/', ProductBatchView.as_view(), name='product-batch'),
+
+    # Endpoint to search products by name, backed by a full-text index.
+    path('search/', ProductSearchView.as_view(), name='product-search'),
+
+    # Endpoint to follow the change log of the products, optionally waiting for new changes (long polling).
+    path('changes/', ProductChangeFeedView.as_view(), name='product-changes'),
+
+    # Endpoint to atomically decrement the stock of several products.
+    path('stock/reserve/', ProductStockReserveView.as_view(), name='product-stock-reserve'),
+
+    # Endpoint to atomically return previously reserved stock of several products.
+    path('stock/release/', ProductStockReleaseView.as_view(), name='product-stock-release'),
+
     # Endpoint to retrieve or delete a specific product identified by its primary key (product_id).
     path('<int:pk>/', ProductDetailDeleteView.as_view(), name='product-detail-delete'),
 
     # Endpoint to update the stock of a specific product identified by its primary key (product_id).
     path('<int:pk>/stock/', ProductStockUpdateView.as_view(), name='product-stock-update'),
+
+    # Endpoint to inspect or change the number of slots the stock of a hot product is split across.
+    path('<int:pk>/stock/shards/', ProductStockShardsView.as_view(), name='product-stock-shards'),
 ]
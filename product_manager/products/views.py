@@ -1,11 +1,91 @@
-from typing import Optional
+from collections import defaultdict
+from contextlib import nullcontext
+from itertools import islice
+from typing import Any, Iterator, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.http import HttpResponseBase, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Product
-from .serializers import ProductSerializer, ErrorSerializer
-from drf_spectacular.utils import extend_schema
+from common.exports import EXPORT_CHUNK_SIZE, NDJSONRenderer, ndjson_response
+from common.pagination import InvalidCursor
+from common.parsers import MessagePackParser, ORJSONParser
+from .models import Product, ProductChange, StockReservation, StockShard
+from .conditional import page_response, product_batch_etag, product_etag
+from .changes import record_changes, wait_for_changes
+from .notifications import notify_products_changed
+from .parsers import NDJSONParser
+from .filters import InvalidFilter, filter_products
+from .pagination import ProductPagination
+from .search import search_product_ids, search_terms
+from .serializers import (
+    ProductSerializer,
+    ProductPageSerializer,
+    ProductBulkSerializer,
+    ProductChangeFeedSerializer,
+    ErrorSerializer,
+    StockOperationSerializer,
+    StockShardsSerializer,
+)
+from .stock import (
+    PRODUCT_COLUMNS,
+    close_reservation,
+    load_shard_stock,
+    open_reservation,
+    release_product,
+    reserve_product,
+    serialize_product_rows,
+    set_stock,
+    set_stock_shards,
+)
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+MAX_BATCH_IDS: int = 500
+
+# Default and maximum number of products returned by a search.
+SEARCH_LIMIT: int = 20
+MAX_SEARCH_LIMIT: int = 100
+
+# Maximum number of entries of the change log returned per request.
+MAX_CHANGES_LIMIT: int = 1000
+
+# Maximum number of names checked for uniqueness per query.
+NAME_LOOKUP_CHUNK_SIZE: int = 500
+
+DUPLICATE_NAME_ERROR: dict[str, list[str]] = {'name': ['product with this name already exists.']}
+
+
+class StockOperationError(Exception):
+    """
+    Raised inside a stock transaction to roll it back and report the failing product.
+    """
+    def __init__(self, message: str, status_code: int) -> None:
+        super().__init__(message)
+        self.message: str = message
+        self.status_code: int = status_code
+
+
+def group_stock_items(items: list[dict[str, int]]) -> dict[int, int]:
+    """
+    Groups validated stock items by product ID, summing their quantities.
+
+    Args:
+        items (list[dict[str, int]]): A list of validated items containing 'product_id' and 'quantity'.
+
+    Returns:
+        dict[int, int]: Product IDs mapped to their total quantity, sorted by product ID so that
+                        concurrent transactions always lock rows in the same order.
+    """
+    grouped_items: defaultdict[int, int] = defaultdict(int)
+    for item in items:
+        grouped_items[item['product_id']] += item['quantity']
+    return dict(sorted(grouped_items.items()))
 
 
 class ProductListCreateView(APIView):
@@ -16,22 +96,56 @@ class ProductListCreateView(APIView):
     
     @extend_schema(
         summary='List all products',
-        description='Returns a list of all available products.',
+        description=(
+            'Returns a page of products, optionally filtered by stock, price band and name prefix, '
+            'ordered by ID (default), price or name. '
+            'Follow the `next` link to fetch the following page; it is `null` on the last page. '
+            'The response carries an `ETag`; send it back in `If-None-Match` to get a `304 Not Modified` '
+            'without a body while the page has not changed.'
+        ),
         tags=['Products'],
+        parameters=[
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor taken from the `next` link of the previous page'),
+            OpenApiParameter(name='limit', type=int, description=f'Number of products per page (maximum {ProductPagination.max_limit})'),
+            OpenApiParameter(name='ordering', type=str, enum=list(ProductPagination.orderings), description='Order of the products (default `id`)'),
+            OpenApiParameter(name='in_stock', type=bool, description='Only products with (`true`) or without (`false`) stock'),
+            OpenApiParameter(name='min_price', type=float, description='Only products whose price is at least this amount'),
+            OpenApiParameter(name='max_price', type=float, description='Only products whose price is at most this amount'),
+            OpenApiParameter(name='name', type=str, description='Only products whose name starts with this prefix (case-sensitive)'),
+        ],
         responses={
-            200: ProductSerializer(many=True),
+            200: ProductPageSerializer,
+            304: None,
+            400: ErrorSerializer,
         },
     )
-    def get(self, request: Request) -> Response:
+    def get(self, request: Request) -> HttpResponseBase:
         """ 
-        Retrieves a list of all products.
+        Retrieves a page of products.
+
+        Every filter and ordering is served by an index of `Product` and pages are fetched by keyset,
+        so the cost of a page does not depend on its depth.
+        Rows are read as tuples and serialized without building model instances.
+
+        Args:
+            request (Request): The Request object containing the optional `cursor`, `limit`, `ordering`
+                               and filter parameters.
 
         Returns:
-            Response: A Response object containing the serialized list of products.
+            HttpResponseBase: A Response object containing the serialized page of products, `304 Not Modified`
+                              if the page matches `If-None-Match`, or an error message if the pagination or
+                              filter parameters are invalid.
         """
-        products: list[Product] = Product.objects.all()
-        serializer: ProductSerializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        paginator: ProductPagination = ProductPagination()
+
+        try:
+            rows: list[tuple] = paginator.paginate_queryset(
+                filter_products(Product.objects.all(), request).values_list(*PRODUCT_COLUMNS), request, PRODUCT_COLUMNS
+            )
+        except (InvalidCursor, InvalidFilter) as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return page_response(request, paginator.get_paginated_data(serialize_product_rows(rows)))
 
 
     @extend_schema(
@@ -55,24 +169,421 @@ class ProductListCreateView(APIView):
         """
         serializer: ProductSerializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                product: Product = serializer.save()
+                record_changes(ProductChange.Type.CREATED, [product.pk])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductBulkCreateView(APIView):
+    """
+    Handles creating many products in a single request.
+    """
+    parser_classes = [ORJSONParser, MessagePackParser, NDJSONParser]
+
+    @extend_schema(
+        summary='Create products in bulk',
+        description=(
+            'Creates every product of a JSON array (`application/json`), of a MessagePack array (`application/msgpack`) '
+            'or of newline-delimited JSON (`application/x-ndjson`). Products are validated in a single pass, names are checked for uniqueness '
+            'against the database in bulk and rows are inserted in batches of `batch_size`. '
+            'Invalid products are reported by their position in the input and the valid ones are still created, '
+            'unless `atomic=true` is given, in which case nothing is created if any product is invalid. '
+            'Responds with 201 if every product was created, 207 if only some were and 400 if none were.'
+        ),
+        tags=['Products'],
+        parameters=[
+            OpenApiParameter(name='atomic', type=bool, description='Create nothing if any product is invalid'),
+            OpenApiParameter(
+                name='batch_size',
+                type=int,
+                description=f'Products inserted per query (default {settings.PRODUCT_BULK_BATCH_SIZE}, maximum {settings.PRODUCT_BULK_MAX_BATCH_SIZE})',
+            ),
+        ],
+        request={
+            'application/json': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'name': {'type': 'string'},
+                        'price': {'type': 'number'},
+                        'stock': {'type': 'integer'},
+                    },
+                    'required': ['name', 'price'],
+                },
+                'example': [
+                    {'name': 'Producto A', 'price': 10.99, 'stock': 100},
+                    {'name': 'Producto B', 'price': 15.49, 'stock': 50}
+                ],
+            },
+            'application/msgpack': {'type': 'string', 'format': 'binary'},
+            'application/x-ndjson': {'type': 'string'},
+        },
+        responses={
+            (201, 'application/json'): {
+                'type': 'object',
+                'properties': {
+                    'created': {
+                        'type': 'array',
+                        'items': {'type': 'object', 'properties': {'index': {'type': 'integer'}, 'id': {'type': 'integer'}}},
+                    },
+                    'errors': {
+                        'type': 'array',
+                        'items': {'type': 'object', 'properties': {'index': {'type': 'integer'}, 'errors': {'type': 'object'}}},
+                    },
+                },
+            },
+            400: ErrorSerializer,
+        },
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Creates many products, reporting the ID of every product created and the errors of every invalid one.
+
+        Args:
+            request (Request): The Request object containing the products and the optional `atomic` and
+                               `batch_size` query parameters.
+
+        Returns:
+            Response: A Response object listing the created products and the errors, both identified by their
+                      position in the input.
+        """
+        rows: Any = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Expected a non-empty list of products'}, status=status.HTTP_400_BAD_REQUEST)
+
+        atomic: bool = request.query_params.get('atomic', '').lower() in ('1', 'true', 'yes')
+
+        try:
+            batch_size: int = int(request.query_params.get('batch_size', settings.PRODUCT_BULK_BATCH_SIZE))
+            if batch_size <= 0:
+                raise ValueError
+        except ValueError:
+            return Response({'error': "'batch_size' must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+        batch_size = min(batch_size, settings.PRODUCT_BULK_MAX_BATCH_SIZE)
+
+        valid_rows, errors = self.validate_rows(rows)
+
+        if atomic and errors:
+            return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created: list[dict[str, int]] = []
+        # In atomic mode all batches share one transaction; otherwise each batch commits on its own
+        with transaction.atomic() if atomic else nullcontext():
+            for start in range(0, len(valid_rows), batch_size):
+                batch_created, batch_errors = self.insert_batch(valid_rows[start:start + batch_size])
+                created += batch_created
+                errors += batch_errors
+
+                if atomic and batch_errors:
+                    transaction.set_rollback(True)
+                    break
+
+        if atomic and errors:
+            return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors.sort(key=lambda error: error['index'])
+
+        if not errors:
+            response_status: int = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    @staticmethod
+    def validate_rows(rows: list[Any]) -> tuple[list[tuple[int, dict[str, Any]]], list[dict[str, Any]]]:
+        """
+        Validates every row in a single pass and checks name uniqueness with one query per chunk of names.
+
+        Args:
+            rows (list[Any]): The products received.
+
+        Returns:
+            tuple[list[tuple[int, dict[str, Any]]], list[dict[str, Any]]]: The validated rows with their
+                position in the input, and the errors of the invalid rows.
+        """
+        serializer: ProductBulkSerializer = ProductBulkSerializer()
+        valid_rows: list[tuple[int, dict[str, Any]]] = []
+        errors: list[dict[str, Any]] = []
+
+        for index, row in enumerate(rows):
+            try:
+                valid_rows.append((index, serializer.run_validation(row)))
+            except ValidationError as error:
+                errors.append({'index': index, 'errors': error.detail})
+
+        names: list[str] = [row['name'] for _, row in valid_rows]
+        taken: set[str] = set()
+        for start in range(0, len(names), NAME_LOOKUP_CHUNK_SIZE):
+            taken.update(Product.objects.filter(name__in=names[start:start + NAME_LOOKUP_CHUNK_SIZE]).values_list('name', flat=True))
+
+        unique_rows: list[tuple[int, dict[str, Any]]] = []
+        for index, row in valid_rows:
+            if row['name'] in taken:
+                errors.append({'index': index, 'errors': DUPLICATE_NAME_ERROR})
+                continue
+            taken.add(row['name'])
+            unique_rows.append((index, row))
+
+        return unique_rows, errors
+
+    @staticmethod
+    def insert_batch(rows: list[tuple[int, dict[str, Any]]]) -> tuple[list[dict[str, int]], list[dict[str, Any]]]:
+        """
+        Inserts a batch of validated rows with a single query.
+
+        If a name was taken by a concurrent request after validation, the batch is retried row by row
+        so that only the conflicting rows fail.
+
+        Args:
+            rows (list[tuple[int, dict[str, Any]]]): The validated rows with their position in the input.
+
+        Returns:
+            tuple[list[dict[str, int]], list[dict[str, Any]]]: The positions and IDs of the created products,
+                and the errors of the rows that could not be inserted.
+        """
+        try:
+            with transaction.atomic():
+                products: list[Product] = Product.objects.bulk_create([Product(**row) for _, row in rows])
+                record_changes(ProductChange.Type.CREATED, [product.pk for product in products])
+            return [{'index': index, 'id': product.pk} for (index, _), product in zip(rows, products)], []
+        except IntegrityError:
+            pass
+
+        created: list[dict[str, int]] = []
+        errors: list[dict[str, Any]] = []
+        for index, row in rows:
+            try:
+                with transaction.atomic():
+                    product: Product = Product.objects.create(**row)
+                    record_changes(ProductChange.Type.CREATED, [product.pk])
+                created.append({'index': index, 'id': product.pk})
+            except IntegrityError:
+                errors.append({'index': index, 'errors': DUPLICATE_NAME_ERROR})
+        return created, errors
+
+
+class ProductExportView(APIView):
+    """
+    Handles exporting the whole product catalog as a stream.
+    """
+    renderer_classes = [NDJSONRenderer]
+
+    @extend_schema(
+        summary='Export all products',
+        description=(
+            'Streams every product as newline-delimited JSON (`application/x-ndjson`), one product per line, '
+            'ordered by ID. Products are read and written in chunks, so memory usage does not depend on the '
+            'size of the catalog. The response is gzip-compressed when the request sends `Accept-Encoding: gzip`.'
+        ),
+        tags=['Products'],
+        responses={
+            (200, 'application/x-ndjson'): ProductSerializer,
+        },
+    )
+    def get(self, request: Request) -> StreamingHttpResponse:
+        """
+        Streams all products as NDJSON.
+
+        Args:
+            request (Request): The Request object.
+
+        Returns:
+            StreamingHttpResponse: A streaming response with one serialized product per line.
+        """
+        def product_chunks() -> Iterator[list[dict[str, Any]]]:
+            products: Iterator[tuple] = (
+                Product.objects.order_by('pk').values_list(*PRODUCT_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            )
+            while chunk := list(islice(products, EXPORT_CHUNK_SIZE)):
+                yield serialize_product_rows(chunk)
+
+        return ndjson_response(product_chunks(), request)
+
+
+class ProductBatchView(APIView):
+    """
+    Handles retrieving several products in a single request.
+    """
+    @extend_schema(
+        summary='Get several products',
+        description=(
+            'Returns the products whose IDs are given in the `ids` query parameter as a comma-separated list. '
+            f'Unknown IDs are omitted from the response. At most {MAX_BATCH_IDS} IDs can be requested at once. '
+            'Supports conditional requests through `ETag`/`If-None-Match`.'
+        ),
+        tags=['Products'],
+        parameters=[
+            OpenApiParameter(name='ids', type=str, required=True, description='Comma-separated product IDs, e.g. `1,2,3`'),
+        ],
+        responses={
+            200: ProductSerializer(many=True),
+            304: None,
+            400: ErrorSerializer,
+        },
+    )
+    @method_decorator(condition(etag_func=product_batch_etag))
+    def get(self, request: Request) -> Response:
+        """
+        Retrieves all the requested products with a single query.
+
+        Args:
+            request (Request): The Request object containing the `ids` query parameter.
+
+        Returns:
+            Response: A Response object containing the serialized list of products found, or an error message
+                      if the IDs are missing or invalid.
+        """
+        raw_ids: str = request.query_params.get('ids', '')
+
+        try:
+            product_ids: set[int] = {int(product_id) for product_id in raw_ids.split(',') if product_id.strip()}
+        except ValueError:
+            return Response({'error': "'ids' must be a comma-separated list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not product_ids:
+            return Response({'error': 'No ids provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(product_ids) > MAX_BATCH_IDS:
+            return Response({'error': f'At most {MAX_BATCH_IDS} ids can be requested at once'}, status=status.HTTP_400_BAD_REQUEST)
+
+        products: QuerySet = Product.objects.filter(pk__in=product_ids).order_by('pk').values_list(*PRODUCT_COLUMNS)
+        return Response(serialize_product_rows(products), status=status.HTTP_200_OK)
+
+
+class ProductSearchView(APIView):
+    """
+    Handles searching products by name.
+    """
+    @extend_schema(
+        summary='Search products by name',
+        description=(
+            'Returns the products whose name contains a word starting with each word of `q`, best matches first. '
+            'Served by a full-text index of the names (FTS5 on SQLite, a `tsvector` GIN index on PostgreSQL), '
+            f'so it does not scan the catalog. Returns at most `limit` products (default {SEARCH_LIMIT}, maximum {MAX_SEARCH_LIMIT}).'
+        ),
+        tags=['Products'],
+        parameters=[
+            OpenApiParameter(name='q', type=str, required=True, description='Words searched, e.g. `blue sh`'),
+            OpenApiParameter(name='limit', type=int, description='Maximum number of products returned'),
+        ],
+        responses={
+            200: ProductSerializer(many=True),
+            400: ErrorSerializer,
+        },
+    )
+    def get(self, request: Request) -> Response:
+        """
+        Searches products by name.
+
+        Args:
+            request (Request): The Request object containing the `q` and optional `limit` query parameters.
+
+        Returns:
+            Response: A Response object containing the matching products in order of relevance, or an error
+                      message if the parameters are invalid.
+        """
+        terms: list[str] = search_terms(request.query_params.get('q', ''))
+        if not terms:
+            return Response({'error': "'q' must contain at least one word"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit: int = int(request.query_params.get('limit', SEARCH_LIMIT))
+            if limit <= 0:
+                raise ValueError
+        except ValueError:
+            return Response({'error': "'limit' must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        product_ids: list[int] = search_product_ids(terms, min(limit, MAX_SEARCH_LIMIT))
+        products: dict[int, dict[str, Any]] = {
+            product['id']: product
+            for product in serialize_product_rows(Product.objects.filter(pk__in=product_ids).values_list(*PRODUCT_COLUMNS))
+        }
+        # Products deleted since the search are skipped
+        return Response([products[pk] for pk in product_ids if pk in products], status=status.HTTP_200_OK)
+
+
+class ProductChangeFeedView(APIView):
+    """
+    Handles following the change log of the products.
+    """
+    @extend_schema(
+        summary='Follow product changes',
+        description=(
+            'Returns the entries of the product change log following sequence `since`, oldest first: one entry per '
+            'product created, deleted or whose stock changed, numbered in increasing order once committed. '
+            'Send the returned `next` as `since` in the following request to get only newer changes; the current '
+            'state of the changed products can be fetched with the batch endpoint. With `wait`, the request waits up '
+            f'to that many seconds (maximum {settings.PRODUCT_CHANGES["WAIT_TIMEOUT"]:g}) for a change when there is '
+            'none yet (long polling). Old entries superseded by a newer entry of the same product are compacted, so '
+            'the log keeps at least the latest change of every product.'
+        ),
+        tags=['Products'],
+        parameters=[
+            OpenApiParameter(name='since', type=int, description='Last sequence seen (default 0, the start of the log)'),
+            OpenApiParameter(name='limit', type=int, description=f'Maximum number of entries returned (maximum {MAX_CHANGES_LIMIT})'),
+            OpenApiParameter(name='wait', type=float, description='Seconds to wait for a change when there is none (default 0)'),
+        ],
+        responses={
+            200: ProductChangeFeedSerializer,
+            400: ErrorSerializer,
+        },
+    )
+    def get(self, request: Request) -> Response:
+        """
+        Retrieves the changes following the requested sequence, waiting for one if requested.
+
+        Args:
+            request (Request): The Request object containing the optional `since`, `limit` and `wait` parameters.
+
+        Returns:
+            Response: A Response object containing the changes and the sequence to continue from, or an error
+                      message if the parameters are invalid.
+        """
+        try:
+            since: int = int(request.query_params.get('since', 0))
+            limit: int = int(request.query_params.get('limit', settings.PRODUCT_CHANGES['PAGE_SIZE']))
+            if since < 0 or limit <= 0:
+                raise ValueError
+        except ValueError:
+            return Response({'error': "'since' must be a non-negative integer and 'limit' a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            wait: float = float(request.query_params.get('wait', 0))
+            if not 0 <= wait < float('inf'):
+                raise ValueError
+        except ValueError:
+            return Response({'error': "'wait' must be a non-negative number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes: list[dict[str, Any]] = wait_for_changes(
+            since, min(limit, MAX_CHANGES_LIMIT), min(wait, settings.PRODUCT_CHANGES['WAIT_TIMEOUT'])
+        )
+        next_sequence: int = changes[-1]['sequence'] if changes else since
+        return Response({'changes': changes, 'next': next_sequence}, status=status.HTTP_200_OK)
+
+
 class ProductDetailDeleteView(APIView):
     """
     Handles retrieving and deleting a specific product by its ID.
     """
     @extend_schema(
         summary='Get product details',
-        description='Returns detailed information about a product identified by its ID.',
+        description=(
+            'Returns detailed information about a product identified by its ID. '
+            'Supports conditional requests through `ETag`/`If-None-Match`.'
+        ),
         tags=['Products'],
         responses={
             200: ProductSerializer,
+            304: None,
             404: ErrorSerializer,
         },
     )
+    @method_decorator(condition(etag_func=product_etag))
     def get(self, request: Request, pk: int) -> Response:
         """
         Retrieves the details of a specific product by its primary key (ID).
@@ -88,6 +599,7 @@ class ProductDetailDeleteView(APIView):
         except Product.DoesNotExist:
             return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        load_shard_stock([product])
         serializer: ProductSerializer = ProductSerializer(product)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -116,7 +628,10 @@ class ProductDetailDeleteView(APIView):
         except Product.DoesNotExist:
             return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        product.delete()
+        with transaction.atomic():
+            product.delete()
+            record_changes(ProductChange.Type.DELETED, [pk])
+        notify_products_changed([pk])
         return Response(status=status.HTTP_204_NO_CONTENT)
     
 
@@ -128,7 +643,8 @@ class ProductStockUpdateView(APIView):
         summary='Update product stock',
         description=(
             'Updates the stock of a product identified by its ID. '
-            'The request body must include the `stock` field with a non-negative integer value.'
+            'The request body must include the `stock` field with a non-negative integer value. '
+            'The stock of a sharded product is spread evenly across its slots.'
         ),
         tags=['Products'],
         request={
@@ -175,7 +691,239 @@ class ProductStockUpdateView(APIView):
         except (TypeError, ValueError):
             return Response({'error': 'Stock must be a valid integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-        product.stock = stock
-        product.save()
+        set_stock(product, stock)
+        product.refresh_from_db()
+        load_shard_stock([product])
         serializer: ProductSerializer = ProductSerializer(product)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+STOCK_OPERATION_REQUEST: dict = {
+    'application/json': {
+        'type': 'object',
+        'properties': {
+            'items': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'product_id': {'type': 'integer'},
+                        'quantity': {'type': 'integer'},
+                    },
+                    'required': ['product_id', 'quantity'],
+                },
+            },
+            'reservation': {'type': 'string', 'maxLength': 64},
+        },
+        'required': ['items'],
+        'example': {
+            'items': [
+                {'product_id': 1, 'quantity': 2},
+                {'product_id': 3, 'quantity': 1}
+            ]
+        },
+    },
+}
+
+
+class ProductStockReserveView(APIView):
+    """
+    Handles decrementing the stock of several products as a single atomic operation.
+    """
+    @extend_schema(
+        summary='Reserve stock for several products',
+        description=(
+            'Decrements the stock of every product in `items` by the given quantity within a single transaction. '
+            'Each decrement is a conditional update, so concurrent reservations can never oversell a product. '
+            'The stock of a sharded product is taken from one of its slots, so concurrent reservations of the '
+            'product do not wait for each other. '
+            'If any product does not exist or does not have enough stock, no stock is modified. '
+            'With a `reservation` token, retrying the reservation does not reserve the stock again, and it is '
+            'refused with `409` if the token was already released (see the release endpoint).'
+        ),
+        tags=['Products'],
+        request=STOCK_OPERATION_REQUEST,
+        responses={
+            200: ProductSerializer(many=True),
+            400: ErrorSerializer,
+            404: ErrorSerializer,
+            409: ErrorSerializer,
+        },
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Reserves stock for all the requested products, or for none of them.
+
+        Args:
+            request (Request): The Request object containing the list of items to reserve.
+
+        Returns:
+            Response: A Response object containing the updated products, or an error message identifying
+                      the product that could not be reserved.
+        """
+        serializer: StockOperationSerializer = StockOperationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        grouped_items: dict[int, int] = group_stock_items(serializer.validated_data['items'])
+        reservation: Optional[str] = serializer.validated_data.get('reservation')
+
+        try:
+            with transaction.atomic():
+                existing: Optional[StockReservation] = open_reservation(reservation, grouped_items) if reservation else None
+                if existing is not None and existing.status == StockReservation.Status.RELEASED:
+                    raise StockOperationError(f'Reservation {reservation} was already released', status.HTTP_409_CONFLICT)
+                # A retry of a reservation already made reserves nothing
+                to_reserve: dict[int, int] = {} if existing is not None else grouped_items
+                shards: dict[int, int] = dict(Product.objects.filter(pk__in=to_reserve).values_list('pk', 'stock_shards'))
+
+                for product_id, quantity in to_reserve.items():
+                    if reserve_product(product_id, quantity, shards.get(product_id, 0)):
+                        continue
+
+                    if Product.objects.filter(pk=product_id).exists():
+                        raise StockOperationError(f'Insufficient stock for product {product_id}', status.HTTP_400_BAD_REQUEST)
+                    raise StockOperationError(f'Product {product_id} not found', status.HTTP_404_NOT_FOUND)
+
+                record_changes(ProductChange.Type.STOCK, to_reserve)
+        except StockOperationError as error:
+            return Response({'error': error.message}, status=error.status_code)
+
+        products: list[Product] = load_shard_stock(Product.objects.filter(pk__in=grouped_items).order_by('pk'))
+        return Response(ProductSerializer(products, many=True).data, status=status.HTTP_200_OK)
+
+
+class ProductStockReleaseView(APIView):
+    """
+    Handles returning previously reserved stock for several products as a single atomic operation.
+    """
+    @extend_schema(
+        summary='Release stock for several products',
+        description=(
+            'Increments the stock of every product in `items` by the given quantity within a single transaction. '
+            'Used to undo a reservation whose order could not be completed. '
+            'If any product does not exist, no stock is modified. '
+            'With a `reservation` token, the stock reserved with that token is given back instead, only once, '
+            'and only if it was reserved; a token not reserved yet is refused by the reserve endpoint from then '
+            'on. This makes it safe to undo a reservation whose outcome is unknown, e.g. after a timeout.'
+        ),
+        tags=['Products'],
+        request=STOCK_OPERATION_REQUEST,
+        responses={
+            200: ProductSerializer(many=True),
+            400: ErrorSerializer,
+            404: ErrorSerializer,
+        },
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Releases stock for all the requested products, or for none of them.
+
+        Args:
+            request (Request): The Request object containing the list of items to release.
+
+        Returns:
+            Response: A Response object containing the updated products, or an error message identifying
+                      the product that does not exist.
+        """
+        serializer: StockOperationSerializer = StockOperationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        grouped_items: dict[int, int] = group_stock_items(serializer.validated_data['items'])
+        reservation: Optional[str] = serializer.validated_data.get('reservation')
+
+        try:
+            with transaction.atomic():
+                to_release: dict[int, int] = close_reservation(reservation) if reservation else grouped_items
+                shards: dict[int, int] = dict(Product.objects.filter(pk__in=to_release).values_list('pk', 'stock_shards'))
+
+                for product_id, quantity in to_release.items():
+                    if not release_product(product_id, quantity, shards.get(product_id, 0)):
+                        raise StockOperationError(f'Product {product_id} not found', status.HTTP_404_NOT_FOUND)
+
+                record_changes(ProductChange.Type.STOCK, to_release)
+        except StockOperationError as error:
+            return Response({'error': error.message}, status=error.status_code)
+
+        products: list[Product] = load_shard_stock(Product.objects.filter(pk__in=grouped_items).order_by('pk'))
+        return Response(ProductSerializer(products, many=True).data, status=status.HTTP_200_OK)
+
+
+class ProductStockShardsView(APIView):
+    """
+    Handles inspecting and changing how the stock of a product is sharded.
+    """
+    @staticmethod
+    def shards_data(pk: int) -> Optional[dict[str, Any]]:
+        """
+        Returns the number of slots of a product, the stock of each slot and its total stock, or None if
+        the product does not exist.
+        """
+        stock: Optional[int] = Product.objects.filter(pk=pk).values_list('stock', flat=True).first()
+        if stock is None:
+            return None
+
+        slots: list[int] = list(StockShard.objects.filter(product_id=pk).order_by('slot').values_list('stock', flat=True))
+        return {'shards': len(slots), 'slots': slots, 'stock': stock + sum(slots)}
+
+    @extend_schema(
+        summary='Get the stock shards of a product',
+        description='Returns the number of slots the stock of a product is split across, the stock of each slot and the total stock.',
+        tags=['Products'],
+        responses={
+            200: StockShardsSerializer,
+            404: ErrorSerializer,
+        },
+    )
+    def get(self, request: Request, pk: int) -> Response:
+        """
+        Retrieves the stock slots of a specific product by its primary key (ID).
+
+        Args:
+            pk (int): The primary key of the product.
+
+        Returns:
+            Response: A Response object containing the slots of the product, or an error message if the product does not exist.
+        """
+        data: Optional[dict[str, Any]] = self.shards_data(pk)
+        if data is None:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+    @extend_schema(
+        summary='Shard the stock of a product',
+        description=(
+            'Splits the stock of a hot product across `shards` slots, so that concurrent reservations of the product '
+            'update different rows instead of contending on the product row. The current stock is spread evenly '
+            'across the new slots; `0` moves it back into the product row. The total stock reported by every '
+            f'endpoint is unchanged. At most {settings.PRODUCT_STOCK_MAX_SHARDS} slots.'
+        ),
+        tags=['Products'],
+        request=StockShardsSerializer,
+        responses={
+            200: StockShardsSerializer,
+            400: ErrorSerializer,
+            404: ErrorSerializer,
+        },
+    )
+    def put(self, request: Request, pk: int) -> Response:
+        """
+        Changes the number of stock slots of a specific product by its primary key (ID).
+
+        Args:
+            request (Request): The Request object containing the new number of slots.
+            pk (int): The primary key of the product.
+
+        Returns:
+            Response: A Response object containing the new slots of the product, or an error message if the
+                      product does not exist or the number of slots is invalid.
+        """
+        serializer: StockShardsSerializer = StockShardsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if not set_stock_shards(pk, serializer.validated_data['shards']):
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.shards_data(pk), status=status.HTTP_200_OK)